@@ -0,0 +1,346 @@
+"""
+Animation.py contains a streaming exporter of animations of time-varying networks.
+
+An animation is drawn from a sequence of frames, each holding only what changed since the frame before it:
+
+    (t, nodes, edges)
+    t: Time of the frame
+    nodes: dict between node ids and their new positions (x, y)
+    edges: dict between edge ids and (u, v, value), where u and v are node ids and value is the cost by which the edge
+        is coloured, or None if the edge was removed
+
+qnet_frames steps a copy of a Qnet through time and reads the changes from its change log (See Qnet.touch), and
+array_frames reads them from a precomputed trajectory, which may be memory-mapped (See Sinks.py). The first frame
+holds the whole network.
+
+The artists of the animation are updated in place from frame to frame. Nodes and edges that have never changed are
+drawn once into a background image, and only those that have changed are drawn as vector artists in each frame, so
+render time scales with the number of frames times the number of changing edges. Frames are streamed to the file
+writer as they are drawn, so memory stays flat for long animations.
+
+>>> Q.enable_visibility(min_elevation=10)
+>>> QNET.animate(Q, "orbit.mp4", tMax=3600, dt=60, cost_type='e')
+"""
+
+import QNET
+import copy
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib import animation, colors
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+
+class FrameWriter(animation.AbstractMovieWriter):
+    """
+    Movie writer that saves each frame as a numbered PNG file in a directory. It needs no encoder, and can be turned
+    into a movie afterwards, i.e. with "ffmpeg -i frame_%06d.png movie.mp4"
+    """
+    def setup(self, fig, outfile, dpi=None):
+        super().setup(fig, outfile, dpi)
+        os.makedirs(outfile, exist_ok=True)
+        self.frame = 0
+
+    def grab_frame(self, **savefig_kwargs):
+        self.fig.savefig(os.path.join(self.outfile, f"frame_{self.frame:06d}.png"), dpi=self.dpi, **savefig_kwargs)
+        self.frame += 1
+
+    def finish(self):
+        pass
+
+
+def edge_id(u, v, key):
+    """
+    Returns an id of an edge of a MultiGraph that does not depend on the order of its ends
+    """
+    return frozenset((u, v)), key
+
+
+def qnet_frames(Q, tMax, dt, cost_type, FOV=('x', 'y')):
+    """
+    Yields the frames of a copy of a Qnet stepped through time with update. Node ids are the nodes of the copy
+
+    Parameters
+    ----------
+    Q: Qnet()
+    tMax: float
+    dt: float
+    cost_type: str
+        Cost by which edges are coloured
+    FOV: (str, str), optional
+        Field of view. Choose any pair of cartesian axes. I.E. ('x','y'), ('y','z')
+
+    Returns
+    -------
+    generator of (float, dict, dict)
+    """
+    axis_to_index = {'x': 0, 'y': 1, 'z': 2}
+    a, b = axis_to_index[FOV[0]], axis_to_index[FOV[1]]
+    C = copy.deepcopy(Q)
+
+    def edge_frame(edges):
+        frame = {}
+        for u, v, key in edges:
+            if C.has_edge(u, v, key):
+                frame[edge_id(u, v, key)] = (u, v, C.edges[u, v, key].get(cost_type, np.nan))
+            else:
+                frame[edge_id(u, v, key)] = None
+        return frame
+
+    known = set()
+    yield 0, {node: (node.coords[a], node.coords[b]) for node in C.nodes}, edge_frame(C.edges(keys=True))
+    known.update(edge_id(u, v, key) for u, v, key in C.edges(keys=True))
+    version = C.version
+
+    for i in range(1, len(QNET.getTimeArr(tMax, dt))):
+        C.update(dt)
+        nodes = set()
+        changed = set()
+        # The log holds the ids of nodes. Those of removed nodes can no longer be looked up
+        complete = len(C.changes) > 0 and C.changes[0][0] <= version + 1
+        for change_version, changed_nodes, changed_edges, costs, decreased in C.changes:
+            if not complete:
+                break
+            if change_version > version:
+                nodes.update(C.node_from_id(u) for u in changed_nodes)
+                for u, v, key in changed_edges:
+                    u, v = C.node_from_id(u), C.node_from_id(v)
+                    if u is None or v is None:
+                        complete = False
+                        break
+                    changed.add((u, v, key))
+        if complete:
+            edges = edge_frame(changed)
+        else:
+            # The change log no longer reaches back to the last frame, so send everything
+            nodes = set(C.nodes)
+            edges = edge_frame(C.edges(keys=True))
+            edges.update({e: None for e in known if e not in edges})
+        version = C.version
+        known.update(e for e, edge in edges.items() if edge is not None)
+        known.difference_update(e for e, edge in edges.items() if edge is None)
+        nodes.discard(None)
+        yield i * dt, {node: (node.coords[a], node.coords[b]) for node in nodes if node in C}, edges
+
+
+def array_frames(times, positions, edges, values):
+    """
+    Yields the frames of a precomputed trajectory. Node ids are the indices of the nodes, and edge ids are the
+    indices of the edges
+
+    Parameters
+    ----------
+    times: numpy.ndarray
+        Times of shape (T,)
+    positions: numpy.ndarray
+        Positions of the nodes of shape (T, nodes, 2)
+    edges: numpy.ndarray
+        Ends of the edges as node indices, of shape (edges, 2)
+    values: numpy.ndarray
+        Values of the edges of shape (T, edges). Edges whose value is nan are absent from the frame
+
+    Returns
+    -------
+    generator of (float, dict, dict)
+    """
+    edges = np.asarray(edges, dtype=int)
+    for i in range(len(times)):
+        position = np.asarray(positions[i], dtype=float)
+        value = np.asarray(values[i], dtype=float)
+        if i == 0:
+            moved = np.arange(len(position))
+            changed = np.arange(len(value))
+        else:
+            moved = np.flatnonzero((position != previous_position).any(axis=1))
+            changed = np.flatnonzero((value != previous_value) & ~(np.isnan(value) & np.isnan(previous_value)))
+        yield (times[i], {int(n): tuple(position[n]) for n in moved},
+               {int(e): None if np.isnan(value[e]) else (int(edges[e, 0]), int(edges[e, 1]), value[e])
+                for e in changed})
+        previous_position = position
+        previous_value = value
+
+
+def get_writer(writer, fps):
+    """
+    Returns a movie writer from a writer, the name of one, or None, which means ffmpeg if it is installed and
+    otherwise FrameWriter
+    """
+    if writer is None:
+        writer = 'ffmpeg' if animation.writers.is_available('ffmpeg') else FrameWriter(fps=fps)
+    if isinstance(writer, str):
+        writer = animation.writers[writer](fps=fps)
+    return writer
+
+
+def animate(source, path, tMax=None, dt=None, cost_type=None, writer=None, fps=10, dpi=100, figsize=(6.4, 4.8),
+            FOV=('x', 'y'), limits=None, cmap='viridis', vmin=None, vmax=None, title=None):
+    """
+    Stream an animation of a time-varying network to a file. See the documentation of Animation.py
+
+    Parameters
+    ----------
+    source: Qnet() or iterable of frames
+        A Qnet, which is stepped through time with qnet_frames, or frames, i.e. from array_frames
+    path: str
+        File to write the animation to, or directory of the frames for FrameWriter
+    tMax: float, optional
+        Duration of the animation of a Qnet
+    dt: float, optional
+        Time step of the animation of a Qnet
+    cost_type: str, optional
+        Cost by which the edges of a Qnet are coloured. (The default is None, which means the first cost in the cost
+        vector)
+    writer: matplotlib.animation.AbstractMovieWriter or str, optional
+        (The default is None, which means ffmpeg if it is installed and otherwise FrameWriter)
+    fps: int, optional
+    dpi: int, optional
+    figsize: (float, float), optional
+    FOV: (str, str), optional
+        Field of view of a Qnet
+    limits: (float, float, float, float), optional
+        Fixed limits of the axes (xmin, xmax, ymin, ymax). (The default is None, which fits the nodes of the first
+        frame. Nodes that later move out of the limits are not seen)
+    cmap: str, optional
+    vmin: float, optional
+        Lower end of the colour map. (The default is None, which means the lower end of the cost range of a Qnet, or
+        the smallest value of the first frame)
+    vmax: float, optional
+        Upper end of the colour map
+    title: str, optional
+        Title, to which the time of each frame is added
+
+    Returns
+    -------
+    int
+        Number of frames written
+    """
+    if isinstance(source, QNET.Qnet):
+        assert tMax is not None and dt is not None, "Animating a Qnet needs tMax and dt"
+        if cost_type is None:
+            cost_type = list(source.cost_vector)[0]
+        if vmin is None and vmax is None:
+            vmin, vmax = source.cost_ranges[cost_type]
+        frames = qnet_frames(source, tMax, dt, cost_type, FOV)
+    else:
+        frames = iter(source)
+    writer = get_writer(writer, fps)
+
+    # The figure is kept out of pyplot, so that nothing is shown or held after the animation
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    cmap = plt.get_cmap(cmap)
+
+    positions = {}
+    edges = {}
+    incident = {}
+    dynamic_nodes = set()
+    dynamic_edges = set()
+
+    static_lines = LineCollection([], linewidths=0.5, zorder=1)
+    dynamic_lines = LineCollection([], linewidths=1, cmap=cmap, zorder=2)
+    static_points = ax.scatter([], [], s=10, zorder=3, linewidths=0)
+    dynamic_points = ax.scatter([], [], s=10, zorder=4, linewidths=0)
+    ax.add_collection(static_lines)
+    ax.add_collection(dynamic_lines)
+    background = ax.imshow(np.zeros((1, 1, 4)), zorder=0, aspect='auto', interpolation='nearest')
+
+    def colour(node):
+        return QNET.node_colours.get(type(node), 'k')
+
+    def segments(ids):
+        return [[positions[edges[e][0]], positions[edges[e][1]]] for e in ids]
+
+    def draw_background():
+        """
+        Draw the nodes and edges that have not changed, and keep the pixels of the axes as the background image
+        """
+        static = [e for e in edges if e not in dynamic_edges]
+        static_lines.set_segments(segments(static))
+        static_lines.set_color(cmap(dynamic_lines.norm(np.array([edges[e][2] for e in static], dtype=float))))
+        nodes = [n for n in positions if n not in dynamic_nodes]
+        static_points.set_offsets(np.array([positions[n] for n in nodes], dtype=float).reshape(-1, 2))
+        static_points.set_facecolor([colour(n) for n in nodes])
+        static_points.set_sizes([QNET.marker_size(positions)])
+        dynamic_points.set_sizes([QNET.marker_size(positions)])
+
+        hidden = (background, dynamic_lines, dynamic_points)
+        for artist in hidden:
+            artist.set_visible(False)
+        static_lines.set_visible(True)
+        static_points.set_visible(True)
+        fig.canvas.draw()
+        pixels = np.asarray(fig.canvas.buffer_rgba())
+        x0, y0, x1, y1 = np.round(ax.bbox.extents).astype(int)
+        height = pixels.shape[0]
+        background.set_data(pixels[height - y1:height - y0, x0:x1].copy())
+        for artist in hidden:
+            artist.set_visible(True)
+        static_lines.set_visible(False)
+        static_points.set_visible(False)
+
+    count = 0
+    with writer.saving(fig, path, dpi):
+        for t, frame_nodes, frame_edges in frames:
+            changed_nodes = set()
+            changed_edges = set()
+            for n, position in frame_nodes.items():
+                if n in positions:
+                    changed_nodes.add(n)
+                    changed_edges.update(incident.get(n, ()))
+                positions[n] = position
+            for e, edge in frame_edges.items():
+                old = edges.pop(e, None)
+                if old is not None:
+                    incident[old[0]].discard(e)
+                    incident[old[1]].discard(e)
+                if edge is not None:
+                    edges[e] = edge
+                    incident.setdefault(edge[0], set()).add(e)
+                    incident.setdefault(edge[1], set()).add(e)
+                changed_edges.add(e)
+
+            if count == 0:
+                # Everything in the first frame starts in the background
+                points = np.array(list(positions.values()), dtype=float).reshape(-1, 2)
+                if limits is None and len(points) == 0:
+                    limits = (0, 1, 0, 1)
+                elif limits is None:
+                    low, high = points.min(axis=0), points.max(axis=0)
+                    margin = np.maximum(0.05 * (high - low), 1e-9)
+                    limits = (low[0] - margin[0], high[0] + margin[0], low[1] - margin[1], high[1] + margin[1])
+                ax.set_xlim(limits[0], limits[1])
+                ax.set_ylim(limits[2], limits[3])
+                ax.set_autoscale_on(False)
+                background.set_extent(limits)
+                values = np.array([edge[2] for edge in edges.values()], dtype=float)
+                if vmin is None:
+                    vmin = np.nanmin(values) if len(values) > 0 and not np.isnan(values).all() else 0
+                if vmax is None:
+                    vmax = np.nanmax(values) if len(values) > 0 and not np.isnan(values).all() else 1
+                dynamic_lines.set_norm(colors.Normalize(vmin, vmax))
+                fig.colorbar(dynamic_lines, ax=ax, label=cost_type)
+                draw_background()
+            else:
+                new_nodes = changed_nodes - dynamic_nodes
+                new_edges = changed_edges - dynamic_edges
+                dynamic_nodes.update(new_nodes)
+                # Removed edges stay in the dynamic set, so that edges which come and go do not redraw the background
+                dynamic_edges.update(new_edges)
+                if len(new_nodes) > 0 or len(new_edges) > 0:
+                    draw_background()
+
+            if len(changed_nodes) > 0 or len(changed_edges) > 0:
+                live = [e for e in dynamic_edges if e in edges]
+                dynamic_lines.set_segments(segments(live))
+                dynamic_lines.set_array(np.array([edges[e][2] for e in live], dtype=float))
+                nodes = list(dynamic_nodes)
+                dynamic_points.set_offsets(np.array([positions[n] for n in nodes], dtype=float).reshape(-1, 2))
+                dynamic_points.set_facecolor([colour(n) for n in nodes])
+
+            ax.set_title(f"t = {t:g}" if title is None else f"{title} (t = {t:g})")
+            writer.grab_frame()
+            count += 1
+    return count
@@ -0,0 +1,374 @@
+"""
+Benchmarks.py contains a benchmark suite for the hot paths of QNET at a range of graph sizes.
+
+Each benchmark builds its inputs for a given size, then times a run of the code under test. A benchmark is timed
+over several repeats, reporting the best and median wall times, the throughput in items per second (i.e. nodes
+built or queries answered), and the peak memory of one further run traced with tracemalloc. Random inputs are drawn
+with fixed seeds, so runs are comparable.
+
+Run the suite from the command line, where the directory containing QNET is on the python path:
+
+    python -m QNET.Benchmarks --sizes 10 20 40 --output results.json
+    python -m QNET.Benchmarks --sizes 10 20 40 --baseline results.json --threshold 0.2
+
+Results are written as JSON. Given a baseline file from an earlier run, every benchmark whose best time grew by more
+than the threshold is reported as a regression, and the command exits with status 1.
+"""
+
+import QNET
+import argparse
+import contextlib
+import copy
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import networkx as nx
+import numpy as np
+
+# Costs of the channels of benchmark lattices
+E = 0.99
+F = 0.99
+
+
+def corners(Q, size):
+    """
+    Returns the opposite corners of a square lattice of the given size
+    """
+    return Q.getNode("(0, 0)"), Q.getNode(f"({size - 1}, {size - 1})")
+
+
+def bench_getNode(size):
+    Q = QNET.square_lattice(size, size, E, F)
+    names = [node.name for node in Q.nodes]
+
+    def run():
+        for name in names:
+            Q.getNode(name)
+    return run, len(names)
+
+
+def bench_multidim_lattice(size):
+    return lambda: QNET.multidim_lattice(2, size, E, F), size ** 2
+
+
+def bench_square_lattice(size):
+    return lambda: QNET.square_lattice(size, size, E, F), size ** 2
+
+
+def bench_regularLatticeGen(size):
+    return lambda: QNET.regularLatticeGen(size, size, [1, 0, 0], [0, 1, 0], e=E, f=F), size ** 2
+
+
+def random_pairs(Q, n, seed=0):
+    """
+    Returns n random pairs of nodes of Q, drawn with a fixed seed
+    """
+    rng = random.Random(seed)
+    nodes = sorted(Q.nodes, key=lambda node: node.name)
+    return [tuple(rng.sample(nodes, 2)) for i in range(n)]
+
+
+def bench_best_path(size):
+    Q = QNET.square_lattice(size, size, E, F)
+    pairs = random_pairs(Q, 20)
+
+    def run():
+        # Time the searches rather than the route cache
+        Q.route_cache.clear()
+        for u, v in pairs:
+            QNET.best_path(Q, u, v, 'f')
+    return run, len(pairs)
+
+
+def bench_best_path_cost(size):
+    Q = QNET.square_lattice(size, size, E, F)
+    pairs = random_pairs(Q, 20)
+
+    def run():
+        Q.route_cache.clear()
+        for u, v in pairs:
+            QNET.best_path_cost(Q, u, v, 'f')
+    return run, len(pairs)
+
+
+def bench_purify_reduce(size):
+    Q = QNET.square_lattice(size, size, E, F)
+    u, v = corners(Q, size)
+    return lambda: QNET.purify_reduce(Q, u, v, threshold=4), 1
+
+
+def bench_swap_reduce(size):
+    Q = QNET.square_lattice(size, size, E, F)
+    u, v = corners(Q, size)
+    return lambda: QNET.swap_reduce(Q, u, v, threshold=4), 1
+
+
+def bench_simple_purify(size):
+    Q = QNET.square_lattice(size, size, E, F)
+    u, v = corners(Q, size)
+    return lambda: QNET.simple_purify(Q, u, v, threshold=4), 1
+
+
+def bench_monte_method(size):
+    Q = QNET.multidim_lattice(2, size, E, F)
+    pair_method = QNET.get_diagonal_pair_method(2, size, Q)
+    num_iters = 5
+    num_steps = 3
+
+    def run():
+        random.seed(0)
+        # monte_method reports its progress with print
+        with contextlib.redirect_stdout(io.StringIO()):
+            QNET.monte_method(Q, pair_method, QNET.purify_reduce, QNET.data_method, num_iters, num_steps)
+    return run, num_iters * num_steps
+
+
+def satellite_network(size):
+    """
+    A square lattice of ground nodes under "size" cartesian satellites, each with channels to four ground nodes
+    """
+    rng = random.Random(0)
+    Q = QNET.Qnet()
+    for i in range(size):
+        for j in range(size):
+            Q.add_qnode(name=f"({i}, {j})", qnode_type='Ground', coords=[i, j, 0])
+    for k in range(size):
+        Q.add_qnode(name=f"S{k}", qnode_type='Satellite', coords=[rng.uniform(0, size), rng.uniform(0, size), 10],
+                    v_cart=[rng.uniform(-1, 1), rng.uniform(-1, 1)])
+        for i in range(4):
+            Q.add_qchan(edge=(f"S{k}", f"({rng.randrange(size)}, {rng.randrange(size)})"))
+    return Q
+
+
+def bench_update(size):
+    Q = satellite_network(size)
+    return lambda: Q.update(1), size
+
+
+def bench_temporalGen(size):
+    Q = QNET.square_lattice(size, size, E, F)
+    for node in Q.nodes:
+        node.isMemory = True
+    n = 4
+    return lambda: QNET.temporalGen(Q, 1, n), n * size ** 2
+
+
+def bench_deepcopy(size):
+    Q = QNET.square_lattice(size, size, E, F)
+    return lambda: copy.deepcopy(Q), size ** 2
+
+
+def conversion_inputs(size):
+    """
+    Returns size^2 efficiencies and fidelities, drawn with a fixed seed
+    """
+    rng = np.random.default_rng(0)
+    return rng.uniform(0.5, 1, size ** 2).tolist(), rng.uniform(0.75, 1, size ** 2).tolist()
+
+
+def run_conversions(size, to_log, from_log, to_add_f, from_add_f):
+    es, fs = conversion_inputs(size)
+
+    def run():
+        for e, f in zip(es, fs):
+            from_log(to_log(e))
+            from_add_f(to_add_f(f))
+    return run, size ** 2
+
+
+def bench_conversions(size):
+    return run_conversions(size, QNET.to_log, QNET.from_log, QNET.to_add_f, QNET.from_add_f)
+
+
+def bench_conversions_collecting(size):
+    run, items = bench_conversions(size)
+
+    def run_collecting():
+        with QNET.collecting():
+            run()
+    return run_collecting, items
+
+
+def bench_conversions_uninstrumented(size):
+    """
+    The conversions of Costs.py without their instrumentation, as a baseline for its overhead while disabled
+    """
+    return run_conversions(size, lambda x: -np.log(x) + 0, lambda x: np.exp(-x),
+                           lambda x: -np.log(np.abs(2 * x - 1)) + 0, lambda x: (1 + np.exp(-1 * x)) / 2)
+
+
+# Dictionary between benchmark names and functions of the size that return (run, number of items per run)
+benchmarks = {
+    "getNode": bench_getNode,
+    "multidim_lattice": bench_multidim_lattice,
+    "square_lattice": bench_square_lattice,
+    "regularLatticeGen": bench_regularLatticeGen,
+    "best_path": bench_best_path,
+    "best_path_cost": bench_best_path_cost,
+    "purify_reduce": bench_purify_reduce,
+    "swap_reduce": bench_swap_reduce,
+    "simple_purify": bench_simple_purify,
+    "monte_method": bench_monte_method,
+    "update": bench_update,
+    "temporalGen": bench_temporalGen,
+    "deepcopy": bench_deepcopy,
+    "conversions": bench_conversions,
+    "conversions (collecting)": bench_conversions_collecting,
+    "conversions (uninstrumented)": bench_conversions_uninstrumented,
+}
+
+
+def run_benchmark(name, size, repeat=5):
+    """
+    Time one benchmark at one size
+
+    Parameters
+    ----------
+    name: str
+        Name of the benchmark in "benchmarks"
+    size: int
+    repeat: int, optional
+        Number of timed runs. (The default is 5)
+
+    Returns
+    -------
+    dict
+        Result with the keys "name", "size", "items", "best", "median", "throughput" and "peak_bytes", or "name",
+        "size" and "error" if the benchmark failed
+    """
+    np.random.seed(0)
+    random.seed(0)
+    try:
+        run, items = benchmarks[name](size)
+        run()
+        times = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+
+        # Peak memory is measured apart from the timings, since tracing slows everything down
+        tracemalloc.start()
+        run()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    except Exception as error:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return {"name": name, "size": size, "error": f"{type(error).__name__}: {error}"}
+
+    best = min(times)
+    return {"name": name, "size": size, "items": items, "best": best, "median": float(np.median(times)),
+            "throughput": items / best if best > 0 else None, "peak_bytes": peak}
+
+
+def run_benchmarks(sizes=(10, 20), names=None, repeat=5, log=None):
+    """
+    Run the benchmark suite
+
+    Parameters
+    ----------
+    sizes: list of int, optional
+        Sizes of the graphs. (The default is (10, 20))
+    names: list of str, optional
+        Benchmarks to run. (The default is None, which runs all of them)
+    repeat: int, optional
+        Number of timed runs of each benchmark. (The default is 5)
+    log: file, optional
+        If given, a line is written to it as each benchmark finishes
+
+    Returns
+    -------
+    dict
+        Report with the environment in "meta" and the results of run_benchmark in "results"
+    """
+    if names is None:
+        names = list(benchmarks)
+    for name in names:
+        assert name in benchmarks, f"Unknown benchmark: \'{name}\'"
+
+    results = []
+    for name in names:
+        for size in sizes:
+            result = run_benchmark(name, size, repeat)
+            results.append(result)
+            if log is not None:
+                if "error" in result:
+                    print(f"{name:>18} {size:>6}: {result['error']}", file=log)
+                else:
+                    print(f"{name:>18} {size:>6}: {result['best'] * 1000:10.3f} ms, "
+                          f"{result['peak_bytes'] / 2 ** 20:8.2f} MiB peak", file=log)
+
+    meta = {"python": platform.python_version(), "numpy": np.__version__, "networkx": nx.__version__,
+            "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": repeat}
+    return {"meta": meta, "results": results}
+
+
+def compare_benchmarks(report, baseline, threshold=0.1):
+    """
+    Compare a report of run_benchmarks with a baseline report
+
+    Parameters
+    ----------
+    report: dict
+    baseline: dict
+    threshold: float, optional
+        Largest accepted relative growth of the best time. (The default is 0.1, i.e. 10%)
+
+    Returns
+    -------
+    list of dict
+        For each benchmark and size in both reports, the keys "name", "size", "baseline", "best", "ratio" and
+        "regression"
+    """
+    previous = {(result["name"], result["size"]): result for result in baseline["results"] if "error" not in result}
+    comparisons = []
+    for result in report["results"]:
+        old = previous.get((result["name"], result["size"]))
+        if old is None or "error" in result:
+            continue
+        ratio = result["best"] / old["best"] if old["best"] > 0 else float("inf")
+        comparisons.append({"name": result["name"], "size": result["size"], "baseline": old["best"],
+                            "best": result["best"], "ratio": ratio, "regression": ratio > 1 + threshold})
+    return comparisons
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of QNET")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 20], help="Sizes of the graphs")
+    parser.add_argument("--only", nargs="+", default=None, choices=list(benchmarks), help="Benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs of each benchmark")
+    parser.add_argument("--output", default=None, help="File to write the JSON report to. Default is stdout")
+    parser.add_argument("--baseline", default=None, help="JSON report of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown from the baseline that counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.only, args.repeat, log=sys.stderr)
+
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        report["comparison"] = compare_benchmarks(report, baseline, args.threshold)
+        for comparison in report["comparison"]:
+            flag = "REGRESSION" if comparison["regression"] else ""
+            print(f"{comparison['name']:>18} {comparison['size']:>6}: {comparison['ratio']:6.2f}x baseline {flag}",
+                  file=sys.stderr)
+        regressions = [comparison for comparison in report["comparison"] if comparison["regression"]]
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    return 1 if len(regressions) > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -41,20 +41,22 @@ def percolate(Q, prob, pair_method):
     -------
     Qnet(), list of pairs in Qnet
     """
-    # Copy the graph and get pairs
-    C = copy.deepcopy(Q)
-    pairs = pair_method(C)
-    if type(pairs) is not list:
-        pairs = [pairs]
-
-    # Go through and mark random nodes not in pairs
-    kill_list = []
-    for node in C.nodes():
-        if any(node not in item for item in pairs):
-            xd = random.uniform(0,1)
-            if xd < prob:
-                kill_list.append(node)
-    C.remove_nodes_from(kill_list)
+    with QNET.collector_timer("percolate"):
+        # Copy the graph and get pairs
+        with QNET.collector_timer("percolate: deepcopy"):
+            C = copy.deepcopy(Q)
+        pairs = pair_method(C)
+        if type(pairs) is not list:
+            pairs = [pairs]
+
+        # Go through and mark random nodes not in pairs
+        kill_list = []
+        for node in C.nodes():
+            if any(node not in item for item in pairs):
+                xd = random.uniform(0,1)
+                if xd < prob:
+                    kill_list.append(node)
+        C.remove_nodes_from(kill_list)
     return C, pairs
 
 def reduce_graph(Q, pair_method, percolation_prob, reduction_method):
@@ -96,12 +98,15 @@ def reduce_graph(Q, pair_method, percolation_prob, reduction_method):
     # Get percolated graph and communication pairs
     P, pairs = percolate(Q, percolation_prob, pair_method)
     # Check if paths exist between pairs. If not, return None
-    for pair in pairs:
-        if nx.has_path(P, pair[0], pair[1]) is False:
-            return None, None
+    with QNET.collector_timer("reduce_graph: has_path"):
+        connected = all(nx.has_path(P, pair[0], pair[1]) for pair in pairs)
+    if connected is False:
+        QNET.collector_count("samples discarded (disconnected)")
+        return None, None
     # Run reduction method against P
     u, v = pairs[0]
-    R = reduction_method(P, head=u, tail=v)
+    with QNET.collector_timer("reduce_graph: reduction_method"):
+        R = reduction_method(P, head=u, tail=v)
     return R, pairs
 
 
@@ -126,10 +131,12 @@ def generate_graphs(Q, pair_method, reduction_method, num_iters, percolation_pro
     list of reduced graphs and their communication pairs
     """
     graph_list = []
-    for i in range(num_iters):
-        R, pairs = reduce_graph(Q, pair_method, percolation_prob, reduction_method)
-        # if R is not None:
-        graph_list.append((R, pairs))
+    with QNET.collector_timer("generate_graphs"):
+        for i in range(num_iters):
+            R, pairs = reduce_graph(Q, pair_method, percolation_prob, reduction_method)
+            # if R is not None:
+            graph_list.append((R, pairs))
+    QNET.collector_count("samples", num_iters)
     return graph_list
 
 
@@ -154,7 +161,7 @@ def data_method(Q, pairs):
     if Q is None or pairs is None:
         return {"e":0, "f":0.5}
 
-    df = pd.DataFrame()
+    rows = []
     for index, pair in enumerate(pairs):
         # Get shortest path between pairs in fidelity
         u, v = pair
@@ -165,9 +172,9 @@ def data_method(Q, pairs):
         cost_vector = QNET.cv_strip_add(cost_vector)
 
         # Add the costs to the DataFrame
-        df = df.append(pd.Series(cost_vector), ignore_index=True)
+        rows.append(cost_vector)
     # Convert data frame into single cost vector
-    meanie = df.mean()
+    meanie = pd.DataFrame(rows).mean()
     return meanie.to_dict()
 
 
@@ -218,28 +225,27 @@ def monte_method(Q, pair_method, reduction_method, data_method, num_iters, num_s
     main.update({"p": prob_list})
 
     # Collect mean and error for data points
-    for index, p in enumerate(prob_list):
-        print(f"-- Percolating graphs with probability {p} --")
-        graph_list = generate_graphs(Q, pair_method, reduction_method, num_iters, percolation_prob=p)
-
-        print("Collecting statistics...")
-        # minor contains raw data for all generated graphs for a given data point
-        minor = pd.DataFrame()
-        for R, pairs in graph_list:
-            data = data_method(R, pairs)
-            minor = minor.append(pd.Series(data), ignore_index=True)
-        # Compress minor DataFrame into mean and unbiased standard error
-        mean = minor.mean()
-        std = minor.sem()
-        # Add (std) qualifiers to standard error variables
-        for name, dummy in mean.items():
-            # mean = mean.rename({name: name + " (mean)"})
-            std = std.rename({name: name + " (std)"})
-        # Update main DataFrame with mean and std
-        for name, val in mean.items():
-            main.at[index, name] = val
-        for name, val in std.items():
-            main.at[index, name] = val
+    with QNET.collector_timer("monte_method"):
+        for index, p in enumerate(prob_list):
+            print(f"-- Percolating graphs with probability {p} --")
+            graph_list = generate_graphs(Q, pair_method, reduction_method, num_iters, percolation_prob=p)
+
+            print("Collecting statistics...")
+            # minor contains raw data for all generated graphs for a given data point
+            with QNET.collector_timer("monte_method: data_method"):
+                minor = pd.DataFrame([data_method(R, pairs) for R, pairs in graph_list])
+            # Compress minor DataFrame into mean and unbiased standard error
+            mean = minor.mean()
+            std = minor.sem()
+            # Add (std) qualifiers to standard error variables
+            for name, dummy in mean.items():
+                # mean = mean.rename({name: name + " (mean)"})
+                std = std.rename({name: name + " (std)"})
+            # Update main DataFrame with mean and std
+            for name, val in mean.items():
+                main.at[index, name] = val
+            for name, val in std.items():
+                main.at[index, name] = val
     return main
 
 
@@ -6,6 +6,9 @@ import networkx as nx
 import QNET
 import numpy as np
 import copy
+import heapq
+import itertools
+import math
 
 def remove_prefix(s, prefix):
     """
@@ -23,6 +26,8 @@ def remove_prefix(s, prefix):
     return s[len(prefix):] if s.startswith(prefix) else s
 
 # Basic conversions
+# These are called for every cost of every node and channel, so they only call collector_count while a collector is
+# active. See Instrumentation.py
 def to_log(x):
     """
     Convert a number to its negative log
@@ -35,6 +40,8 @@ def to_log(x):
     float
 
     """
+    if QNET.instrumentation['collector'] is not None:
+        QNET.collector_count("conversions (to_log)")
     return -np.log(x) + 0
 
 
@@ -50,6 +57,8 @@ def from_log(x):
     float
 
     """
+    if QNET.instrumentation['collector'] is not None:
+        QNET.collector_count("conversions (from_log)")
     return np.exp(-x)
 
 
@@ -66,6 +75,8 @@ def to_add_f(x):
     float
 
     """
+    if QNET.instrumentation['collector'] is not None:
+        QNET.collector_count("conversions (to_add_f)")
     return -np.log(np.abs(2 * x - 1)) + 0
 
 
@@ -81,6 +92,8 @@ def from_add_f(x):
     -------
     float
     """
+    if QNET.instrumentation['collector'] is not None:
+        QNET.collector_count("conversions (from_add_f)")
     return (1 + np.exp(-1 * x)) / 2
 
 
@@ -109,6 +122,8 @@ def make_cost_vector(Q, **kwargs):
         If any of the costs are out of their specified ranges
     """
 
+    if QNET.instrumentation['collector'] is not None:
+        QNET.collector_count("make_cost_vector calls")
     # The default cost vector
     cost_vector = copy.copy(Q.cost_vector)
     # The valid ranges of each cost
@@ -214,7 +229,218 @@ def convert_cost_vector(Q, cost_vector=None, add_cost_vector=None):
     return new_cv
 
 
-def best_path(Q, source, target, cost_type):
+def get_weight_function(cost_type):
+    """
+    Given an additive cost type, returns a corresponding weight function for use in the networkx shortest path
+    algorithms.
+
+    The weight of moving between nodes u and v is half of the node costs of u and v plus the cheapest of the parallel
+    edges between them. Since Qnet is a multigraph, networkx passes the weight function a dictionary between edge keys
+    and edge data.
+
+    Parameters
+    ----------
+    cost_type: str
+        Any valid additive cost from the cost vector, i.e. "add_e"
+
+    Returns
+    -------
+    function
+    """
+
+    def weight(u, v, d):
+        node_u_wt = u.costs[cost_type]
+        node_v_wt = v.costs[cost_type]
+        # Attempts to get edge weight, returns 1 if not found
+        edge_wt = min(data.get(cost_type, 1) for data in d.values())
+        return node_u_wt / 2 + node_v_wt / 2 + edge_wt
+        # Note that shortest path cost will need to be compensated with 1/2 head and 1/2 tail cost
+
+    return weight
+
+
+def get_heuristic(Q, target, cost_type):
+    """
+    Returns an admissible A* heuristic for reaching target in the additive cost cost_type.
+
+    The heuristic is the straight line distance between node coordinates multiplied by the smallest weight per unit
+    length of any edge in Q. By the triangle inequality no path can be cheaper than this, so the heuristic never
+    overestimates the remaining cost. If no edge has a nonzero length, the heuristic is zero and A* reduces to
+    Dijkstra's algorithm.
+
+    The rate is kept in the route cache of Q and brought up to date from the change log, by lowering it to the rates
+    of the changed edges and of the edges of changed or moved nodes. Removed edges and increased costs can only raise
+    the true rate, so the cached rate stays admissible without a rescan. The edges are only all scanned again when the
+    log no longer reaches back to the cached rate, or when it records a change that does not name its nodes or edges.
+
+    Parameters
+    ----------
+    Q: Qnet()
+    target: Qnode()
+    cost_type: str
+        Any valid additive cost from the cost vector, i.e. "add_e"
+
+    Returns
+    -------
+    function
+    """
+    cache = get_route_cache(Q)
+    cached = None if cache is None else cache.rates.get(cost_type)
+    if cached is None:
+        rate = edge_rate(Q.adj.items(), cost_type)
+    elif cached[0] == Q.version:
+        rate = cached[1]
+    else:
+        rate = update_rate(Q, cached[0], cached[1], cost_type)
+    if cache is not None:
+        cache.rates[cost_type] = (Q.version, rate)
+
+    if rate == np.inf:
+        rate = 0
+    target_coords = target.coords
+
+    def heuristic(u, v):
+        return rate * math.dist(u.coords, target_coords)
+
+    return heuristic
+
+
+def edge_rate(adjacency, cost_type):
+    """
+    Returns the smallest weight per unit length of the edges in an iterable of (node, {neighbour: keydict}), or inf
+    if none of them has a nonzero length
+    """
+    weight = get_weight_function(cost_type)
+    rate = np.inf
+    for u, nbrs in adjacency:
+        for v, keydict in nbrs.items():
+            length = math.dist(u.coords, v.coords)
+            if length > 0:
+                rate = min(rate, weight(u, v, keydict) / length)
+    return rate
+
+
+def update_rate(Q, version, rate, cost_type):
+    """
+    Brings the A* rate computed at a version of Q up to date with the change log. See get_heuristic
+
+    Returns
+    -------
+    float
+        The rate, or inf if no edge has a nonzero length
+    """
+    if len(Q.changes) == 0 or Q.changes[0][0] > version + 1:
+        return edge_rate(Q.adj.items(), cost_type)
+    nodes = set()
+    pairs = set()
+    for change_version, changed_nodes, changed_edges, costs, decreased in reversed(Q.changes):
+        if change_version <= version:
+            break
+        if len(changed_nodes) == 0 and len(changed_edges) == 0 and remove_prefix(cost_type, "add_") in decreased:
+            return edge_rate(Q.adj.items(), cost_type)
+        nodes.update(changed_nodes)
+        pairs.update((i, j) for i, j, key in changed_edges)
+    adjacency = []
+    for i in nodes:
+        node = Q.node_from_id(i)
+        if node is not None:
+            adjacency.append((node, Q.adj[node]))
+    for i, j in pairs:
+        u, v = Q.node_from_id(i), Q.node_from_id(j)
+        if u is not None and v is not None and v in Q.adj[u]:
+            adjacency.append((u, {v: Q.adj[u][v]}))
+    return min(rate, edge_rate(adjacency, cost_type))
+
+
+def get_route_cache(Q):
+    """
+    Returns the route cache of Q, or None if Q has no usable cache.
+
+    Frozen graphs such as subgraph views are not cached since they do not see the mutations of their parent graph.
+    """
+    if nx.is_frozen(Q):
+        return None
+    return getattr(Q, "route_cache", None)
+
+
+def get_edge_keys(Q, node_list, cost_type):
+    """
+    Given a list of nodes, returns the keys of the edges between successive nodes that minimise an additive cost
+
+    Parameters
+    ----------
+    Q: Qnet()
+    node_list: [Qnode()]
+    cost_type: str
+        Any valid additive cost from the cost vector, i.e. "add_e"
+
+    Returns
+    -------
+    [int]
+    """
+    edge_keys = []
+    for cur, nxt in zip(node_list[:-1], node_list[1:]):
+        keydict = Q.adj[cur][nxt]
+        edge_keys.append(min(keydict, key=lambda k: keydict[k].get(cost_type, 1)))
+    return edge_keys
+
+
+def shortest_path(Q, source, target, cost_type, method='dijkstra'):
+    """
+    Returns the length and the list of nodes of the shortest path between source and target for an additive cost.
+
+    Parameters
+    ----------
+    Q: Qnet()
+    source: Qnode()
+    target: Qnode()
+    cost_type: str
+        Any valid additive cost from the cost vector, i.e. "add_e"
+    method: str {'dijkstra', 'astar', 'bidirectional'}, optional
+        Search strategy
+
+        dijkstra: Dijkstra's algorithm from source
+        astar: A* search with the geometric heuristic from get_heuristic
+        bidirectional: Dijkstra's algorithm from both source and target
+        (The default is 'dijkstra')
+
+    Returns
+    -------
+    float, [Qnode()]
+        Shortest path length (without the 1/2 head and 1/2 tail cost) and the list of nodes in the path
+    """
+    edge_weight = get_weight_function(cost_type)
+    weight = edge_weight
+    collector = QNET.get_collector()
+    if collector is not None:
+        collector.count(f"searches ({method})")
+        # Count the edges weighed and the nodes they are weighed from
+        popped = set()
+        relaxed = [0]
+
+        def weight(u, v, d):
+            popped.add(u)
+            relaxed[0] += 1
+            return edge_weight(u, v, d)
+    if method == 'dijkstra':
+        length, node_list = nx.single_source_dijkstra(Q, source, target, weight=weight)
+    elif method == 'astar':
+        heuristic = get_heuristic(Q, target, cost_type)
+        node_list = nx.astar_path(Q, source, target, heuristic, weight)
+        # The length is not part of the search, so it is not counted
+        length = sum(edge_weight(u, v, Q.adj[u][v]) for u, v in zip(node_list[:-1], node_list[1:]))
+    elif method == 'bidirectional':
+        length, node_list = nx.bidirectional_dijkstra(Q, source, target, weight)
+    else:
+        raise ValueError(f"Unsupported method: \'{method}\'")
+    if collector is not None:
+        collector.count("edges relaxed", relaxed[0])
+        collector.observe("nodes popped per search", len(popped))
+        collector.observe("edges relaxed per search", relaxed[0])
+    return length, node_list
+
+
+def best_path(Q, source, target, cost_type, method='dijkstra'):
     """
     Given a source node, target node, and a cost type, this function returns the path that optimises this cost.
     
@@ -224,31 +450,21 @@ def best_path(Q, source, target, cost_type):
     source: Union[string, Qnode()]
     target: Union[string, Qnode()]
     cost_type: string
+    method: str {'dijkstra', 'astar', 'bidirectional'}, optional
+        Search strategy. See shortest_path for details. (The default is 'dijkstra')
 
     Returns
     -------
     Path()
 
-    """
-    def get_weight_function(costType):
-        """
-        Given a costType, returns a corresponding weight_function
-        for use in nx.shortest_path_length
-
-        :param string costType: cost type in ['e', 'p']
-        :return: weight function
-        """
-
-        def weight(u, v, d):
-            node_u_wt = u.costs[costType]
-            node_v_wt = v.costs[costType]
-            # Attempts to get edge weight, returns 1 if not found
-            edge_wt = d.get(costType, 1)
-            return node_u_wt / 2 + node_v_wt / 2 + edge_wt
-            # Note that shortest path cost will need to be compensated with 1/2 head and 1/2 tail cost
-
-        return weight
+    Notes
+    -----
+    Results are kept in Q.route_cache and reused for as long as the route is known to stay optimal.
+    See Qnet.changed_since for details.
 
+    Q may also be a QnetSnapshot or SharedQnet, in which case the path is found with QnetSnapshot.best_path and
+    returned as a SnapshotPath. method is ignored for snapshots.
+    """
     def picky_path(Q, node_list, cost_type):
         """
         Given a list of nodes for the shortest path in cost_type, this function returns a QNET.Path object specifying
@@ -264,27 +480,19 @@ def best_path(Q, source, target, cost_type):
         node_list: [Qnode()]
             list of nodes in the shortest path
         cost_type: str
-            Any valid cost from the cost vector
+            Any valid additive cost from the cost vector
 
         Returns
         -------
         Path()
         """
-        edge_keys = []
-        path_len = len(node_list)
-        i = 0
-        while i < path_len - 1:
-            cur = node_list[i]
-            nxt = node_list[i + 1]
-            edge_num = Q.number_of_edges(cur, nxt)
-            edge_list = [Q.edges[cur, nxt, j] for j in range(edge_num)]
-            seq = [e[cost_type] for e in edge_list]
-            key = seq.index(max(seq))
-            edge_keys.append(key)
-            i += 1
+        edge_keys = get_edge_keys(Q, node_list, cost_type)
         return QNET.Path(Q, node_list, edge_keys)
 
     # MAIN
+    QNET.collector_count("best_path calls")
+    if isinstance(Q, QNET.QnetSnapshot):
+        return Q.best_path(source, target, cost_type)
     source = Q.getNode(source)
     target = Q.getNode(target)
 
@@ -293,13 +501,24 @@ def best_path(Q, source, target, cost_type):
     # Change cost type to additive
     cost_type = "add_" + cost_type
 
-    weight = get_weight_function(cost_type)
-    node_list = nx.dijkstra_path(Q, source, target, weight)
+    # Return the cached route if it is still optimal
+    cache = get_route_cache(Q)
+    cache_key = (source, target, cost_type, 'path')
+    if cache is not None:
+        cached = cache.get(Q, cache_key, remove_prefix(cost_type, "add_"))
+        QNET.collector_count("route cache misses" if cached is None else "route cache hits")
+        if cached is not None:
+            return QNET.Path(Q, *cached)
+
+    length, node_list = shortest_path(Q, source, target, cost_type, method)
     short_path = picky_path(Q, node_list, cost_type)
+    if cache is not None:
+        cache.put(Q, cache_key, short_path.node_array, short_path.edge_keys,
+                  (short_path.node_array, short_path.edge_keys))
     return short_path
 
 ### OUTMODED
-def best_path_cost(Q, source, target, cost_type):
+def best_path_cost(Q, source, target, cost_type, method='dijkstra'):
     """
     Get the lowest path cost in a Qnet for a given costType.
     Considers edge weights and node weights
@@ -308,28 +527,15 @@ def best_path_cost(Q, source, target, cost_type):
     :param Union[str, Qnode] source: Source node
     :param Union[str, Qnode] target: Target node
     :param str costType: Any of {'e', 'p', 'de', 'dp'}
+    :param str method: Search strategy in {'dijkstra', 'astar', 'bidirectional'}. See shortest_path for details.
     :return: float length of shortest path in units of costType
-    """
-
-    def get_weight_function(costType):
-        """
-        Given a costType, returns a corresponding weight_function
-        for use in nx.shortest_path_length
-
-        :param string costType: cost type in ['e', 'p']
-        :return: weight function
-        """
-
-        def weight(u, v, d):
-            node_u_wt = u.costs[costType]
-            node_v_wt = v.costs[costType]
-            # Attempts to get edge weight, returns 1 if not found
-            edge_wt = d.get(costType, 1)
-            return node_u_wt / 2 + node_v_wt / 2 + edge_wt
-            # Note that shortest path cost will need to be compensated with 1/2 head and 1/2 tail cost
-
-        return weight
 
+    Results are kept in Q.route_cache and reused for as long as the route is known to stay optimal.
+    Q may also be a QnetSnapshot or SharedQnet, in which case method is ignored.
+    """
+    QNET.collector_count("best_path_cost calls")
+    if isinstance(Q, QNET.QnetSnapshot):
+        return Q.best_path_cost(source, target, cost_type)
     source = Q.getNode(source)
     target = Q.getNode(target)
 
@@ -338,14 +544,476 @@ def best_path_cost(Q, source, target, cost_type):
     # Change cost type to additive
     cost_type = "add_" + cost_type
 
+    # Return the cached cost if the route is still optimal
+    cache = get_route_cache(Q)
+    cache_key = (source, target, cost_type, 'cost')
+    if cache is not None:
+        cached = cache.get(Q, cache_key, remove_prefix(cost_type, "add_"))
+        QNET.collector_count("route cache misses" if cached is None else "route cache hits")
+        if cached is not None:
+            return cached
+
     # Calculate best cost in terms of additive cost
-    weight = get_weight_function(cost_type)
-    cost = nx.shortest_path_length(Q, source, target, weight)
+    cost, node_list = shortest_path(Q, source, target, cost_type, method)
     # Compensate shortest path cost with 1/2 head cost and 1/2 tail cost
     cost += source.costs[cost_type] / 2 + target.costs[cost_type] / 2
 
     # Convert multiplicative costs back to additive costs
-    back_convert = conversions[cost_type.strip("_add")][1]
+    back_convert = conversions[remove_prefix(cost_type, "add_")][1]
     cost = back_convert(cost)
 
+    if cache is not None:
+        cache.put(Q, cache_key, node_list, get_edge_keys(Q, node_list, cost_type), cost)
     return cost
+
+
+class DynamicRouter:
+    def __init__(self, Q, source, cost_type):
+        """
+        Shortest path tree from a source node that is repaired, rather than recomputed, when the Qnet changes.
+
+        The router reads the change log of Q (See Qnet.touch) and only revisits the part of the tree affected by the
+        changed nodes and channels. Nodes whose tree edge became more expensive are detached along with their
+        descendants and reattached from their unaffected neighbours, after which distances are propagated from these
+        nodes and from the endpoints of every changed channel, in the manner of the Ramalingam-Reps algorithm.
+        If the change log no longer reaches back to the last repair, the tree is rebuilt from scratch.
+
+        Parameters
+        ----------
+        Q: Qnet()
+        source: Union[string, Qnode()]
+        cost_type: str
+            Any valid cost from the cost vector
+
+        Examples
+        --------
+        Track the optimal efficiency between two nodes as a satellite moves
+        >>> router = QNET.DynamicRouter(Q, 'A', 'e')
+        >>> for i in range(100):
+        >>>     costs.append(router.cost('B'))
+        >>>     Q.update(dt)
+        """
+        assert cost_type in Q.conversions, \
+            f"Invalid cost type. \"{cost_type}\" not in {str([key for key in Q.conversions])}"
+        self.Q = Q
+        self.source = Q.getNode(source)
+        assert self.source is not None, f"Node {source} is not in Q"
+        self.cost_type = cost_type
+        self.add_cost_type = "add_" + cost_type
+        self.weight = get_weight_function(self.add_cost_type)
+        self.reset()
+
+    def reset(self):
+        """
+        Rebuild the shortest path tree from scratch
+        """
+        self.dist = {}
+        self.parent = {}
+        self.children = {}
+        self.version = self.Q.version
+        if self.source not in self.Q:
+            return
+        self.dist[self.source] = 0
+        self.parent[self.source] = None
+        counter = itertools.count()
+        self._propagate([(0, next(counter), self.source)], counter)
+
+    def _edge_weight(self, u, v):
+        if u in self.Q and v in self.Q.adj[u]:
+            return self.weight(u, v, self.Q.adj[u][v])
+        return np.inf
+
+    def _set_parent(self, v, u):
+        old = self.parent.get(v)
+        if old is not None:
+            self.children[old].discard(v)
+        self.parent[v] = u
+        if u is not None:
+            self.children.setdefault(u, set()).add(v)
+
+    def _propagate(self, heap, counter):
+        """Label correcting Dijkstra from the nodes in heap"""
+        dist = self.dist
+        while heap:
+            d, _, u = heapq.heappop(heap)
+            if d > dist.get(u, np.inf):
+                continue
+            for v, keydict in self.Q.adj[u].items():
+                nd = d + self.weight(u, v, keydict)
+                if nd < dist.get(v, np.inf):
+                    dist[v] = nd
+                    self._set_parent(v, u)
+                    heapq.heappush(heap, (nd, next(counter), v))
+
+    def repair(self):
+        """
+        Bring the shortest path tree up to date with the changes made to Q since the last repair
+        """
+        Q = self.Q
+        if self.version == Q.version:
+            return
+        # The tree is also rebuilt while the source is, or was at the last repair, out of Q
+        if len(Q.changes) == 0 or Q.changes[0][0] > self.version + 1 or self.source not in self.dist:
+            self.reset()
+            return
+
+        # Collect the changed node pairs
+        pairs = set()
+        missing = set()
+        for version, nodes, edges, costs, decreased in Q.changes:
+            if version <= self.version or self.cost_type not in costs:
+                continue
+            for i, j, key in edges:
+                u, v = Q.node_from_id(i), Q.node_from_id(j)
+                # Edges of removed nodes are handled with the nodes
+                if u is not None and v is not None:
+                    pairs.add((u, v))
+            for i in nodes:
+                node = Q.node_from_id(i)
+                if node is not None:
+                    pairs.update((node, nbr) for nbr in Q.adj[node])
+                else:
+                    missing.add(i)
+        # Removed nodes are only known to the tree by their ids
+        removed = set()
+        if len(missing) > 0:
+            removed = {node for node in self.dist if id(node) in missing}
+
+        # Tree edges that became more expensive detach their subtrees
+        eps = 1e-12
+        roots = set()
+        for node in removed:
+            roots.update(self.children.get(node, ()))
+        for u, v in pairs:
+            for a, b in ((u, v), (v, u)):
+                if self.parent.get(b) is a and b not in roots:
+                    if self._edge_weight(a, b) > self.dist[b] - self.dist[a] + eps:
+                        roots.add(b)
+
+        affected = set()
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if node in affected:
+                continue
+            affected.add(node)
+            stack.extend(self.children.get(node, ()))
+        for node in affected | removed:
+            self.dist.pop(node, None)
+            self._set_parent(node, None)
+            self.parent.pop(node, None)
+        for node in removed:
+            self.children.pop(node, None)
+
+        # Reattach detached nodes to their best unaffected neighbour, and relax the changed pairs
+        counter = itertools.count()
+        heap = []
+        for node in affected:
+            if node not in Q:
+                continue
+            for nbr, keydict in Q.adj[node].items():
+                if nbr in self.dist:
+                    nd = self.dist[nbr] + self.weight(nbr, node, keydict)
+                    if nd < self.dist.get(node, np.inf):
+                        self.dist[node] = nd
+                        self._set_parent(node, nbr)
+            if node in self.dist:
+                heapq.heappush(heap, (self.dist[node], next(counter), node))
+        for u, v in pairs:
+            for a, b in ((u, v), (v, u)):
+                if a in self.dist and b in Q:
+                    nd = self.dist[a] + self._edge_weight(a, b)
+                    if nd < self.dist.get(b, np.inf):
+                        self.dist[b] = nd
+                        self._set_parent(b, a)
+                        heapq.heappush(heap, (nd, next(counter), b))
+        self._propagate(heap, counter)
+        self.version = Q.version
+
+    def node_list(self, target):
+        """
+        Returns the list of nodes of the shortest path from the source to target
+
+        Raises
+        ------
+        NetworkXNoPath
+            If target is not reachable from the source
+        """
+        self.repair()
+        target = self.Q.getNode(target)
+        if target not in self.dist:
+            raise nx.NetworkXNoPath(f"No path exists from {self.source} to {target}")
+        node_list = [target]
+        while node_list[-1] is not self.source:
+            node_list.append(self.parent[node_list[-1]])
+        return node_list[::-1]
+
+    def path(self, target):
+        """
+        Returns the shortest path from the source to target as a Path() like best_path
+        """
+        node_list = self.node_list(target)
+        return QNET.Path(self.Q, node_list, get_edge_keys(self.Q, node_list, self.add_cost_type))
+
+    def cost(self, target):
+        """
+        Returns the lowest path cost from the source to target like best_path_cost
+        """
+        self.repair()
+        target = self.Q.getNode(target)
+        if target not in self.dist:
+            raise nx.NetworkXNoPath(f"No path exists from {self.source} to {target}")
+        cost = self.dist[target]
+        # Compensate shortest path cost with 1/2 head cost and 1/2 tail cost
+        cost += self.source.costs[self.add_cost_type] / 2 + target.costs[self.add_cost_type] / 2
+        return self.Q.conversions[self.cost_type][1](cost)
+
+
+def constrained_best_path(Q, source, target, cost_type, bounds, max_iter=20, tol=1e-9):
+    """
+    Given a source node, target node, and a cost type, this function returns the path that optimises this cost
+    subject to bounds on other costs.
+
+    The problem is solved as a resource constrained shortest path problem over the additive costs. Lagrangian
+    relaxation of the bounds gives a lower bound on the optimal cost together with feasible candidate paths, and a
+    best-first label correcting search then closes the gap. Partial paths are pruned by resource feasibility,
+    the Lagrangian bound and label dominance, so that only a small part of the graph is explored on large lattices.
+
+    Parameters
+    ----------
+    Q: Qnet()
+    source: Union[string, Qnode()]
+    target: Union[string, Qnode()]
+    cost_type: string
+        Cost to optimise. Any valid cost from the cost vector
+    bounds: dict [str, float]
+        Dictionary between cost types and their bound
+
+        For each item, the additive cost "add_cost" of the path may not exceed conversions[cost][0](bound). For the
+        default costs this means that the cost of the path is at least the bound, i.e. {'f': 0.9} asks for paths
+        with fidelity no lower than 0.9.
+    max_iter: int, optional
+        Maximum number of subgradient iterations used for the Lagrangian bound. The default is 20.
+    tol: float, optional
+        Numerical tolerance for bound checks. The default is 1e-9.
+
+    Returns
+    -------
+    Path()
+
+    Raises
+    ------
+    AssertionError
+        If cost_type or any of the bounded costs is invalid
+    NetworkXNoPath
+        If no path between source and target satisfies the bounds
+
+    Warnings
+    --------
+    All additive costs are assumed to be non-negative, which is true of the default conversions.
+
+    Examples
+    --------
+    Find the most efficient path with fidelity of at least 0.8
+    >>> Q = QNET.square_lattice(10, 10, 0.9, 0.95)
+    >>> path = QNET.constrained_best_path(Q, "(0, 0)", "(9, 9)", 'e', {'f': 0.8})
+    """
+    source = Q.getNode(source)
+    target = Q.getNode(target)
+    assert source is not None and target is not None, "Source and target must be nodes in Q"
+
+    conversions = Q.conversions
+    assert cost_type in conversions, f"Invalid cost type. \"{cost_type}\" not in {str([key for key in conversions])}"
+    for bound_type, bound in bounds.items():
+        assert bound_type in conversions, \
+            f"Invalid cost type. \"{bound_type}\" not in {str([key for key in conversions])}"
+        cost_min, cost_max = Q.cost_ranges[bound_type]
+        assert (cost_min <= bound <= cost_max), f"Out of range -- ({cost_min} <= {bound_type} <= {cost_max}), " + \
+                                                f"{bound_type} == {bound}"
+
+    # Additive cost to minimise, and additive resources with their ceilings
+    obj = "add_" + cost_type
+    res_keys = ["add_" + bound_type for bound_type in bounds]
+    res_max = [conversions[bound_type][0](bound) for bound_type, bound in bounds.items()]
+    num_res = len(res_keys)
+
+    def arc_costs(data, v):
+        """Return the (objective, resources) cost of moving along an edge into node v"""
+        c = data[obj] + v.costs[obj]
+        r = tuple(data[k] + v.costs[k] for k in res_keys)
+        return c, r
+
+    def reverse_dijkstra(arc_weight):
+        """
+        Shortest distances from every node to target for a given arc weight. The successor of each node on its
+        shortest path is returned alongside the distances as a (node, key) pair.
+        """
+        dist = {target: 0}
+        succ = {target: None}
+        done = set()
+        counter = itertools.count()
+        heap = [(0, next(counter), target)]
+        while heap:
+            d, _, v = heapq.heappop(heap)
+            if v in done:
+                continue
+            done.add(v)
+            for u, keydict in Q.adj[v].items():
+                if u in done:
+                    continue
+                for key, data in keydict.items():
+                    nd = d + arc_weight(data, v)
+                    if u not in dist or nd < dist[u]:
+                        dist[u] = nd
+                        succ[u] = (v, key)
+                        heapq.heappush(heap, (nd, next(counter), u))
+        return dist, succ
+
+    def follow(succ):
+        """Walk the successor tree from source to target and return the node list and edge keys"""
+        node_list = [source]
+        edge_keys = []
+        cur = source
+        while cur != target:
+            nxt, key = succ[cur]
+            node_list.append(nxt)
+            edge_keys.append(key)
+            cur = nxt
+        return node_list, edge_keys
+
+    def evaluate(node_list, edge_keys):
+        """Return the additive objective and resources of a path"""
+        c = source.costs[obj]
+        r = [source.costs[k] for k in res_keys]
+        for i, key in enumerate(edge_keys):
+            dc, dr = arc_costs(Q.adj[node_list[i]][node_list[i + 1]][key], node_list[i + 1])
+            c += dc
+            r = [a + b for a, b in zip(r, dr)]
+        return c, r
+
+    def feasible(r):
+        return all(r[k] <= res_max[k] + tol for k in range(num_res))
+
+    # Lower bounds on the remaining objective and resources from each node to the target
+    h_obj, succ_obj = reverse_dijkstra(lambda data, v: data[obj] + v.costs[obj])
+    if source not in h_obj:
+        raise nx.NetworkXNoPath(f"No path exists from {source} to {target}")
+    h_res = []
+    candidates = [follow(succ_obj)]
+    for k in range(num_res):
+        dist, succ = reverse_dijkstra(lambda data, v, key=res_keys[k]: data[key] + v.costs[key])
+        h_res.append(dist)
+        candidates.append(follow(succ))
+
+    # Upper bound from the unconstrained candidates
+    best = None
+    upper = np.inf
+    for node_list, edge_keys in candidates:
+        c, r = evaluate(node_list, edge_keys)
+        if feasible(r) and c < upper:
+            upper = c
+            best = (node_list, edge_keys)
+
+    # Lagrangian relaxation of the bounds by subgradient optimisation
+    def lagrangian_weight(lam):
+        def weight(data, v):
+            c, r = arc_costs(data, v)
+            return c + sum(lam[k] * r[k] for k in range(num_res))
+        return weight
+
+    lam = [0.] * num_res
+    best_lam = lam
+    h_lam = h_obj
+    lower = h_obj[source] + source.costs[obj]
+    theta = 2.
+    for i in range(max_iter):
+        if upper - lower <= tol:
+            break
+        dist, succ = reverse_dijkstra(lagrangian_weight(lam))
+        node_list, edge_keys = follow(succ)
+        c, r = evaluate(node_list, edge_keys)
+        relaxed = c + sum(lam[k] * (r[k] - res_max[k]) for k in range(num_res))
+        if relaxed > lower:
+            lower = relaxed
+            best_lam = lam
+            h_lam = dist
+        else:
+            theta /= 2
+        if feasible(r) and c < upper:
+            upper = c
+            best = (node_list, edge_keys)
+        grad = [r[k] - res_max[k] for k in range(num_res)]
+        norm = sum(g ** 2 for g in grad)
+        if norm == 0:
+            break
+        # Step towards the upper bound, or an estimate of it if no feasible path is known yet
+        estimate = upper if upper < np.inf else lower + max(abs(lower), 1)
+        step = theta * (estimate - lower) / norm
+        lam = [max(0., lam[k] + step * grad[k]) for k in range(num_res)]
+
+    if upper - lower <= tol:
+        return QNET.Path(Q, *best)
+
+    # Label correcting search. A label is [objective, resources, node, key, parent, dominated]
+    lam = best_lam
+    lam_offset = sum(lam[k] * res_max[k] for k in range(num_res))
+    labels = {node: [] for node in Q.nodes()}
+    counter = itertools.count()
+    start = [source.costs[obj], tuple(source.costs[k] for k in res_keys), source, None, None, False]
+    labels[source].append(start)
+    heap = [(start[0] + h_obj[source], next(counter), start)]
+
+    while heap:
+        priority, _, label = heapq.heappop(heap)
+        if label[5]:
+            continue
+        if priority >= upper - tol:
+            break
+        c, r, u = label[0], label[1], label[2]
+        if u == target:
+            if feasible(r):
+                upper = c
+                best = label
+                break
+            continue
+        for v, keydict in Q.adj[u].items():
+            if v not in h_obj:
+                continue
+            for key, data in keydict.items():
+                dc, dr = arc_costs(data, v)
+                nc = c + dc
+                nr = tuple(a + b for a, b in zip(r, dr))
+                # Prune on the objective, the resource bounds, and the Lagrangian bound
+                if nc + h_obj[v] >= upper - tol:
+                    continue
+                if any(nr[k] + h_res[k][v] > res_max[k] + tol for k in range(num_res)):
+                    continue
+                if nc + sum(lam[k] * nr[k] for k in range(num_res)) + h_lam[v] - lam_offset >= upper - tol:
+                    continue
+                # Prune dominated labels, and mark labels dominated by the new one
+                existing = labels[v]
+                if any(old[0] <= nc and all(a <= b for a, b in zip(old[1], nr)) for old in existing):
+                    continue
+                for old in existing:
+                    if nc <= old[0] and all(a <= b for a, b in zip(nr, old[1])):
+                        old[5] = True
+                existing[:] = [old for old in existing if not old[5]]
+                new_label = [nc, nr, v, key, label, False]
+                existing.append(new_label)
+                heapq.heappush(heap, (nc + h_obj[v], next(counter), new_label))
+
+    if best is None:
+        raise nx.NetworkXNoPath(f"No path from {source} to {target} satisfies {bounds}")
+    if isinstance(best, tuple):
+        return QNET.Path(Q, *best)
+
+    # Rebuild the path from the target label
+    node_list = []
+    edge_keys = []
+    label = best
+    while label is not None:
+        node_list.append(label[2])
+        if label[3] is not None:
+            edge_keys.append(label[3])
+        label = label[4]
+    return QNET.Path(Q, node_list[::-1], edge_keys[::-1])
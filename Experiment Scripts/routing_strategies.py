@@ -0,0 +1,55 @@
+"""
+In this file, we compare the number of nodes expanded by the point-to-point search strategies available to best_path
+("dijkstra", "astar" and "bidirectional") on square and multidimensional lattices.
+"""
+
+from QNET import *
+import time
+
+e = 0.99
+f = 0.995
+
+
+def counting_weight(cost_type, expanded):
+    """Wrap the weight function used by best_path so that every node it expands from is recorded"""
+    weight = get_weight_function(cost_type)
+
+    def counted(u, v, d):
+        expanded.add(u)
+        return weight(u, v, d)
+    return counted
+
+
+def run_search(Q, u, v, method, cost_type='add_e'):
+    """Run one search in the same way as QNET.shortest_path and return (expansions, length, seconds)"""
+    expanded = set()
+    weight = counting_weight(cost_type, expanded)
+    start = time.perf_counter()
+    if method == 'dijkstra':
+        length, node_list = single_source_dijkstra(Q, u, v, weight=weight)
+    elif method == 'astar':
+        heuristic = get_heuristic(Q, v, cost_type)
+        node_list = astar_path(Q, u, v, heuristic, weight)
+        length = sum(get_weight_function(cost_type)(a, b, Q.adj[a][b]) for a, b in zip(node_list[:-1], node_list[1:]))
+    else:
+        length, node_list = bidirectional_dijkstra(Q, u, v, weight)
+    elapsed = time.perf_counter() - start
+    return len(expanded), length, elapsed
+
+
+def compare_strategies():
+    graphs = [("square_lattice 30x30", square_lattice(30, 30, e, f), "(0, 0)", "(29, 15)"),
+              ("square_lattice 60x60", square_lattice(60, 60, e, f), "(0, 0)", "(59, 30)"),
+              ("multidim_lattice dim=2 size=40", multidim_lattice(2, 40, e, f), "(0, 0)", "(20, 39)"),
+              ("multidim_lattice dim=3 size=12", multidim_lattice(3, 12, e, f), "(0, 0, 0)", "(11, 5, 11)")]
+
+    for name, Q, u, v in graphs:
+        print(f"-- {name}: {Q.number_of_nodes()} nodes, {Q.number_of_edges()} edges --")
+        u = Q.getNode(u)
+        v = Q.getNode(v)
+        for method in ["dijkstra", "astar", "bidirectional"]:
+            expansions, length, elapsed = run_search(Q, u, v, method)
+            print(f"{method:>14}: {expansions:6d} nodes expanded, path length {length:.6f}, {elapsed * 1000:.1f} ms")
+
+
+compare_strategies()
@@ -15,6 +15,12 @@ def multidim_lattice(dim, size, e, f, periodic=False):
     G = nx.grid_graph(dim, periodic)
 
     Q = QNET.Qnet()
+    # Position the nodes at their lattice coordinates if they fit in three dimensions
+    if len(dim) <= 3:
+        for node in G.nodes():
+            coords = list(node) if isinstance(node, tuple) else [node]
+            Q.add_qnode(name=str(node), qnode_type="Ground", coords=coords + [0] * (3 - len(coords)))
+
     for edge in G.edges():
         u = edge[0]
         v = edge[1]
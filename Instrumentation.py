@@ -0,0 +1,313 @@
+"""
+Instrumentation.py contains an opt-in collector of timings and counts for profiling QNET without a profiler.
+
+Instrumented code asks for the active collector and records into it. While no collector is active, timers are a
+shared null context and counts return immediately, so instrumentation costs next to nothing when disabled. The
+hottest call sites (the cost conversions, make_cost_vector and getNode) check instrumentation['collector'] themselves
+and skip the call entirely. The "conversions" benchmarks of Benchmarks.py measure what is left.
+
+>>> collector = QNET.Collector()
+>>> with QNET.collecting(collector):
+...     df = QNET.monte_method(Q, pair_method, QNET.purify_reduce, QNET.data_method, 100, 10)
+>>> collector.to_dataframe()
+
+Phases timed in Bramble:
+    percolate, percolate: deepcopy, reduce_graph: has_path, reduce_graph: reduction_method, generate_graphs,
+    monte_method, monte_method: data_method
+
+Events counted:
+    samples, samples discarded (disconnected): Graphs generated by generate_graphs, and those without a path
+        between a pair of communication parties
+    searches (dijkstra), searches (astar), searches (bidirectional): Shortest path searches by method
+    searches (disjoint): Min-cost flow solves for disjoint paths by disjoint_paths
+    edges relaxed: Evaluations of the edge weight function in shortest path searches
+    route cache hits, route cache misses: Lookups of best_path and best_path_cost in the route cache
+    best_path calls, best_path_cost calls
+    getNode calls, getNode scans: Lookups of nodes by name, and those that scan the nodes of a graph view
+    make_cost_vector calls
+    conversions (to_log), conversions (from_log), conversions (to_add_f), conversions (from_add_f): Calls to the
+        default cost conversion functions
+
+Histograms observed:
+    nodes popped per search, edges relaxed per search: Nodes expanded and edges weighed by each shortest path
+        search
+"""
+
+import collections
+import contextlib
+import os
+import threading
+import time
+import pandas as pd
+
+# The active collector, or None while instrumentation is disabled
+instrumentation = {'collector': None}
+
+# Timer handed out while instrumentation is disabled
+null_timer = contextlib.nullcontext()
+
+
+class Collector:
+    def __init__(self):
+        """
+        Accumulates the time spent in named phases, counts of named events and histograms of named quantities
+
+        Each thread records into its own shard of the collector, so threads never contend for the same counters. The
+        shards are merged when the collector is read. Processes record into their own collectors, whose snapshots
+        are merged with merge or merge_snapshots. For example, with a pool of workers:
+
+        >>> def task(args):
+        ...     with QNET.collecting() as collector:
+        ...         result = work(args)
+        ...     return result, collector.snapshot()
+        >>> collector = QNET.Collector()
+        >>> for result, snapshot in pool.map(task, tasks):
+        ...     collector.merge(snapshot)
+
+        Attributes
+        ----------
+        seconds: dict [str, float]
+            Total time spent in each phase
+        calls: dict [str, int]
+            Number of times each phase was entered
+        counts: dict [str, int]
+            Count of each event
+        histograms: dict [str, collections.Counter]
+            Number of times each value of a quantity was observed
+        """
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards = []
+        # Other processes whose snapshots were merged into the collector
+        self.processes = set()
+
+    def shard(self):
+        """
+        Returns the shard of the calling thread
+        """
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = {"seconds": collections.defaultdict(float), "calls": collections.defaultdict(int),
+                     "counts": collections.defaultdict(int), "histograms": collections.defaultdict(collections.Counter)}
+            with self.lock:
+                self.shards.append(shard)
+            self.local.shard = shard
+            return shard
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """
+        Context manager that adds the time spent inside it to the phase "name"
+        """
+        shard = self.shard()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            shard["seconds"][name] += time.perf_counter() - start
+            shard["calls"][name] += 1
+
+    def count(self, name, n=1):
+        """
+        Add n to the count of the event "name"
+        """
+        self.shard()["counts"][name] += n
+
+    def observe(self, name, value):
+        """
+        Add an observation of a value of the quantity "name" to its histogram
+        """
+        self.shard()["histograms"][name][value] += 1
+
+    def counting(self, function, name):
+        """
+        Wrap a function so that every call to it is counted as the event "name"
+        """
+        counts = self.shard()["counts"]
+
+        def counted(*args, **kwargs):
+            counts[name] += 1
+            return function(*args, **kwargs)
+        return counted
+
+    def snapshot(self):
+        """
+        Returns the merged records of all threads as a dictionary of plain dictionaries, which can be pickled and
+        passed between processes
+
+        Returns
+        -------
+        dict
+            {"seconds": dict, "calls": dict, "counts": dict, "histograms": {name: {value: int}}, "processes": [int]}
+        """
+        with self.lock:
+            shards = list(self.shards)
+        snapshot = {"seconds": {}, "calls": {}, "counts": {}, "histograms": {},
+                    "processes": sorted(self.processes | {os.getpid()})}
+        for shard in shards:
+            merge_records(snapshot, shard)
+        return snapshot
+
+    def merge(self, snapshot):
+        """
+        Add the records of a snapshot, i.e. from a worker process, to the collector
+        """
+        merge_records(self.shard(), snapshot)
+        with self.lock:
+            self.processes.update(snapshot.get("processes", []))
+
+    @property
+    def seconds(self):
+        return self.snapshot()["seconds"]
+
+    @property
+    def calls(self):
+        return self.snapshot()["calls"]
+
+    @property
+    def counts(self):
+        return self.snapshot()["counts"]
+
+    @property
+    def histograms(self):
+        return {name: collections.Counter(values) for name, values in self.snapshot()["histograms"].items()}
+
+    def reset(self):
+        with self.lock:
+            for shard in self.shards:
+                for records in shard.values():
+                    records.clear()
+            self.processes.clear()
+
+    def report(self):
+        """
+        Returns
+        -------
+        dict
+            {"phases": {name: {"calls": int, "seconds": float}}, "counts": {name: int},
+            "histograms": {name: {"n": int, "mean": float, "max": float}}, "processes": int}
+        """
+        snapshot = self.snapshot()
+        phases = {name: {"calls": snapshot["calls"][name], "seconds": snapshot["seconds"][name]}
+                  for name in snapshot["seconds"]}
+        histograms = {}
+        for name, values in snapshot["histograms"].items():
+            n = sum(values.values())
+            histograms[name] = {"n": n, "mean": sum(value * k for value, k in values.items()) / n,
+                                "max": max(values)}
+        return {"phases": phases, "counts": snapshot["counts"], "histograms": histograms,
+                "processes": len(snapshot["processes"])}
+
+    def to_dataframe(self):
+        """
+        Returns
+        -------
+        DataFrame
+            One row for each phase, with its calls, total seconds and mean seconds per call, followed by one row for
+            each event with its count in the "calls" column, and one row for each histogram with its number of
+            observations in the "calls" column and their mean in the "mean" column
+        """
+        report = self.report()
+        rows = [{"name": name, "kind": "phase", "calls": phase["calls"], "seconds": phase["seconds"],
+                 "mean": phase["seconds"] / phase["calls"] if phase["calls"] > 0 else None}
+                for name, phase in report["phases"].items()]
+        rows += [{"name": name, "kind": "count", "calls": count, "seconds": None, "mean": None}
+                 for name, count in report["counts"].items()]
+        rows += [{"name": name, "kind": "histogram", "calls": histogram["n"], "seconds": None,
+                  "mean": histogram["mean"]} for name, histogram in report["histograms"].items()]
+        return pd.DataFrame(rows, columns=["name", "kind", "calls", "seconds", "mean"]).set_index("name")
+
+
+def merge_records(target, source):
+    """
+    Add the phases, counts and histograms of one set of records to another
+    """
+    for key in ("seconds", "calls", "counts"):
+        for name, value in source[key].items():
+            target[key][name] = target[key].get(name, 0) + value
+    for name, values in source["histograms"].items():
+        histogram = target["histograms"].setdefault(name, {})
+        for value, n in values.items():
+            histogram[value] = histogram.get(value, 0) + n
+    if "processes" in target:
+        target["processes"] = sorted(set(target["processes"]) | set(source.get("processes", [])))
+
+
+def merge_snapshots(snapshots):
+    """
+    Merge the snapshots of several collectors, i.e. of a pool of worker processes
+
+    Parameters
+    ----------
+    snapshots: list of dict
+        Snapshots from Collector.snapshot
+
+    Returns
+    -------
+    dict
+        Snapshot of the combined records
+    """
+    merged = {"seconds": {}, "calls": {}, "counts": {}, "histograms": {}, "processes": []}
+    for snapshot in snapshots:
+        merge_records(merged, snapshot)
+    return merged
+
+
+def get_collector():
+    """
+    Returns the active collector, or None if instrumentation is disabled
+    """
+    return instrumentation['collector']
+
+
+def collector_timer(name):
+    """
+    Returns a timer for the phase "name" of the active collector, or a null context if there is none
+    """
+    collector = instrumentation['collector']
+    if collector is None:
+        return null_timer
+    return collector.timer(name)
+
+
+def collector_count(name, n=1):
+    """
+    Add n to the count of the event "name" in the active collector, if there is one
+    """
+    collector = instrumentation['collector']
+    if collector is not None:
+        collector.shard()["counts"][name] += n
+
+
+def collector_observe(name, value):
+    """
+    Add an observation of a value of the quantity "name" to the histogram of the active collector, if there is one
+    """
+    collector = instrumentation['collector']
+    if collector is not None:
+        collector.shard()["histograms"][name][value] += 1
+
+
+@contextlib.contextmanager
+def collecting(collector=None):
+    """
+    Context manager that makes a collector active inside it
+
+    Parameters
+    ----------
+    collector: Collector, optional
+        (The default is None, which makes a new collector)
+
+    Returns
+    -------
+    Collector
+    """
+    if collector is None:
+        collector = Collector()
+    previous = instrumentation['collector']
+    instrumentation['collector'] = collector
+    try:
+        yield collector
+    finally:
+        instrumentation['collector'] = previous
@@ -0,0 +1,248 @@
+"""
+MemoryProfile.py contains tools for measuring and predicting the memory used by Qnet graphs.
+
+memory_report breaks down the bytes held by a Qnet by component. Objects shared between parts of the graph, such as
+the skyfield timescale shared by all satellites, are counted once, under the first component that reaches them.
+
+profile_memory measures graphs built at increasing sizes with tracemalloc, and fit_memory_model fits the bytes they
+retain to a model of bytes per node and per edge, so that the memory of a larger graph can be predicted with
+predict_memory before building it.
+
+>>> df = QNET.profile_memory(sizes=[10, 20, 40, 80])
+>>> model = QNET.fit_memory_model(df)
+>>> QNET.predict_memory(model, nodes=1000 ** 2, edges=2 * 1000 * 999) / 2 ** 30
+"""
+
+import QNET
+import collections
+import gc
+import sys
+import types
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Objects that are part of the program rather than of a graph
+skipped_types = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj, seen):
+    """
+    Returns the size in bytes of an object and everything it references that is not in "seen"
+
+    Containers, instance dictionaries and slots are followed. The ids of all objects counted are added to seen.
+
+    Parameters
+    ----------
+    obj: object
+    seen: set of int
+        Ids of objects that are already counted
+
+    Returns
+    -------
+    int
+    """
+    size = 0
+    stack = [obj]
+    while len(stack) > 0:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, skipped_types):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, np.ndarray):
+            # Views do not own their data
+            if obj.base is not None:
+                stack.append(obj.base)
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+            stack.extend(obj)
+        if hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+        for name in getattr(type(obj), "__slots__", ()):
+            if isinstance(name, str) and hasattr(obj, name):
+                stack.append(getattr(obj, name))
+    return size
+
+
+def memory_report(Q):
+    """
+    Break down the memory held by a Qnet by component
+
+    Parameters
+    ----------
+    Q: Qnet()
+
+    Returns
+    -------
+    dict [str, int]
+        Bytes held by each component:
+
+        adjacency: The networkx adjacency dicts, down to the dicts of edge keys
+        edge costs: The attribute dicts of the edges and the costs in them
+        node costs: The costs and memory dicts of the nodes
+        coords: The coordinate lists of the nodes
+        skyfield: The skyfield objects of satellites, including their shared timescale
+        nodes: The Qnode objects, their names, their other attributes and the networkx node attribute dicts
+        name index: The dictionaries Q.names and Q.ids
+        change log: The log of mutations Q.changes, which is bounded by its maxlen
+        other: Everything else held by Q, such as the route cache
+        total: The sum of the components
+    """
+    nodes = list(Q.nodes)
+    edge_dicts = [d for u, v, k, d in Q.edges(keys=True, data=True)]
+    # Nodes and edge attribute dicts are counted in their own components, so the adjacency does not follow them
+    seen = {id(Q)} | {id(node) for node in nodes} | {id(d) for d in edge_dicts}
+    report = {}
+
+    report["adjacency"] = deep_sizeof(Q._adj, seen)
+
+    seen.difference_update(id(d) for d in edge_dicts)
+    report["edge costs"] = sum(deep_sizeof(d, seen) for d in edge_dicts)
+
+    report["node costs"] = sum(deep_sizeof(node.__dict__.get("costs"), seen) +
+                               deep_sizeof(node.__dict__.get("memory"), seen) for node in nodes)
+    report["coords"] = sum(deep_sizeof(node.__dict__.get("coords"), seen) for node in nodes)
+    # The list is kept for the whole walk, since the id of a temporary list could be reused by the next one
+    skyfield = [node.__dict__.get(key) for node in nodes if isinstance(node, QNET.Satellite)
+                for key in QNET.Satellite.shared_attributes]
+    report["skyfield"] = deep_sizeof(skyfield, seen) - sys.getsizeof(skyfield)
+
+    seen.difference_update(id(node) for node in nodes)
+    report["nodes"] = deep_sizeof(nodes, seen) - sys.getsizeof(nodes) + deep_sizeof(Q._node, seen)
+
+    report["name index"] = deep_sizeof(Q.names, seen) + deep_sizeof(Q.ids, seen)
+    report["change log"] = deep_sizeof(Q.changes, seen)
+    report["other"] = deep_sizeof(Q.__dict__, seen)
+    report["total"] = sum(report.values())
+    return report
+
+
+def measure_peak(function, *args, **kwargs):
+    """
+    Call a function under tracemalloc
+
+    Returns
+    -------
+    (object, int, int)
+        The result of the function, the peak bytes allocated during the call, and the bytes still allocated after it,
+        which for a generator function are the bytes held by the graph it returns
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    # Collect reference cycles, i.e. between networkx graphs and their cached views, so that garbage is not counted
+    gc.collect()
+    tracemalloc.reset_peak()
+    start, peak = tracemalloc.get_traced_memory()
+    try:
+        result = function(*args, **kwargs)
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return result, peak - start, current - start
+
+
+def end_to_end(reduction):
+    """
+    Returns a function that runs a reduction method between the first and last nodes added to a graph, which are
+    opposite corners of the lattice generators
+    """
+    def reduce(Q):
+        nodes = list(Q.nodes)
+        return reduction(Q, nodes[0], nodes[-1], threshold=4)
+    return reduce
+
+
+def profile_memory(builders=None, sizes=(10, 20, 40), reductions=None):
+    """
+    Measure the memory of graphs built at increasing sizes
+
+    Parameters
+    ----------
+    builders: dict [str, function], optional
+        Dictionary between names and generator functions of the size, builder(size) -> Qnet. (The default is None,
+        which profiles square_lattice and triangular_lattice. Two lattices with different numbers of edges per node
+        are needed to tell the bytes per node from the bytes per edge)
+    sizes: list of int, optional
+    reductions: dict [str, function], optional
+        Dictionary between names and functions reduction(Q) run on each graph, whose peak memory is measured.
+        (The default is None, which runs purify_reduce and swap_reduce between opposite corners of the lattice)
+
+    Returns
+    -------
+    DataFrame
+        One row for each builder and size with the columns "builder", "size", "nodes", "edges", "peak" (bytes at the
+        peak of building the graph), "retained" (bytes held by the graph, without its change log), "report" (total
+        of memory_report) and "peak (name)" for each reduction
+    """
+    if builders is None:
+        builders = {"square_lattice": lambda size: QNET.square_lattice(size, size, 0.99, 0.99),
+                    "triangular_lattice": lambda size: QNET.triangular_lattice(size, size, 0.99, 0.99)}
+    if reductions is None:
+        reductions = {"purify_reduce": end_to_end(QNET.purify_reduce),
+                      "swap_reduce": end_to_end(QNET.swap_reduce)}
+
+    def build(builder, size):
+        Q = builder(size)
+        # The change log stops growing at its maxlen, so it would bias the bytes per node and edge of small graphs
+        Q.changes.clear()
+        return Q
+
+    rows = []
+    for name, builder in builders.items():
+        for size in sizes:
+            Q, peak, retained = measure_peak(build, builder, size)
+            row = {"builder": name, "size": size, "nodes": Q.number_of_nodes(), "edges": Q.number_of_edges(),
+                   "peak": peak, "retained": retained, "report": memory_report(Q)["total"]}
+            for reduction_name, reduction in reductions.items():
+                result, reduction_peak, reduction_retained = measure_peak(reduction, Q)
+                del result
+                row[f"peak ({reduction_name})"] = reduction_peak
+            rows.append(row)
+            del Q
+    return pd.DataFrame(rows)
+
+
+def fit_memory_model(df, column="retained"):
+    """
+    Fit bytes = base + per_node * nodes + per_edge * edges to a profile by least squares
+
+    Parameters
+    ----------
+    df: DataFrame
+        Profile from profile_memory
+    column: str, optional
+        Column of bytes to fit, i.e. "retained", "peak" or "peak (purify_reduce)". (The default is "retained")
+
+    Returns
+    -------
+    dict
+        {"base": float, "per_node": float, "per_edge": float}
+    """
+    A = np.column_stack([np.ones(len(df)), df["nodes"].to_numpy(dtype=float), df["edges"].to_numpy(dtype=float)])
+    coefficients, residuals, rank, singular = np.linalg.lstsq(A, df[column].to_numpy(dtype=float), rcond=None)
+    base, per_node, per_edge = coefficients.tolist()
+    return {"base": base, "per_node": per_node, "per_edge": per_edge}
+
+
+def predict_memory(model, nodes, edges):
+    """
+    Predict the bytes of a graph with a model from fit_memory_model
+
+    Parameters
+    ----------
+    model: dict
+    nodes: int
+    edges: int
+
+    Returns
+    -------
+    float
+    """
+    return model["base"] + model["per_node"] * nodes + model["per_edge"] * edges
@@ -8,17 +8,72 @@ Created on Mon May 25 18:48:05 2020
 
 import QNET
 import numpy as np
+import copy
 import scipy.integrate
 from pvlib import atmosphere
 from skyfield.api import EarthSatellite
 from skyfield.api import Topos, load
 
+# Process-wide cache of skyfield objects shared by all satellites. See get_timescale, get_earth_satellite and get_topos
+skyfield_cache = {'timescale': None, 'satellites': {}, 'topos': {}}
+
+
+def get_timescale():
+    """
+    Returns the skyfield timescale shared by all satellites, loading it on first use
+    """
+    if skyfield_cache['timescale'] is None:
+        skyfield_cache['timescale'] = load.timescale()
+    return skyfield_cache['timescale']
+
+
+def get_earth_satellite(line1, line2, name=None):
+    """
+    Returns the EarthSatellite of a two-line element set, parsing it on first use.
+
+    Satellites with the same elements share one EarthSatellite, which carries the name of the first of them.
+    """
+    key = (line1, line2)
+    satellite = skyfield_cache['satellites'].get(key)
+    if satellite is None:
+        satellite = EarthSatellite(line1, line2, name, get_timescale())
+        skyfield_cache['satellites'][key] = satellite
+    return satellite
+
+
+def get_topos(coords):
+    """
+    Returns the Topos of a ground location with coordinates [latitude, longitude, ...] in degrees
+    """
+    key = (float(coords[0]), float(coords[1]))
+    topos = skyfield_cache['topos'].get(key)
+    if topos is None:
+        topos = Topos(*key)
+        skyfield_cache['topos'][key] = topos
+    return topos
+
+
+def clear_skyfield_cache():
+    """
+    Empty the caches of parsed satellites and ground locations. The shared timescale is kept
+    """
+    skyfield_cache['satellites'].clear()
+    skyfield_cache['topos'].clear()
+
 
 class Qnode:
     """
     Default Qnode Class
     """
 
+    # Default values of the parameters of the node, which update(from_default=True) resets. Attributes that are not
+    # listed here, such as the name of the node, are kept
+    defaults = {'coords': [0, 0, 0], 'isMemory': False}
+    # Attributes holding flat lists or dictionaries, which copies of the node copy one level deep
+    copied_attributes = ('coords', 'costs', 'memory')
+    # Attributes holding immutable or shareable objects, which copies of the node share with the original
+    shared_attributes = ()
+
     def __init__(self, Q, name=None, coords=None, isMemory=False, **kwargs):
         """
         Qnode Initialization
@@ -53,41 +108,87 @@ class Qnode:
     def __repr__(self):
         return self.name
 
+    def __deepcopy__(self, memo):
+        """
+        Copy the node, copying the attributes in copied_attributes one level deep, sharing those in
+        shared_attributes, and deep copying anything else. See Qnet.clone
+        """
+        cls = self.__class__
+        node = cls.__new__(cls)
+        memo[id(self)] = node
+        for key, value in self.__dict__.items():
+            if key in self.shared_attributes:
+                node.__dict__[key] = value
+            elif key in self.copied_attributes:
+                node.__dict__[key] = copy.copy(value)
+            else:
+                node.__dict__[key] = copy.deepcopy(value, memo)
+        return node
+
+    def reset(self):
+        """
+        Set the parameters of the node listed in the defaults table of its class to their default values
+        """
+        for key, value in self.defaults.items():
+            if key in self.__dict__:
+                self.__dict__[key] = copy.copy(value)
+
+    def apply_update(self, Q, from_default=True, default_costs=None, default_memory=None, **kwargs):
+        """
+        Updates the attributes and costs of the node without recording the change in Q. See update
+
+        :param default_costs: The default cost vector of Q, if already made
+        :param default_memory: The default memory vector of Q, if already made
+        :return dict: Costs of the node before the update
+        """
+        old_costs = self.costs
+
+        if from_default is True:
+            self.reset()
+
+        # Keyword arguments that name attributes of the node update them. The rest are costs
+        cost_kwargs = {}
+        for arg, value in kwargs.items():
+            if arg in self.__dict__:
+                if value is not None:
+                    setattr(self, arg, value)
+            else:
+                cost_kwargs[arg] = value
+
+        if len(cost_kwargs) == 0 and default_costs is not None:
+            self.costs = dict(default_costs)
+        else:
+            self.costs = QNET.make_cost_vector(Q, **cost_kwargs)
+        if len(cost_kwargs) == 0 and default_memory is not None:
+            self.memory = dict(default_memory)
+        else:
+            self.memory = QNET.make_memory_vector(Q, **cost_kwargs)
+        return old_costs
+
     def update(self, Q, from_default=True, **kwargs):
         """
         Updates the attributes of a given qnode
-        :param qnode: Node to be updated
+
+        Keyword arguments that name attributes of the node set them, unless they are None. The remaining keyword
+        arguments are costs, from which the cost and memory vectors of the node are rebuilt. To update many nodes,
+        use Qnet.update_qnodes.
+
+        :param Q: The Qnet containing the node
+        :param from_default: If True, reset the parameters in the defaults table of the node's class before updating
         :param kwargs: Keyword arguements for updating the qnode
         :return: None
 
         """
-        if from_default is True:
-            # Set attributes of node to default
-            class_name = self.__class__
-            dummy_node = class_name(Q, name=self.name)
-            for arg in self.__dict__:
-                setattr(self, arg, dummy_node.__dict__[arg])
-
-        # For all keyword arguments, check if it exists in the Qnode attributes. If it does, update it.
-        args_to_cull = []
-        for arg in kwargs:
-            if arg in self.__dict__:
-                setattr(self, arg, kwargs[arg])
-                args_to_cull.append(arg)
+        old_costs = self.apply_update(Q, from_default, **kwargs)
 
-        # Remove the kwargs that were used
-        for arg in args_to_cull:
-            kwargs.pop(arg)
+        # Keep the name index of Q up to date
+        if Q.names.get(self.name) is not self and self in Q:
+            Q.reindex()
 
-        # Update node.costs with remaining kwargs
-        for item in kwargs:
-            print(kwargs)
-        cost_vector = QNET.make_cost_vector(Q, **kwargs)
-        self.costs = cost_vector
-        
-        # Update node.memory with remaining kwargs
-        memory_vector = QNET.make_memory_vector(Q, **kwargs)
-        self.memory = memory_vector
+        # Record the change in Q
+        changed = [c for c in Q.cost_vector if self.costs["add_" + c] != old_costs.get("add_" + c)]
+        decreased = [c for c in changed if not self.costs["add_" + c] >= old_costs.get("add_" + c, 0)]
+        Q.touch(nodes=[self], costs=changed, decreased=decreased)
 
 
 class Ground(Qnode):
@@ -107,6 +208,15 @@ class Ground(Qnode):
 
 
 class Satellite(Qnode):
+    # The orbit of a satellite (cartesian, line1, line2 and its skyfield objects) is fixed when it is created
+    defaults = dict(Qnode.defaults, velocity=[0, 0])
+    copied_attributes = Qnode.copied_attributes + ('velocity',)
+    # The skyfield objects of a satellite are never modified in place. Time objects are replaced as the satellite
+    # moves, so copies can share them
+    shared_attributes = ('ts', 'satellite', 't_now', 't_startTime', 't_new')
+    # Seconds since the satellite started being tracked. Advanced by posUpdate and set_time
+    time = 0
+
     def __init__(self, Q, name=None, coords=None, t=0, v_cart=None, line1=None,
                  line2=None, cartesian=True, **kwargs):
         """
@@ -149,6 +259,9 @@ class Satellite(Qnode):
         """
         # Initialise coordinate type
         self.cartesian = cartesian
+        # Two-line element set of the satellite. Only used if cartesian == False
+        self.line1 = line1
+        self.line2 = line2
         
         super().__init__(Q, name, coords, **kwargs)
 
@@ -163,14 +276,14 @@ class Satellite(Qnode):
 
         else:
             ## Define the time at which the satellite is being tracked ##
-            ts = load.timescale()
+            ts = get_timescale()
             t_now = ts.now()
             t_startTime = ts.utc(t_now.utc[0], t_now.utc[1], t_now.utc[2], t_now.utc[3], t_now.utc[4], t_now.utc[5] + t)
             t_new = t_startTime
 
             ## Initialise which satellite to track. Default is ISS Zarya ##
             try:
-                satellite = EarthSatellite(line1, line2, self.name, ts)
+                satellite = get_earth_satellite(line1, line2, self.name)
                 geometry = satellite.at(t_new)
                 subpoint = geometry.subpoint()
                 self.coords = [int(subpoint.latitude.degrees), int(subpoint.longitude.degrees),
@@ -180,7 +293,9 @@ class Satellite(Qnode):
                 # l1 and l2 are TLE of ISS Zarya
                 l1 = '1 25544U 98067A   20154.85125762  .00002004  00000-0  43906-4 0  9990'
                 l2 = '2 25544  51.6443  59.4222 0002071  22.0017  92.6243 15.49416742229799'
-                satellite = EarthSatellite(l1, l2, self.name, ts)
+                satellite = get_earth_satellite(l1, l2, self.name)
+                self.line1 = l1
+                self.line2 = l2
                 geometry = satellite.at(t_new)
                 subpoint = geometry.subpoint()
                 geo_coords = [int(subpoint.latitude.degrees), int(subpoint.longitude.degrees),
@@ -194,21 +309,45 @@ class Satellite(Qnode):
             self.t_new = t_new
             self.satellite = satellite
 
-            print(t_now.utc)
+    def reset(self):
+        # The coordinates of satellites with geodesic coordinates follow from their orbit, so they are kept
+        coords = self.coords
+        super().reset()
+        if self.cartesian is False:
+            self.coords = coords
 
     def posUpdate(self, dt):
+        self.set_time(self.time + dt)
+        return
+
+    def set_time(self, t):
+        """
+        Move the satellite directly to its position t seconds after it started being tracked
+
+        Parameters
+        ----------
+        t : float
+            Time in seconds
+
+        Returns
+        -------
+        None.
+
+        """
         if self.cartesian is True:
             vx = self.velocity[0]
             vy = self.velocity[1]
+            dt = t - self.time
             self.coords = [self.coords[0] + vx * dt, self.coords[1] + vy * dt, self.coords[2]]
 
         else:
-            self.t_new = self.ts.utc(self.t_new.utc[0], self.t_new.utc[1], self.t_new.utc[2], self.t_new.utc[3],
-                                     self.t_new.utc[4], self.t_new.utc[5] + dt)
+            utc = self.t_startTime.utc
+            self.t_new = self.ts.utc(utc[0], utc[1], utc[2], utc[3], utc[4], utc[5] + t)
             geometry = self.satellite.at(self.t_new)
             subpoint = geometry.subpoint()
             self.coords = [int(subpoint.latitude.degrees), int(subpoint.longitude.degrees), int(subpoint.elevation.km)]
 
+        self.time = t
         return
 
     def setTime(self):
@@ -223,8 +362,30 @@ class Satellite(Qnode):
 
         '''
         self.t_new = self.t_startTime
+        self.time = 0
         return
 
+    def __getstate__(self):
+        """
+        The skyfield objects of a satellite cannot be pickled, so times are stored as Julian dates in TT and the
+        objects are rebuilt from the TLE when the satellite is unpickled
+        """
+        state = dict(self.__dict__)
+        if self.cartesian is False:
+            for key in ('t_now', 't_startTime', 't_new'):
+                state[key] = (state[key].whole, state[key].tt_fraction)
+            state['ts'] = None
+            state['satellite'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.cartesian is False:
+            self.ts = get_timescale()
+            self.satellite = get_earth_satellite(self.line1, self.line2, self.name)
+            for key in ('t_now', 't_startTime', 't_new'):
+                setattr(self, key, self.ts.tt_jd(*state[key]))
+
     def cart_distance(self, node):
         sx, sy, sz = self.coords
         x, y, z = node.coords
@@ -237,7 +398,7 @@ class Satellite(Qnode):
             return np.sqrt((x - sx) ** 2 + (y - sy) ** 2 + (z - sz) ** 2)
 
         else:
-            node_location = Topos(float(node.coords[0]), float(node.coords[1]))
+            node_location = get_topos(node.coords)
             difference = self.satellite - node_location
             topocentric = difference.at(self.t_new)
             alt, az, distMagnitude = topocentric.altaz()
@@ -259,12 +420,13 @@ class Satellite(Qnode):
             theta = np.arcsin(dz / dist)
 
         else:
-            node_location = Topos(float(node.coords[0]), float(node.coords[1]))
+            node_location = get_topos(node.coords)
             difference = self.satellite - node_location
             topocentric = difference.at(self.t_new)
             alt, az, dist1 = topocentric.altaz()
             theta = alt.degrees
-            dist = self.distance(node)
+            # As in distance
+            dist = int(dist1.km / 1000)
 
         """
         Line integral for effective density
@@ -325,6 +487,8 @@ class Satellite(Qnode):
 
 class Swapper(Qnode):
     # prob is probability of succesful swapping between nodes
+    defaults = dict(Qnode.defaults, swap_prob=0.5)
+
     def __init__(self, Q, name=None, coords=None, swap_prob=0.5, **kwargs):
         assert Q is not None
         assert swap_prob >= 0.5
@@ -333,6 +497,8 @@ class Swapper(Qnode):
         
         
 class Memory(Qnode):
+    defaults = dict(Qnode.defaults, t_memory=0)
+
     def __init__(self, Q, name=None, coords=None, mem_e = 1, mem_f=1, **kwargs):
         #assert Q is not None
         #assert swap_prob >= 0.5
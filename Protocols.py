@@ -22,7 +22,12 @@ def simple_swap(Q, source, dest):
     In the future, if it's more efficient not to use any swappers, the normal efficiency of the path
     will be returned.
 
+    The chain is checked and walked in time linear in its length (See walk_chain). To evaluate many chains at
+    once, use simple_swap_batch or swap_chains.
+
     :param Q: Linear Qnet Graph
+    :param source: Qnode of the chain
+    :param dest: Qnode
     :return float: no_swap and swap efficiencies of the graph
 
     Example:
@@ -34,120 +39,19 @@ def simple_swap(Q, source, dest):
     and e[T] is taken to mean the efficiency cost of performing a swap with the node T.
 
     """
-    # Check that path exists from A to B
-    assert(nx.has_path(Q, source, dest))
-
-    # Create generator of paths from A to B. If no generator exists raise exception
-    path_gen = nx.all_simple_paths(Q, source, dest)
-    assert (path_gen != None), f"No valid path exists between {source.name} and {dest.name}."
-
-    #  Unpack generator. If more than one path exists, raise exception
-    path_count = 0
-    for obj in path_gen:
-        path = QNET.Path(Q, obj)
-        path_count += 1
-
-    assert(path_count == 1), "More than one path exists, linear reduction cannot be done."
-
-    # Does a Swapper with swapping potential exist?
-    swap_candidate = None
-    # Does ground exist before a swapper?
-    front_ground = False
-    # Local efficiency of a Ground - Swapper - Ground configuration (or equivalent)
-    local_eff = 1
-    # list of swapper nodes used in the swapping process
-    swap_list = []
-    # Total efficiency of path
-    net_eff = 1
-
-    # Current node
-    cur = source
-    # Counter
-    i = 0
-
-    while cur != dest:
-        # If current node is a Ground and we haven't seen a Swapper yet, set front_ground to True
-        if isinstance(cur, QNET.Ground) and swap_candidate is None:
-            # Add node eff to local
-            local_eff *= cur.costs['e']
-            front_ground = True
-
-        # If Current node is a Swapper and we've seen a ground node previously, we now have a candidate for a swapper
-        # that could be used.
-        elif isinstance(cur, QNET.Swapper) and front_ground is True:
-            swap_switch = True
-            if swap_candidate == None:
-                swap_candidate = cur
-            # If we had another swap candidate previously, update swap_candidate to be better efficiency option
-            elif swap_candidate.swap_prob < cur.swap_prob:
-                swap_candidate = cur
-            local_eff *= cur.costs['e']
-
-        # If current node is a Ground and we've seen a Swapper, we perform a swap with the local resources
-        # (Front-Ground, Swapper, Back-Ground) and update net_eff.
-        elif isinstance(cur, QNET.Ground) and swap_candidate is not None:
-            # Add node eff to local
-            local_eff *= cur.costs['e']
-
-            # Update net_eff to local_eff if net_eff is smaller
-            if local_eff < net_eff:
-                net_eff = local_eff
-
-            # Add the swapper we were considering to the list of swappers used
-            swap_list.append(swap_candidate)
-
-            # Reset parameters to prepare for the next swap
-            local_eff = 1
-            swap_candidate = None
-            front_ground = False
-
-        # Otherwise include the node cost in the local efficiency
-        else:
-            local_eff *= cur.costs['e']
-
-        # Increment counter and get the edge efficiency
-        i += 1
-        edge_costs = Q.get_edge_data(cur, path.node_array[i])
-
-        # Update local_eff with edge efficiency
-        local_eff *= edge_costs['e']
-        # Move to next node
-        cur = path.node_array[i]
-
-        # If the new node is the destination
-        if cur == dest:
-            # Append node costs from dest
-            local_eff *= cur.costs['e']
-            # Update net_eff to local_eff if net_eff is smaller
-            # This also handles the case where no valid swapper was encountered
-            if local_eff < net_eff:
-                 net_eff = local_eff
-
-    # Multiply net_eff with the costs of all swappers used.
-    for swapper in swap_list:
-        net_eff *= swapper.costs['e']
-
-    """Calculate cost of path without any swapping"""
-    # Cost of path without swapping
     no_swap = 1
-    # Length of path
-    path_len = len(path.node_array)
-    i = 0
-
-    # Sum all edge efficiencies
-    while (i < path_len - 1):
-        cur = path.node_array[i]
-        nxt = path.node_array[i + 1]
-        edgeData = path.G.get_edge_data(cur, nxt)
-        no_swap *= edgeData['e']
-        i += 1
-
-    # Sum all node efficiencies except for swappers
-    for node in path.node_array:
+    state = swap_state(1)
+    for node, edge in walk_chain(Q, source, dest):
         no_swap *= node.costs['e']
+        if edge is not None:
+            no_swap *= edge['e']
+            swap_step(state, np.array([node.costs['e']]), np.array([chain_kind(node)]),
+                      np.array([getattr(node, 'swap_prob', 0)]), np.array([edge['e']]))
+        elif node != source:
+            finish_swap(state, np.array([node.costs['e']]))
 
     # DEBUG: For now, return both swap and no swap:
-    return(no_swap, net_eff)
+    return no_swap, float(state['net'][0])
 
     """
     # Return whatever cost is better
@@ -157,10 +61,244 @@ def simple_swap(Q, source, dest):
         return no_swap
     """
 
-def fidTransform(F1, F2):
-    return (F1 * F2) / (F1 * F2 + (1 - F1) * (1 - F2))
 
-def purify(Q, source, target):
+# Kinds of nodes in the chains of swap_chains
+CHAIN_OTHER = 0
+CHAIN_GROUND = 1
+CHAIN_SWAPPER = 2
+
+
+def chain_kind(node):
+    """
+    Returns the kind of a node in a repeater chain: CHAIN_GROUND, CHAIN_SWAPPER or CHAIN_OTHER
+    """
+    if isinstance(node, QNET.Ground):
+        return CHAIN_GROUND
+    elif isinstance(node, QNET.Swapper):
+        return CHAIN_SWAPPER
+    return CHAIN_OTHER
+
+
+def chain_link(Q, cur, nxt):
+    """
+    Returns the dictionary of the only channel from cur to nxt on a linear chain
+    """
+    edges = Q.adj[cur][nxt]
+    assert len(edges) == 1, f"{len(edges)} parallel channels exist between {cur.name} and {nxt.name}, linear " \
+                            f"reduction cannot be done."
+    (key, edge), = edges.items()
+    return edge
+
+
+def chain_reaches(Q, source, first, dest):
+    """
+    Returns True if the chain leaving source through its neighbour first reaches dest, and False if it ends or comes
+    back to source first. Raises an AssertionError if the chain branches on the way
+    """
+    previous = source
+    cur = first
+    while cur != dest:
+        neighbours = Q.adj[cur]
+        assert len(neighbours) <= 2, "More than one path exists, linear reduction cannot be done."
+        if len(neighbours) < 2:
+            return False
+        previous, cur = cur, next(node for node in neighbours if node != previous)
+        if cur == source:
+            return False
+    return True
+
+
+def walk_chain(Q, source, dest):
+    """
+    Walks a linear chain from source to dest, checking that it is linear on the way from the degrees of its nodes.
+
+    The source may be an end of the chain or a node inside it, in which case the chain is walked toward dest. Every
+    node between source and dest must have exactly two channels, to different neighbours. This takes time linear in
+    the length of the chain, and means there is exactly one path from source to dest.
+
+    :param Q: Qnet Graph
+    :param source: Qnode of the chain
+    :param dest: Qnode
+    :return: Generator of (node, edge), where edge is the dictionary of the channel to the next node, or None at dest
+    """
+    assert source in Q and dest in Q, "The source and destination must be nodes of the graph"
+    if source == dest:
+        yield source, None
+        return
+    branched = "More than one path exists, linear reduction cannot be done."
+    no_path = f"No valid path exists between {source.name} and {dest.name}."
+
+    neighbours = list(Q.adj[source])
+    assert len(neighbours) <= 2, branched
+    assert len(neighbours) > 0, no_path
+    if len(neighbours) == 2:
+        # Inside the chain, only one direction may lead to dest
+        reaching = [node for node in neighbours if chain_reaches(Q, source, node, dest)]
+        assert len(reaching) < 2, branched
+        assert len(reaching) == 1, no_path
+        neighbours = reaching
+
+    previous = None
+    cur = source
+    nxt = neighbours[0]
+    while True:
+        edge = chain_link(Q, cur, nxt)
+        assert Q.degree(cur) == len(Q.adj[cur]), branched
+        yield cur, edge
+        previous, cur = cur, nxt
+        if cur == dest:
+            break
+        neighbours = Q.adj[cur]
+        assert len(neighbours) <= 2, branched
+        assert len(neighbours) == 2, no_path
+        nxt = next(node for node in neighbours if node != previous)
+    yield dest, None
+
+
+def swap_state(chains):
+    """
+    Returns the initial state of the swap efficiency calculation of simple_swap for a number of chains
+    """
+    return {'local': np.ones(chains), 'net': np.ones(chains), 'front': np.zeros(chains, dtype=bool),
+            'chosen': np.zeros(chains, dtype=bool), 'chosen_prob': np.zeros(chains), 'chosen_e': np.ones(chains),
+            'swappers': np.ones(chains)}
+
+
+def swap_step(state, e, kind, swap_prob, edge_e):
+    """
+    Advances the swap efficiency calculation of simple_swap over one node of each chain and the channel after it
+
+    A Ground node before any Swapper starts a segment. The Swapper with the best swap_prob after it is chosen, and the
+    next Ground node ends the segment, whose efficiency bounds the efficiency of the chain.
+
+    :param state: State from swap_state, which is updated in place
+    :param e: Efficiencies of the nodes, of shape (chains,)
+    :param kind: Kinds of the nodes, of shape (chains,). See chain_kind
+    :param swap_prob: Swap probabilities of the nodes, of shape (chains,)
+    :param edge_e: Efficiencies of the channels to the next nodes, of shape (chains,)
+    """
+    start = (kind == CHAIN_GROUND) & ~state['chosen']
+    swap = (kind == CHAIN_SWAPPER) & state['front']
+    end = (kind == CHAIN_GROUND) & state['chosen']
+
+    state['local'] *= e
+    state['front'] |= start
+    # Keep the first swapper with the best swap probability in each segment
+    better = swap & (~state['chosen'] | (swap_prob > state['chosen_prob']))
+    state['chosen_prob'] = np.where(better, swap_prob, state['chosen_prob'])
+    state['chosen_e'] = np.where(better, e, state['chosen_e'])
+    state['chosen'] |= swap
+
+    state['net'] = np.where(end, np.minimum(state['net'], state['local']), state['net'])
+    state['swappers'] = np.where(end, state['swappers'] * state['chosen_e'], state['swappers'])
+    state['local'] = np.where(end, 1, state['local'])
+    state['chosen'] &= ~end
+    state['front'] &= ~end
+
+    state['local'] *= edge_e
+
+
+def finish_swap(state, e):
+    """
+    Ends the swap efficiency calculation at the destination nodes of the chains, with efficiencies e
+    """
+    state['net'] = np.minimum(state['net'], state['local'] * e) * state['swappers']
+
+
+def chain_arrays(Q, source, dest):
+    """
+    Walks a linear chain from source to dest into arrays of its costs. See walk_chain
+
+    :param Q: Qnet Graph
+    :param source: Qnode of the chain
+    :param dest: Qnode
+    :return: Dictionary with the node efficiencies "e", kinds "kind" and swap probabilities "swap_prob" of shape
+        (n,), and the channel efficiencies "edge_e" of shape (n - 1,)
+    """
+    nodes = []
+    edges = []
+    for node, edge in walk_chain(Q, source, dest):
+        nodes.append((node.costs['e'], chain_kind(node), getattr(node, 'swap_prob', 0)))
+        if edge is not None:
+            edges.append(edge['e'])
+    e, kind, swap_prob = (np.array(column) for column in zip(*nodes))
+    return {'e': e.astype(float), 'kind': kind.astype(int), 'swap_prob': swap_prob.astype(float),
+            'edge_e': np.array(edges, dtype=float)}
+
+
+def stack_chains(chains):
+    """
+    Stacks the arrays of several chains from chain_arrays for swap_chains. Shorter chains are padded at the front with
+    nodes and channels of efficiency 1 that are neither Ground nor Swapper, which leaves their efficiencies unchanged.
+
+    :param chains: List of dictionaries from chain_arrays
+    :return: Dictionary of arrays of shape (chains, n) and (chains, n - 1), and the lengths of the chains "n"
+    """
+    n = max(len(chain['e']) for chain in chains)
+    stacked = {'e': np.ones((len(chains), n)), 'kind': np.full((len(chains), n), CHAIN_OTHER),
+               'swap_prob': np.zeros((len(chains), n)), 'edge_e': np.ones((len(chains), max(n - 1, 0))),
+               'n': np.array([len(chain['e']) for chain in chains])}
+    for i, chain in enumerate(chains):
+        length = len(chain['e'])
+        for key in ('e', 'kind', 'swap_prob'):
+            stacked[key][i, n - length:] = chain[key]
+        stacked['edge_e'][i, n - length:] = chain['edge_e']
+    return stacked
+
+
+def swap_chains(e, edge_e, kind, swap_prob=None, n=None):
+    """
+    Calculates the no swap and swap efficiencies of simple_swap for many repeater chains at once
+
+    Chains are columns of arrays of segment costs, i.e. from stack_chains, or made directly:
+
+    >>> e = np.ones((1000, 7))
+    >>> edge_e = np.random.uniform(0.8, 1, (1000, 6))
+    >>> kind = [QNET.CHAIN_OTHER] + [QNET.CHAIN_SWAPPER, QNET.CHAIN_GROUND] * 2 + [QNET.CHAIN_SWAPPER, QNET.CHAIN_OTHER]
+    >>> no_swap, swap = QNET.swap_chains(e, edge_e, kind)
+
+    :param e: Node efficiencies of shape (chains, n)
+    :param edge_e: Channel efficiencies of shape (chains, n - 1)
+    :param kind: Node kinds of shape (chains, n) or (n,). See chain_kind
+    :param swap_prob: Swap probabilities of the nodes of shape (chains, n) or (n,), optional. Only used to choose
+        between swappers in a segment. (The default is None, which means all are equal)
+    :param n: Lengths of the chains if they were padded, of shape (chains,), optional
+    :return: Arrays of the no swap and swap efficiencies of the chains
+    """
+    e = np.atleast_2d(np.asarray(e, dtype=float))
+    chains, length = e.shape
+    edge_e = np.asarray(edge_e, dtype=float).reshape(chains, max(length - 1, 0))
+    kind = np.broadcast_to(np.asarray(kind, dtype=int), (chains, length))
+    swap_prob = np.zeros((chains, length)) if swap_prob is None else \
+        np.broadcast_to(np.asarray(swap_prob, dtype=float), (chains, length))
+
+    no_swap = np.prod(e, axis=1) * np.prod(edge_e, axis=1)
+    state = swap_state(chains)
+    for i in range(length - 1):
+        swap_step(state, e[:, i], kind[:, i], swap_prob[:, i], edge_e[:, i])
+    if length > 1:
+        finish_swap(state, e[:, -1])
+    swap = state['net']
+    if n is not None:
+        # As in simple_swap, a chain of a single node has a swap efficiency of 1
+        swap = np.where(np.asarray(n) == 1, 1, swap)
+    return no_swap, swap
+
+
+def simple_swap_batch(graphs, source='A', dest='B'):
+    """
+    Calculates simple_swap for many linear Qnets, such as those of altLinGen
+
+    :param graphs: List of Qnet Graphs
+    :param source: Name of the source node in each graph. The default is 'A'
+    :param dest: Name of the destination node in each graph. The default is 'B'
+    :return: Arrays of the no swap and swap efficiencies of the graphs
+    """
+    stacked = stack_chains([chain_arrays(Q, Q.getNode(source), Q.getNode(dest)) for Q in graphs])
+    return swap_chains(stacked['e'], stacked['edge_e'], stacked['kind'], stacked['swap_prob'], stacked['n'])
+
+
+def purify(Q, source, target, method='node_disjoint'):
     """
 
     This function performs a multi-path entanglement purification between a source and target node using all
@@ -175,50 +313,28 @@ def purify(Q, source, target):
         edge_disjoint: No intersecting edges
         node_disjoint: No intersecting nodes
         total_disjoint: No intersecting edges or nodes
+        greedy: The best path, then the best path once its edges are removed, and so on
         Other inputs produce a ValueError
+    The disjoint paths are the most disjoint paths of least total additive fidelity, found by QNET.disjoint_paths
+    Unlike purify_reduce, simple_purify and candidate_paths, whose default is "greedy", the default is
+    "node_disjoint", since purify has always purified node disjoint paths. Given the same method, all of them purify
+    the same paths.
     :return: float
     """
 
     # TODO: Implement a threshold attribute so user doesn't have to iterate through all paths
 
-    def fidTransform(F1, F2):
-        return (F1 * F2) / (F1 * F2 + (1 - F1) * (1 - F2))
-
-    # Get paths for Graph
-    u = Q.getNode(source)
-    v = Q.getNode(target)
-
-    # TODO: Find a better way of producing disjoint paths
-    generator = nx.node_disjoint_paths(Q, u, v)
-
-    # Get p values for each path
-    f_arr = []
-    for path in generator:
-        new_path = QNET.Path(Q, path)
-        # check if path is valid
-        if new_path.is_valid() == True:
-            f = new_path.cost_vector['f']
-            f_arr.append(f)
-        else:
-            pass
+    # Get p values for each valid path
+    paths = QNET.candidate_paths(Q, source, target, 'f', None, method)
+    f_arr = [path.cost_vector['f'] for path in paths if path.is_valid() == True]
 
     assert (len(f_arr) != 0), f"No path exists from {source} to {target}"
 
-    # Initialize purified fidelity as the max fidelity value
-    pure_cost = max(f_arr)
-    f_arr.remove(pure_cost)
-
     # Purify fidelities together
-    # TODO: Depreciate this code
-    while len(f_arr) != 0:
-        pmax = max(f_arr)
-        pure_cost = fidTransform(pure_cost, pmax)
-        f_arr.remove(pmax)
-
-    return pure_cost
+    return float(QNET.purify_fidelity(f_arr))
 
 
-def simple_purify(Q = None, head = None, tail = None, threshold = None):
+def simple_purify(Q = None, head = None, tail = None, threshold = None, method = 'greedy', prob = 0.5):
     """
     A simple purification algorithm that works as follows:
     1. Find the best path between source and target and save the cost
@@ -228,12 +344,20 @@ def simple_purify(Q = None, head = None, tail = None, threshold = None):
     5. Repeat steps 3 and 4 until either we hit the threshold number or there are no more paths between source and
     target
 
+    With method = "edge_disjoint", "node_disjoint" or "total_disjoint", the threshold + 1 disjoint paths of least total
+    additive fidelity are found together by QNET.disjoint_paths instead. See QNET.candidate_paths.
+
     :param Q:
     :param source: Source Node
     :param target: Target Node
     :param: threshold: Maximum number of paths to purify before returning cost vector
+    :param: method: Method of finding the paths. The default is "greedy"
+    :param: prob: Probability of a given projective measurement. The default is 0.5
     :return: cost vector
     :param: dict
+
+    The efficiency is the weakest efficiency of the paths times prob**(2n - 1) for n paths, one projection more than
+    purify_reduce counts.
     """
     if threshold is not None:
         assert isinstance(threshold, int)
@@ -243,44 +367,17 @@ def simple_purify(Q = None, head = None, tail = None, threshold = None):
     if None in [Q, head, tail]:
         return {'e': 0, 'f': 0}
 
-    # Make copy of graph
-    C = copy.deepcopy(Q)
-
-    # Get source and target
-    head = C.getNode(head)
-    tail = C.getNode(tail)
-
-    # Find the best path in terms of fidelity,
-    path = QNET.best_path(C, head, tail, 'f')
-    # pur_f = path.cost('f')
-    pur_f = path.cost_vector['f']
-    # pur_e = path.cost('e')
-    pur_e = path.cost_vector['e']
-    path.remove_edges()
-    path_counter = 1
-
-    # Purify paths against eachother until either no path exists or threshold is reached
-    while nx.has_path(C, head, tail) is True:
-        if threshold is not None:
-            if path_counter > threshold:
-                break
-        path = QNET.best_path(C, head, tail, 'f')
-        # new_f = path.cost('f')
-        new_f = path.cost_vector['f']
-        # new_e = path.cost('e')
-        new_e = path.cost_vector['e']
-
-        # Efficiency is weakest-link. Update pur_e to whatever the lowest path efficiency is.
-        if new_e < pur_e:
-            pur_e = new_e
-
-        pur_f = QNET.fidTransform(pur_f, new_f)
-        path.remove_edges()
-        path_counter += 1
+    max_paths = None if threshold is None else threshold + 1
+    paths = QNET.candidate_paths(Q, head, tail, 'f', max_paths, method)
+    assert (len(paths) != 0), f"No path exists from {head} to {tail}"
+
+    pur_f = float(QNET.purify_fidelity([path.cost_vector['f'] for path in paths]))
+    # Efficiency is weakest-link
+    pur_e = min(path.cost_vector['e'] for path in paths)
 
     # Each path purification requires 2*(n-1) bell projections, where n is the number of bell pairs
-    # Assume that projections are done with a PBS with e = 1/2
-    pur_e = pur_e * 0.5**(2*path_counter - 1)
+    # Assume that projections are done with a PBS with e = prob
+    pur_e = pur_e * prob**(2*len(paths) - 1)
 
     return {'e':pur_e, 'f':pur_f}
 
@@ -299,12 +396,18 @@ def best_costs(P = None, head = None, tail = None):
 def path_exist(P=None, head=None, tail=None):
     if None in [P, head, tail]:
         return {'p': 0}
-    if isinstance(head, QNET.Qnode):
-        if not nx.has_path(P, head, tail):
+    # Snapshots and shared views of a Qnet answer connectivity queries themselves
+    if isinstance(P, QNET.QnetSnapshot):
+        has_path = P.has_path
+    else:
+        def has_path(head, tail):
+            return nx.has_path(P, head, tail)
+    if isinstance(head, (QNET.Qnode, str)):
+        if not has_path(head, tail):
             return{'p': 0}
     else:
         for i in range(len(head)):
-            if not nx.has_path(P, head[i], tail[i]):
+            if not has_path(head[i], tail[i]):
                 return{'p': 0}
     return {'p': 1}
 
@@ -0,0 +1,596 @@
+"""
+Purification.py contains NumPy kernels for entanglement purification.
+
+Purifying Bell pairs of fidelities F_1, ..., F_n together gives the fidelity
+
+    F = prod(F_i) / (prod(F_i) + prod(1 - F_i))
+
+which is what folding fidTransform over the pairs gives, in any order. The kernels evaluate it in closed form over
+the last axis of an array, so whole batches of path sets, i.e. of shape (samples, pairs, paths), are purified in one
+call. The products are taken as sums of logarithms, so that purifying many paths does not underflow.
+
+Path sets of different sizes are padded with nan, which the kernels ignore. A fidelity of 0.5 is also neutral, since
+purifying with a maximally mixed pair changes nothing.
+
+The efficiency of a purification is that of its weakest path, times the loss of the Bell projections. Purifying n
+pairs takes 2(n - 1) projections, each succeeding with probability "prob":
+
+    e = min(e_i) * prob ** (2 * (n - 1))
+
+>>> f = QNET.pad_path_sets([[0.9, 0.8], [0.95, 0.7, 0.6]])
+>>> QNET.purify_fidelity(f)
+
+Since each extra path costs efficiency, purifying every path is often worse than purifying a few. plan_purification
+finds the candidate paths once, and evaluates every prefix of them, or every subset, with these kernels to find the
+best choice under an objective:
+
+>>> plan = QNET.plan_purification(Q, 'A', 'B', objective='f', min_e=0.01)
+>>> plan['n'], plan['cost_vector']
+
+By default the paths to purify are the best path, then the best path once its channels are removed, and so on. With
+method='edge_disjoint' or 'node_disjoint' they are found by disjoint_paths instead, which routes a min-cost flow of k
+units between the two parties over channels of capacity 1. This gives k disjoint paths of least total additive cost
+in one solve:
+
+>>> paths = QNET.disjoint_paths(Q, 'A', 'B', k=3, cost_type='f', method='node_disjoint')
+"""
+
+import QNET
+import collections
+import copy
+import heapq
+import math
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+# Methods of finding the paths to purify. See candidate_paths
+disjoint_methods = ("edge_disjoint", "node_disjoint", "total_disjoint")
+path_methods = disjoint_methods + ("greedy",)
+
+
+def fidTransform(F1, F2):
+    """
+    Returns the fidelity of purifying two Bell pairs of fidelities F1 and F2 together
+    """
+    return (F1 * F2) / (F1 * F2 + (1 - F1) * (1 - F2))
+
+
+def log_odds(f):
+    """
+    Returns log(F) - log(1 - F) of an array of fidelities, with nan where the fidelity is nan
+    """
+    f = np.asarray(f, dtype=float)
+    with np.errstate(divide='ignore'):
+        return np.log(f) - np.log1p(-f)
+
+
+def from_log_odds(x):
+    """
+    Returns the fidelity with log odds x
+    """
+    with np.errstate(over='ignore'):
+        return 1 / (1 + np.exp(-x))
+
+
+def purify_fidelity(f, axis=-1):
+    """
+    Purify fidelities together along an axis
+
+    Parameters
+    ----------
+    f: array_like
+        Fidelities of the paths. Entries that are nan are ignored
+    axis: int, optional
+        Axis of the paths. (The default is -1)
+
+    Returns
+    -------
+    numpy.ndarray or float
+        Purified fidelities, with the axis of the paths removed. nan where there are no paths, or where paths of
+        fidelity 0 and 1 are purified together
+    """
+    x = log_odds(f)
+    present = ~np.isnan(x)
+    with np.errstate(invalid='ignore'):
+        total = np.sum(np.where(present, x, 0), axis=axis)
+    return np.where(np.any(present, axis=axis), from_log_odds(total), np.nan)[()]
+
+
+def purify_fidelity_prefix(f, axis=-1):
+    """
+    Purified fidelities of every prefix of the paths along an axis: the first path alone, the first two, and so on
+
+    Parameters
+    ----------
+    f: array_like
+        Fidelities of the paths, in the order in which they are purified. Entries that are nan are ignored
+    axis: int, optional
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of the shape of f, whose entry k along the axis is the purified fidelity of paths 0 to k
+    """
+    x = log_odds(f)
+    present = ~np.isnan(x)
+    with np.errstate(invalid='ignore'):
+        total = np.cumsum(np.where(present, x, 0), axis=axis)
+    return np.where(np.cumsum(present, axis=axis) > 0, from_log_odds(total), np.nan)
+
+
+def projection_loss(n, prob=0.5):
+    """
+    Returns the loss in efficiency of purifying n pairs, which takes 2(n - 1) Bell projections that each succeed with
+    probability prob
+    """
+    return prob ** (2 * (np.asarray(n) - 1))
+
+
+def purify_efficiency(e, prob=0.5, axis=-1):
+    """
+    Efficiency of purifying paths together along an axis: the weakest efficiency times the projection loss
+
+    Parameters
+    ----------
+    e: array_like
+        Efficiencies of the paths. Entries that are nan are ignored
+    prob: float, optional
+        Probability of a given projective measurement. (The default is 0.5)
+    axis: int, optional
+
+    Returns
+    -------
+    numpy.ndarray or float
+        nan where there are no paths
+    """
+    e = np.asarray(e, dtype=float)
+    n = np.sum(~np.isnan(e), axis=axis)
+    weakest = np.min(np.where(np.isnan(e), np.inf, e), axis=axis)
+    return np.where(n > 0, weakest * projection_loss(np.maximum(n, 1), prob), np.nan)[()]
+
+
+def purify_efficiency_prefix(e, prob=0.5, axis=-1):
+    """
+    Efficiencies of purifying every prefix of the paths along an axis. See purify_fidelity_prefix
+    """
+    e = np.asarray(e, dtype=float)
+    n = np.cumsum(~np.isnan(e), axis=axis)
+    weakest = np.minimum.accumulate(np.where(np.isnan(e), np.inf, e), axis=axis)
+    return np.where(n > 0, weakest * projection_loss(np.maximum(n, 1), prob), np.nan)
+
+
+def purify_costs(f, e, prob=0.5, axis=-1):
+    """
+    Purify sets of paths with fidelities f and efficiencies e together
+
+    Returns
+    -------
+    dict
+        {'f': purified fidelities, 'e': purified efficiencies}
+    """
+    return {'f': purify_fidelity(f, axis), 'e': purify_efficiency(e, prob, axis)}
+
+
+def pad_path_sets(path_sets, fill=np.nan):
+    """
+    Stack lists of path costs of different lengths into an array, padded with nan
+
+    Parameters
+    ----------
+    path_sets: list of list of float
+        Costs of the paths of each set, i.e. of each sample of a Monte Carlo run
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (sets, most paths in a set)
+    """
+    n = max((len(paths) for paths in path_sets), default=0)
+    padded = np.full((len(path_sets), n), fill, dtype=float)
+    for i, paths in enumerate(path_sets):
+        padded[i, :len(paths)] = paths
+    return padded
+
+
+def flow_network(Q, head, tail, cost_type, method):
+    """
+    Builds the residual network that disjoint_paths routes flow through
+
+    Every channel of Q becomes a pair of opposite arcs of capacity 1, weighted by its additive cost. For edge disjoint
+    paths, half the costs of the nodes at either end are added to the arcs, as in get_weight_function. For node
+    disjoint paths, every node other than head and tail is split into an entry and an exit joined by an arc of capacity
+    1, weighted by the cost of the node. The costs of head and tail are the same for every path, so they are left out.
+
+    Arcs are stored with their residual arc next to them, so that the residual of arc a is arc a ^ 1. Infinite costs,
+    i.e. of channels of fidelity 0.5, are replaced by a cost larger than that of any path without them.
+
+    Parameters
+    ----------
+    Q: Qnet()
+    head: Qnode()
+    tail: Qnode()
+    cost_type: str
+        Any additive cost, i.e. 'add_f'
+    method: str
+        'edge_disjoint', 'node_disjoint' or 'total_disjoint'
+
+    Returns
+    -------
+    dict
+        to: Node at the end of each arc
+        capacity: Residual capacity of each arc
+        cost: Cost of each arc
+        channel: (u, v, key) of the channel that each arc crosses from u to v, or None
+        out: Arcs leaving each node
+        head: Node that the flow leaves
+        tail: Node that the flow enters
+    """
+    nodes = list(Q.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    split = method != "edge_disjoint"
+    to, capacity, cost, channel = [], [], [], []
+    out = [[] for i in range(2 * len(nodes) if split else len(nodes))]
+
+    def add_arc(u, v, weight, label):
+        out[u].append(len(to))
+        out[v].append(len(to) + 1)
+        to.extend((v, u))
+        capacity.extend((1, 0))
+        cost.extend((weight, -weight))
+        channel.extend((label, None))
+
+    def node_in(node):
+        return 2 * index[node] if split else index[node]
+
+    def node_out(node):
+        if split and node is not head and node is not tail:
+            return 2 * index[node] + 1
+        return node_in(node)
+
+    if split:
+        for node in nodes:
+            if node is not head and node is not tail:
+                add_arc(node_in(node), node_out(node), node.costs[cost_type], None)
+
+    for u, v, key, data in Q.edges(keys=True, data=True):
+        # Self loops are never part of a path
+        if u is v:
+            continue
+        weight = data.get(cost_type, 1)
+        if not split:
+            weight += u.costs[cost_type] / 2 + v.costs[cost_type] / 2
+        add_arc(node_out(u), node_in(v), weight, (u, v, key))
+        add_arc(node_out(v), node_in(u), weight, (v, u, key))
+
+    big = 1 + 2 * sum(abs(c) for c in cost[::2] if math.isfinite(c))
+    cost = [c if math.isfinite(c) else big if not c < 0 else -big for c in cost]
+    return {"to": to, "capacity": capacity, "cost": cost, "channel": channel, "out": out,
+            "head": node_in(head), "tail": node_in(tail)}
+
+
+def disjoint_paths(Q, head, tail, k=None, cost_type='f', method='edge_disjoint', nested=False):
+    """
+    Finds k disjoint paths between head and tail with the least total additive cost
+
+    The paths are found in one min-cost flow solve by successive shortest paths: k units of flow are routed from head
+    to tail through the network of flow_network, one shortest augmenting path at a time, with node potentials keeping
+    the reduced costs of the residual arcs non-negative for Dijkstra. Unlike removing the channels of the best path and
+    searching again, later units of flow may reroute earlier ones, so that the paths found together are optimal.
+
+    Parameters
+    ----------
+    Q: Qnet()
+    head: Union[string, Qnode()]
+    tail: Union[string, Qnode()]
+    k: int, optional
+        Number of paths. (The default is None, which finds as many disjoint paths as there are)
+    cost_type: str, optional
+        Cost whose additive form is minimised. (The default is 'f')
+    method: str, optional
+        edge_disjoint: No two paths share a channel
+        node_disjoint: No two paths share a node other than head and tail
+        total_disjoint: No two paths share a channel or a node. Paths that share no nodes cannot share a channel, so
+        this is the same as node_disjoint
+        (The default is 'edge_disjoint')
+    nested: bool, optional
+        If True, also keep the optimal flows of 1, 2, ... units that the solve passes through on its way to k, which
+        are the paths that disjoint_paths would return for each smaller k. (The default is False)
+
+    Returns
+    -------
+    list of Path()
+        Paths over Q, in order of increasing additive cost. Fewer than k if there are not k disjoint paths
+    list of list of Path()
+        With nested=True, the paths of the optimal flow of each number of units, from 1 up
+
+    Notes
+    -----
+    Like the shortest path searches, the additive costs are assumed to be non-negative.
+    """
+    assert method in disjoint_methods, f"Invalid method. \"{method}\" not in {disjoint_methods}"
+    assert cost_type in Q.conversions, \
+        f"Invalid cost type. \"{cost_type}\" not in {str([key for key in Q.conversions])}"
+    assert k is None or k >= 0
+    head = Q.getNode(head)
+    tail = Q.getNode(tail)
+    assert head is not None and tail is not None, "Head and tail must be nodes of Q"
+    assert head is not tail, "Head and tail must be different nodes"
+    QNET.collector_count("searches (disjoint)")
+
+    add_cost = "add_" + cost_type
+    net = flow_network(Q, head, tail, add_cost, method)
+    to, capacity, cost, out = net["to"], net["capacity"], net["cost"], net["out"]
+    source, sink = net["head"], net["tail"]
+    potential = [0.0] * len(out)
+
+    flow = 0
+    path_sets = []
+    while k is None or flow < k:
+        # Dijkstra over the reduced costs of the arcs with capacity left
+        dist = {source: 0.0}
+        parent = {}
+        done = set()
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            done.add(u)
+            if u == sink:
+                break
+            for a in out[u]:
+                if capacity[a] > 0:
+                    v = to[a]
+                    nd = d + max(cost[a] + potential[u] - potential[v], 0.0)
+                    if nd < dist.get(v, math.inf):
+                        dist[v] = nd
+                        parent[v] = a
+                        heapq.heappush(heap, (nd, v))
+        if sink not in done:
+            break
+        # Nodes not reached before the sink keep their potential, which is the same as raising them by dist[sink]
+        for u in done:
+            potential[u] += dist[u] - dist[sink]
+        v = sink
+        while v != source:
+            a = parent[v]
+            capacity[a] -= 1
+            capacity[a ^ 1] += 1
+            v = to[a ^ 1]
+        flow += 1
+        if nested:
+            path_sets.append(flow_paths(Q, net, head, flow, add_cost))
+
+    if nested:
+        return path_sets
+    return flow_paths(Q, net, head, flow, add_cost)
+
+
+def flow_paths(Q, net, head, flow, cost_type):
+    """
+    Decomposes the flow routed through a network from flow_network into paths
+
+    Parameters
+    ----------
+    Q: Qnet()
+    net: dict
+        Network from flow_network, with the flow in its residual capacities
+    head: Qnode()
+    flow: int
+        Units of flow from head to tail
+    cost_type: str
+        Additive cost that the paths are sorted by
+
+    Returns
+    -------
+    list of Path()
+        Paths over Q, in order of increasing cost
+    """
+    to, capacity, channel = net["to"], net["capacity"], net["channel"]
+    source, sink = net["head"], net["tail"]
+
+    # Flow crossing a channel both ways cancels out
+    used = [a for a in range(0, len(to), 2) if capacity[a] == 0]
+    crossed = {channel[a] for a in used if channel[a] is not None}
+    succ = collections.defaultdict(list)
+    for a in used:
+        label = channel[a]
+        if label is None or (label[1], label[0], label[2]) not in crossed:
+            succ[to[a ^ 1]].append(a)
+
+    paths = []
+    for i in range(flow):
+        walk, arcs = [source], []
+        while walk[-1] != sink:
+            a = succ[walk[-1]].pop()
+            v = to[a]
+            arcs.append(a)
+            # Cut out loops, which only carry flow between paths of equal cost
+            if v in walk:
+                j = walk.index(v)
+                del walk[j + 1:]
+                del arcs[j:]
+            else:
+                walk.append(v)
+        channels = [channel[a] for a in arcs if channel[a] is not None]
+        paths.append(QNET.Path(Q, [head] + [v for u, v, key in channels], [key for u, v, key in channels]))
+    paths.sort(key=lambda path: path.cost_vector[cost_type])
+    return paths
+
+
+def successive_paths(C, head, tail, cost_type='f', max_paths=None):
+    """
+    Finds the best path in cost_type, removes its channels from C, and repeats until max_paths paths are found or head
+    and tail are disconnected
+
+    Parameters
+    ----------
+    C: Qnet()
+        Graph to find the paths in, which loses their channels
+    head: Union[string, Qnode()]
+    tail: Union[string, Qnode()]
+    cost_type: str, optional
+        (The default is 'f')
+    max_paths: int, optional
+        (The default is None)
+
+    Returns
+    -------
+    list of Path()
+        Paths over C, with the cost vectors that they had when they were found
+    """
+    head = C.getNode(head)
+    tail = C.getNode(tail)
+    paths = []
+    while (max_paths is None or len(paths) < max_paths) and nx.has_path(C, head, tail):
+        path = QNET.best_path(C, head, tail, cost_type)
+        paths.append(path)
+        path.remove_edges()
+    return paths
+
+
+def candidate_paths(Q, head, tail, cost_type='f', max_paths=None, method='greedy'):
+    """
+    Finds the paths that purify, purify_reduce and simple_purify purify, best first
+
+    Parameters
+    ----------
+    Q: Qnet()
+    head: Union[string, Qnode()]
+    tail: Union[string, Qnode()]
+    cost_type: str, optional
+        (The default is 'f')
+    max_paths: int, optional
+        (The default is None, which finds paths until head and tail are disconnected)
+    method: str, optional
+        edge_disjoint, node_disjoint, total_disjoint: The max_paths disjoint paths of least total additive cost, found
+        by disjoint_paths
+        greedy: The best path, then the best path once its channels are removed, and so on, found by successive_paths
+        Other inputs produce a ValueError. (The default is 'greedy')
+
+    Returns
+    -------
+    list of Path()
+        Paths over Q, or for the greedy method over a copy of Q, with the cost vectors that they had when they were
+        found
+    """
+    if method == "greedy":
+        return successive_paths(copy.deepcopy(Q), head, tail, cost_type, max_paths)
+    if method not in disjoint_methods:
+        raise ValueError(f"Invalid method. \"{method}\" not in {path_methods}")
+    return disjoint_paths(Q, head, tail, max_paths, cost_type, method)
+
+
+def plan_purification(Q, head, tail, objective='f', min_e=None, min_f=None, prob=0.5, subsets=False,
+                      max_paths=None, paths=None, method='greedy'):
+    """
+    Chooses how many paths to purify, or which, to optimise an objective
+
+    Every choice is purified at once with the kernels of Purification.py. With method='greedy', the candidate paths
+    are found once with successive_paths and the choices are their prefixes: the first path, the first two, and so on.
+    The disjoint methods find the least cost set of n paths for every n in one solve, since the set of n paths is the
+    flow of n units that the solve passes through, and these sets are the choices. Either way, choosing n paths is
+    what purify_reduce does with threshold=n-1 and the same method. With subsets=True, every subset of the candidate
+    paths of candidate_paths is a choice, and with paths given, every prefix of them.
+
+    Parameters
+    ----------
+    Q: Qnet()
+    head: Union[string, Qnode()]
+    tail: Union[string, Qnode()]
+    objective: str or function, optional
+        'f' to maximise the purified fidelity, 'e' to maximise the purified efficiency, or a function objective(f, e)
+        of arrays of purified fidelities and efficiencies that returns an array of scores to maximise, i.e.
+        lambda f, e: e * (2 * f - 1). (The default is 'f')
+    min_e: float, optional
+        Choices with a purified efficiency below min_e are not allowed
+    min_f: float, optional
+        Choices with a purified fidelity below min_f are not allowed
+    prob: float, optional
+        Probability of a given projective measurement. (The default is 0.5)
+    subsets: bool, optional
+        If True, evaluate every subset of the candidate paths rather than every prefix. There are 2^k subsets of k
+        paths, so max_paths should be small. (The default is False)
+    max_paths: int, optional
+        Largest number of candidate paths. (The default is None, which means all of them, or 16 for subsets)
+    paths: list of Path(), optional
+        Candidate paths, if they were already found. (The default is None, which finds them with candidate_paths)
+    method: str, optional
+        Method of finding the candidate paths. See candidate_paths. (The default is 'greedy')
+
+    Returns
+    -------
+    dict or None
+        None if no choice satisfies the constraints. Otherwise,
+
+        paths: The chosen paths
+        indices: Indices of the chosen paths among the candidates
+        n: Number of chosen paths
+        cost_vector: {'e': purified efficiency, 'f': purified fidelity}
+        score: Value of the objective
+        candidates: All candidate paths. For the disjoint methods, every path of the least cost sets
+        table: DataFrame of every choice evaluated, with the columns "paths", "n", "e", "f", "score" and "feasible"
+    """
+    masks = None
+    if paths is None:
+        if subsets is True and max_paths is None:
+            max_paths = 16
+        if subsets is not True and method in disjoint_methods:
+            # The least cost sets of different sizes can share paths, which are candidates once
+            paths, index, rows = [], {}, []
+            for path_set in disjoint_paths(Q, head, tail, max_paths, 'f', method, nested=True):
+                row = []
+                for path in path_set:
+                    label = (tuple(path.node_array), tuple(path.edge_keys))
+                    if label not in index:
+                        index[label] = len(paths)
+                        paths.append(path)
+                    row.append(index[label])
+                rows.append(row)
+            masks = np.zeros((len(rows), len(paths)), dtype=bool)
+            for n, row in enumerate(rows):
+                masks[n, row] = True
+        else:
+            paths = candidate_paths(Q, head, tail, 'f', max_paths, method)
+    if len(paths) == 0:
+        return None
+    f = np.array([path.cost_vector['f'] for path in paths], dtype=float)
+    e = np.array([path.cost_vector['e'] for path in paths], dtype=float)
+    k = len(paths)
+
+    if masks is not None:
+        pur_f = purify_fidelity(np.where(masks, f, np.nan))
+        pur_e = purify_efficiency(np.where(masks, e, np.nan), prob)
+    elif subsets is True:
+        assert k <= 20, "Too many candidate paths to evaluate every subset. Set max_paths"
+        masks = (np.arange(1, 2 ** k)[:, None] >> np.arange(k)) & 1 == 1
+        pur_f = purify_fidelity(np.where(masks, f, np.nan))
+        pur_e = purify_efficiency(np.where(masks, e, np.nan), prob)
+    else:
+        masks = np.tri(k, dtype=bool)
+        pur_f = purify_fidelity_prefix(f)
+        pur_e = purify_efficiency_prefix(e, prob)
+
+    if objective == 'f':
+        score = pur_f
+    elif objective == 'e':
+        score = pur_e
+    else:
+        score = np.broadcast_to(np.asarray(objective(pur_f, pur_e), dtype=float), pur_f.shape)
+    feasible = ~np.isnan(score)
+    if min_e is not None:
+        feasible &= pur_e >= min_e
+    if min_f is not None:
+        feasible &= pur_f >= min_f
+
+    table = pd.DataFrame({"paths": [tuple(np.flatnonzero(mask)) for mask in masks], "n": masks.sum(axis=1),
+                          "e": pur_e, "f": pur_f, "score": score, "feasible": feasible})
+    if not feasible.any():
+        return None
+    # The first best choice is kept, which is the one with the fewest paths unless every subset is evaluated
+    best = int(np.argmax(np.where(feasible, score, -np.inf)))
+    indices = [int(i) for i in np.flatnonzero(masks[best])]
+    return {"paths": [paths[i] for i in indices], "indices": indices, "n": len(indices),
+            "cost_vector": {'e': float(pur_e[best]), 'f': float(pur_f[best])}, "score": float(score[best]),
+            "candidates": paths, "table": table}
@@ -7,15 +7,112 @@ Created on Tue Mar 24 17:22:47 2020
 
 import networkx as nx
 import QNET
+import collections
+import copy
 from typing import Callable
 
+# Sets of cost types shared by the entries of the change logs. See Qnet.touch
+cost_sets = {}
+
 typeDict = {'Ground': QNET.Ground,
             'Satellite': QNET.Satellite,
             'Swapper': QNET.Swapper}
 
 
+class RouteCache:
+    def __init__(self, maxsize=1024):
+        """
+        Least recently used cache of best_path and best_path_cost results for a Qnet.
+
+        Each entry records the version of the Qnet it was computed at together with the nodes and edges of its route.
+        When the Qnet has changed since, the entry is still served if every change was off the route and could not
+        have lowered the cost of any other path. See Qnet.changed_since for details.
+
+        Parameters
+        ----------
+        maxsize: int, optional
+            Maximum number of cached routes. (The default is 1024)
+
+        Attributes
+        ----------
+        entries: OrderedDict
+            Dictionary between (source, target, cost_type, kind) and (version, ids of the route nodes, ids of the
+            route edges, value)
+        rates: dict
+            Dictionary between cost types and the (version, rate) used by the A* heuristic
+        hits: int
+        misses: int
+        """
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.rates = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, Q, key, cost_type):
+        """
+        Returns the cached value for key if it is still valid for Q, else None.
+
+        Parameters
+        ----------
+        Q: Qnet()
+        key: tuple
+            (source, target, cost_type, kind)
+        cost_type: str
+            Cost type of the route, i.e. 'f'
+
+        Returns
+        -------
+        Cached value or None
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        version, nodes, edges, value = entry
+        if Q.changed_since(version, nodes, edges, cost_type):
+            del self.entries[key]
+            self.misses += 1
+            return None
+        # Still valid, so bring the entry up to the current version
+        self.entries[key] = (Q.version, nodes, edges, value)
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, Q, key, node_list, edge_keys, value):
+        """
+        Cache the value of a route
+
+        Parameters
+        ----------
+        Q: Qnet()
+        key: tuple
+            (source, target, cost_type, kind)
+        node_list: [Qnode()]
+            Nodes of the route
+        edge_keys: [int]
+            Edge keys of the route
+        value:
+            Value to cache
+        """
+        nodes = frozenset(id(node) for node in node_list)
+        edges = set()
+        for u, v, k in zip(node_list[:-1], node_list[1:], edge_keys):
+            edges.add((id(u), id(v), k))
+            edges.add((id(v), id(u), k))
+        self.entries[key] = (Q.version, nodes, frozenset(edges), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.rates.clear()
+
+
 class Qnet(nx.MultiGraph):
-    def __init__(self, cost_vector=None, cost_ranges=None, conversions=None, memory_vector=None, memory_ranges=None, memory_conversions=None, incoming_graph_data=None, **attr):
+    def __init__(self, cost_vector=None, cost_ranges=None, conversions=None, memory_vector=None, memory_ranges=None, memory_conversions=None, incoming_graph_data=None, route_cache_size=1024, **attr):
         """
         Initialization method for the Qnet class.
 
@@ -57,6 +154,11 @@ class Qnet(nx.MultiGraph):
             See NetworkX Documentation
             https://networkx.github.io/documentation/stable/reference/classes/graph.html#methods
 
+        route_cache_size: int, optional
+            Maximum number of best_path and best_path_cost results kept in the route cache
+
+            (The default is 1024)
+
         attr:
             Additional NetworkX attributes
 
@@ -68,6 +170,19 @@ class Qnet(nx.MultiGraph):
         cost_vector
         cost_ranges
         conversions
+        version: int
+            Monotonically increasing counter of mutations of the graph
+        changes: deque
+            Log of recent mutations. See touch
+        ids: dict [int, Qnode]
+            Dictionary between the ids of the nodes and the nodes, which resolves the ids in the change log. See
+            node_from_id
+        route_cache: RouteCache
+            Cache of best_path and best_path_cost results
+        visibility: VisibilityManager or None
+            Manager of satellite channels by visibility. See enable_visibility
+        time: float
+            Time of the Qnet in seconds, advanced by update. See set_time
 
         Examples
         --------
@@ -105,12 +220,12 @@ class Qnet(nx.MultiGraph):
         else:
             assert set(memory_vector.keys()) == set(memory_ranges.keys()), \
                 "Keys in \"cost_vector\" do not match keys in \"cost_ranges\""
-            assert set(memory_vector.keys()) == set(conversions.keys()), \
-                "Keys in \"cost_vector\" do not match keys in \"conversions\""
+            assert set(memory_vector.keys()) == set(memory_conversions.keys()), \
+                "Keys in \"memory_vector\" do not match keys in \"memory_conversions\""
             for rng in memory_ranges.values():
                 assert(len(rng) == 2),\
                     "Usage: cost_ranges = {cost: (min_val, max_val)}"
-            for functions in conversions.values():
+            for functions in memory_conversions.values():
                 assert(len(functions) == 2),\
                     "Usage: conversions = {'cost': [convert_to_additive, convert_to_multiplicative]}"
 
@@ -121,8 +236,265 @@ class Qnet(nx.MultiGraph):
         self.memory_vector = memory_vector
         self.memory_ranges = memory_ranges
         self.memory_conversions = memory_conversions
+
+        # Mutation tracking. This has to be set up before networkx adds any incoming graph data
+        self.version = 0
+        self.changes = collections.deque(maxlen=4096)
+        self.route_cache = RouteCache(maxsize=route_cache_size)
+        # Dictionary between node names and nodes. See getNode
+        self.names = {}
+        self.ids = {}
+        # Management of satellite channels by visibility. See enable_visibility
+        self.visibility = None
+        self.time = 0
         super().__init__(incoming_graph_data, **attr)
 
+    def touch(self, nodes=(), edges=(), costs=None, decreased=None):
+        """
+        Record a mutation of the graph
+
+        Increments the version of the graph and appends the mutation to the change log. Each entry of the log is
+
+            (version, node ids, edge ids, costs, decreased)
+
+        where the node ids are a tuple of id(node) and the edge ids a tuple of (id(u), id(v), key). The log holds ids
+        rather than nodes, so that it does not keep removed nodes alive. Use node_from_id to look the nodes up.
+
+        All mutations made through Qnet methods and the networkx add/remove methods are recorded automatically. Costs
+        changed by editing node or edge dictionaries directly are not, so call touch afterwards.
+
+        Parameters
+        ----------
+        nodes: iterable of Qnode(), optional
+            Nodes that were changed
+        edges: iterable of (Qnode(), Qnode(), int), optional
+            Edges that were changed, with their keys
+        costs: iterable of str, optional
+            Cost types that were changed
+
+            (The default is None, which means all costs in the cost vector)
+        decreased: iterable of str, optional
+            Cost types whose additive cost may have decreased somewhere, making other paths cheaper
+
+            (The default is None, which means all changed costs)
+
+        Returns
+        -------
+        None
+        """
+        costs = frozenset(self.cost_vector if costs is None else costs)
+        decreased = costs if decreased is None else frozenset(decreased)
+        # Entries share the sets of cost types, of which there are only a few
+        costs = cost_sets.setdefault(costs, costs)
+        decreased = cost_sets.setdefault(decreased, decreased)
+        nodes = tuple({id(node) for node in nodes})
+        edges = tuple({(id(u), id(v), key) for u, v, key in edges})
+
+        self.version += 1
+        self.changes.append((self.version, nodes, edges, costs, decreased))
+
+    def node_from_id(self, i):
+        """
+        Returns the node of the Qnet whose id is i, or None if there is no such node, i.e. because it was removed
+
+        Parameters
+        ----------
+        i: int
+            id of a node, as in the change log
+
+        Returns
+        -------
+        Qnode or None
+        """
+        node = self.ids.get(i)
+        if node is None and len(self.ids) != len(self._node):
+            # Nodes added by networkx along with an edge are not indexed yet
+            self.ids = {id(node): node for node in self._node}
+            node = self.ids.get(i)
+        if node is None or node not in self._node:
+            return None
+        return node
+
+    def changed_since(self, version, nodes, edges, cost_type):
+        """
+        Checks if the optimal route in a cost type may have changed since a given version of the graph.
+
+        A route stays optimal if every change since then was to elements off the route and did not decrease the cost
+        of anything, since then no other path can have become cheaper.
+
+        Parameters
+        ----------
+        version: int
+            Version of the graph that the route was computed at
+        nodes: set of int
+            ids of the nodes of the route
+        edges: set of (int, int, int)
+            ids of the edges of the route, (id(u), id(v), key), in both orientations
+        cost_type: str
+            Cost type of the route
+
+        Returns
+        -------
+        bool
+        """
+        if version == self.version:
+            return False
+        # If the log no longer reaches back to version, assume the worst
+        if len(self.changes) == 0 or self.changes[0][0] > version + 1:
+            return True
+        for change_version, changed_nodes, changed_edges, costs, decreased in reversed(self.changes):
+            if change_version <= version:
+                break
+            if cost_type in decreased:
+                return True
+            if cost_type in costs and not (nodes.isdisjoint(changed_nodes) and edges.isdisjoint(changed_edges)):
+                return True
+        return False
+
+    def add_node(self, node_for_adding, **attr):
+        new = node_for_adding not in self._node
+        super().add_node(node_for_adding, **attr)
+        if new:
+            self.names.setdefault(node_for_adding.name, node_for_adding)
+            self.ids[id(node_for_adding)] = node_for_adding
+            self.touch(nodes=[node_for_adding], costs=(), decreased=())
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        nodes_for_adding = list(nodes_for_adding)
+        super().add_nodes_from(nodes_for_adding, **attr)
+        nodes = [n[0] if isinstance(n, tuple) else n for n in nodes_for_adding]
+        for node in nodes:
+            self.names.setdefault(node.name, node)
+            self.ids[id(node)] = node
+        self.touch(nodes=nodes, costs=(), decreased=())
+
+    def remove_node(self, n):
+        edges = [(n, nbr, key) for nbr, keydict in self._adj.get(n, {}).items() for key in keydict]
+        super().remove_node(n)
+        if self.names.get(n.name) is n:
+            del self.names[n.name]
+        self.ids.pop(id(n), None)
+        self.touch(nodes=[n], edges=edges, decreased=())
+
+    def remove_nodes_from(self, nodes):
+        nodes = [n for n in nodes if n in self._node]
+        edges = [(n, nbr, key) for n in nodes for nbr, keydict in self._adj[n].items() for key in keydict]
+        super().remove_nodes_from(nodes)
+        for node in nodes:
+            if self.names.get(node.name) is node:
+                del self.names[node.name]
+            self.ids.pop(id(node), None)
+        self.touch(nodes=nodes, edges=edges, decreased=())
+
+    def add_edge(self, u_for_edge, v_for_edge, key=None, **attr):
+        old = None
+        if key is not None and self.has_edge(u_for_edge, v_for_edge, key):
+            old = dict(self._adj[u_for_edge][v_for_edge][key])
+        # networkx adds missing endpoints along with the edge
+        new_nodes = [node for node in (u_for_edge, v_for_edge) if node not in self._node]
+        key = super().add_edge(u_for_edge, v_for_edge, key, **attr)
+        for node in new_nodes:
+            self.names.setdefault(node.name, node)
+            self.ids[id(node)] = node
+
+        if old is None:
+            # A new edge may make any path cheaper
+            self.touch(edges=[(u_for_edge, v_for_edge, key)])
+        else:
+            new = self._adj[u_for_edge][v_for_edge][key]
+            changed = [c for c in self.cost_vector if new.get("add_" + c) != old.get("add_" + c)]
+            decreased = [c for c in changed if not new.get("add_" + c, 0) >= old.get("add_" + c, 0)]
+            self.touch(edges=[(u_for_edge, v_for_edge, key)], costs=changed, decreased=decreased)
+        return key
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        keys = super().add_edges_from(ebunch_to_add, **attr)
+        if len(self.ids) != len(self._node):
+            # Endpoints added without going through add_edge
+            for node in self._node:
+                if id(node) not in self.ids:
+                    self.names.setdefault(node.name, node)
+                    self.ids[id(node)] = node
+        self.touch()
+        return keys
+
+    def remove_edge(self, u, v, key=None):
+        if key is None and self.has_edge(u, v):
+            key = list(self._adj[u][v])[-1]
+        super().remove_edge(u, v, key)
+        self.touch(edges=[(u, v, key)], decreased=())
+
+    def clear(self):
+        super().clear()
+        self.names.clear()
+        self.ids.clear()
+        self.touch()
+
+    def clear_edges(self):
+        super().clear_edges()
+        self.touch()
+
+    def clone(self):
+        """
+        Returns an independent copy of the Qnet. copy.deepcopy(Q) gives the same result.
+
+        The nodes, channels, cost dictionaries and coordinates are copied. The cost schema (cost_vector, cost_ranges,
+        conversions and their memory analogues) and the skyfield objects of satellites are shared with the original,
+        since they are never modified in place. As in networkx.Graph.copy, edge attribute dictionaries are copied one
+        level deep.
+
+        The copy is at the same version as the original, with an empty route cache and change log.
+
+        Returns
+        -------
+        Qnet()
+        """
+        return copy.deepcopy(self)
+
+    def memory_report(self):
+        """
+        Break down the bytes held by the Qnet by component. See QNET.memory_report
+
+        Returns
+        -------
+        dict [str, int]
+        """
+        return QNET.memory_report(self)
+
+    def __deepcopy__(self, memo):
+        cls = self.__class__
+        C = cls.__new__(cls)
+        memo[id(self)] = C
+        Qnet.__init__(C, cost_vector=self.cost_vector, cost_ranges=self.cost_ranges, conversions=self.conversions,
+                      memory_vector=self.memory_vector, memory_ranges=self.memory_ranges,
+                      memory_conversions=self.memory_conversions, route_cache_size=self.route_cache.maxsize)
+        C.version = self.version
+        C.graph.update(copy.deepcopy(self.graph, memo))
+
+        nodes = {node: copy.deepcopy(node, memo) for node in self._node}
+        C._node = {nodes[node]: dict(data) for node, data in self._node.items()}
+        # Both directions of an edge share one key dictionary in a MultiGraph, which the copy must keep
+        adj = {}
+        for u, nbrs in self._adj.items():
+            new_u = nodes[u]
+            new_nbrs = adj[new_u] = {}
+            for v, keydict in nbrs.items():
+                new_v = nodes[v]
+                if new_v in adj and new_u in adj[new_v]:
+                    new_nbrs[new_v] = adj[new_v][new_u]
+                else:
+                    new_nbrs[new_v] = {key: dict(data) for key, data in keydict.items()}
+        C._adj = adj
+        C.names = {name: nodes[node] for name, node in self.names.items() if node in nodes}
+        C.ids = {id(node): node for node in C._node}
+        C.visibility = copy.deepcopy(self.visibility, memo)
+
+        # Copy any other attributes, leaving out the views that networkx caches on the instance
+        for key, value in self.__dict__.items():
+            if key not in C.__dict__ and key not in ('nodes', 'edges', 'adj', 'degree'):
+                C.__dict__[key] = copy.deepcopy(value, memo)
+        return C
+
     def __str__(self):
         qnodes = ""
         if len(self.nodes()) == 0:
@@ -227,12 +599,130 @@ class Qnet(nx.MultiGraph):
             (For details, see documentation for add_qnode() or Node class)
         """
         for data in nbunch:
-            # We pop these elements because they are common for each node instance, and hence are keyword arguments
+            # We pop these elements because they are common for each node instance, and hence are keyword arguments.
+            # Copy first so that the caller's dictionaries are left alone
+            data = dict(data)
             name = data.pop("name", None)
             qnode_type = data.pop("qnode_type", None)
             coords = data.pop("coords", None)
             self.add_qnode(name, qnode_type, coords, **data)
 
+    def update_qnodes(self, updates, from_default=True):
+        """
+        Update multiple existing Qnodes from a list of dictionaries.
+
+        Each node is updated as in Qnode.update, but the default cost vectors are made once for the whole batch and
+        the changes are recorded as a single mutation of the graph.
+
+        Parameters
+        ----------
+        updates:
+            A list of dictionaries, each with the "name" of a node and the key word arguments for its update. A
+            dictionary may hold its own "from_default" value
+
+            For details, consult the documentation for Qnode.update
+        from_default: bool, optional
+            If True, reset the parameters of each node to their defaults before updating it. (The default is True)
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        AssertionError
+            If a node does not exist or any of the costs are out of their specified ranges
+
+        Examples
+        --------
+        >>> Q.update_qnodes([{'name': 'A', 'e': 0.9}, {'name': 'B', 'coords': [0, 1, 0], 'from_default': False}])
+        """
+        default_costs = QNET.make_cost_vector(self)
+        default_memory = QNET.make_memory_vector(self)
+        nodes = []
+        changed = set()
+        decreased = set()
+        for data in updates:
+            data = dict(data)
+            name = data.pop("name")
+            node = self.getNode(name)
+            assert node is not None, f"Node \"{name}\" is not in the Qnet"
+            old_costs = node.apply_update(self, data.pop("from_default", from_default), default_costs, default_memory,
+                                          **data)
+            nodes.append(node)
+            for c in self.cost_vector:
+                new, old = node.costs["add_" + c], old_costs.get("add_" + c)
+                if new != old:
+                    changed.add(c)
+                    if not new >= (old if old is not None else 0):
+                        decreased.add(c)
+
+        # Keep the name index up to date
+        if any(self.names.get(node.name) is not node for node in nodes):
+            self.reindex()
+        self.touch(nodes=nodes, costs=changed, decreased=decreased)
+
+    def add_satellites_from_tle_file(self, path, t=0, **kwargs):
+        """
+        Add a constellation of Satellites with geodesic coordinates to the Qnet from a TLE file.
+
+        The constellation is built in one pass. The satellites share the skyfield timescale and parsed elements of the
+        process-wide cache (See Node.get_earth_satellite) and are all tracked from the same start time. Satellites
+        whose names already exist in the Qnet take the elements and costs from the file in place, after which their
+        channels are updated by the next call to update.
+
+        Parameters
+        ----------
+        path: str
+            Path of the TLE file. See Readers.read_tle_file for its format
+        t: float, optional
+            Time (in seconds) ahead of the current time from which the satellites are tracked. (The default is 0)
+        kwargs:
+            Costs of the satellites
+
+        Returns
+        -------
+        list of Satellite()
+            The satellites of the file
+
+        Raises
+        ------
+        AssertionError
+            If a name in the file belongs to a node of the Qnet that is not a Satellite, or any of the costs are out of
+            their specified ranges
+        """
+        ts = QNET.get_timescale()
+        t_now = ts.now()
+        utc = t_now.utc
+        t_startTime = ts.utc(utc[0], utc[1], utc[2], utc[3], utc[4], utc[5] + t)
+        costs = QNET.make_cost_vector(self, **kwargs)
+        memory = QNET.make_memory_vector(self, **kwargs)
+
+        satellites = {}
+        updated = []
+        for name, line1, line2 in QNET.read_tle_file(path):
+            satellite = QNET.get_earth_satellite(line1, line2, name)
+            subpoint = satellite.at(t_startTime).subpoint()
+            coords = [int(subpoint.latitude.degrees), int(subpoint.longitude.degrees), int(subpoint.elevation.km)]
+            orbit = {'cartesian': False, 'line1': line1, 'line2': line2, 'ts': ts, 't_now': t_now,
+                     't_startTime': t_startTime, 't_new': t_startTime, 'satellite': satellite, 'time': 0}
+
+            node = self.getNode(name)
+            if node is not None:
+                assert isinstance(node, QNET.Satellite), f"\"{name}\" is a {type(node).__name__}, not a Satellite"
+                node.__dict__.update(orbit, coords=coords, costs=dict(costs), memory=dict(memory))
+                updated.append(node)
+            else:
+                node = QNET.make_qnode(QNET.Satellite, name, coords, dict(costs), dict(memory), **orbit)
+            satellites[name] = node
+
+        new_nodes = [node for node in satellites.values() if node not in self]
+        if len(new_nodes) > 0:
+            self.add_nodes_from(new_nodes)
+        if len(updated) > 0:
+            self.touch(nodes=updated)
+        return list(satellites.values())
+
     def remove_qnode(self, qnode):
         """
         Remove a qnode from the graph
@@ -389,16 +879,44 @@ class Qnet(nx.MultiGraph):
         matches the name given. In theory, this shouldn't be a problem regardless since the add_qnode method handles
         a duplicate name by overwriting the existing node.
 
+        Nodes are looked up in the dictionary Qnet.names. Nodes renamed through Qnet.updateName or Qnode.update are
+        reindexed automatically, but if you assign node.name directly, call reindex afterwards. Nodes added through the
+        networkx methods of the base class are indexed on the first lookup that misses them.
         """
+        # Checked here rather than in collector_count, since getNode is called far too often to afford the call
+        collecting = QNET.instrumentation['collector'] is not None
+        if collecting:
+            QNET.collector_count("getNode calls")
         if isinstance(node_name, QNET.Qnode):
+            node_name = node_name.name
+        # Graph views share nodes with their parent graph but not its name index
+        if nx.is_frozen(self):
+            if collecting:
+                QNET.collector_count("getNode scans")
             for node in self.nodes():
-                if node.name == node_name.name:
+                if node.name == node_name:
                     return node
-        for node in self.nodes():
-            if node.name == node_name:
-                return node
+            return None
+        node = self.names.get(node_name)
+        if node is not None and node.name == node_name and node in self._node:
+            return node
+        if node is not None or len(self.ids) != len(self._node):
+            # The index is out of date, or misses nodes that were added without going through Qnet
+            self.reindex()
+            return self.names.get(node_name)
         return None
 
+    def reindex(self):
+        """
+        Rebuild the dictionary between node names and nodes used by getNode, and the dictionary between node ids and
+        nodes used by node_from_id
+        """
+        self.ids = {id(node): node for node in self.nodes()}
+        self.names = {}
+        for node in self.nodes():
+            # Keep the first node of a given name, as getNode has always done
+            self.names.setdefault(node.name, node)
+
     def update(self, dt):
         """
         Updates all time dependent elements in the Qnet by a given time increment
@@ -406,6 +924,9 @@ class Qnet(nx.MultiGraph):
         Currently, this function:
             + Updates Satellite positions
             + Updates Satellite channel costs by performing the Node method "airCost"
+            + If visibility is enabled, creates and removes channels between satellites and ground nodes as they come
+              into and out of view (See enable_visibility)
+            + Increments the version of the Qnet and records the changed channels (See touch)
 
         Parameters
         ----------
@@ -414,42 +935,111 @@ class Qnet(nx.MultiGraph):
             Size of time increment
         Returns
         -------
-        None.
+        list of (Qnode, Qnode, int)
+            The channels whose costs were changed by the update
         """
         assert (dt is not None)
+        return self.set_time(self.time + dt)
+
+    def set_time(self, t):
+        """
+        Sets the Qnet to a given time, moving satellites directly to their positions at that time rather than through
+        a sequence of updates. update(dt) is the same as set_time(Q.time + dt)
+
+        Each satellite is moved by t - Q.time from its own time (See Satellite.set_time), and satellite channels are
+        updated as in update.
+
+        Parameters
+        ----------
+        self:
+        t : float
+            Time in seconds
+        Returns
+        -------
+        list of (Qnode, Qnode, int)
+            The channels whose costs were changed
+        """
+        dt = t - self.time
+        self.time = t
 
         # Update satellite positions
+        satellites = []
         for node in self.nodes:
             if isinstance(node, QNET.Satellite):
                 # Update satellite position:
-                node.posUpdate(dt)
+                node.set_time(node.time + dt)
+                satellites.append(node)
+        # Moving a satellite changes no costs by itself, but it is still a new version of the graph
+        self.touch(nodes=satellites, costs=(), decreased=())
 
         # Update satellite channels
-        for node in self.nodes:
-            if isinstance(node, QNET.Satellite):
-                # Get neighboring channels:           
-                edges = self.edges(node)
-                # Update channels:
-                for edge in edges:
-                    if isinstance(edge[0], QNET.Satellite):
-                        s = edge[0]
-                        n = edge[1]
-                    else:
-                        n = edge[0]
-                        s = edge[1]
-
-                    # newCost = [e, p]
-                    newCost = s.airCost(n)
-
-                    # Unpack newCost
-                    new_e = newCost[0]
-                    new_p = newCost[1]
-
-                    # Update edge
-                    # self.remove_edge(s, n)
-                    # No longer need to remove edge, since add_qchan updates properly now
-                    # TODO: Fix keys to handle multigraph update
-                    self.add_qchan(edge=(s.name, n.name), key=0, e=new_e, p=new_p)
+        changed = []
+        if self.visibility is not None:
+            # Channels to ground nodes follow what the satellites can see
+            changed += self.visibility.refresh(satellites)
+        for node in satellites:
+            # Get neighboring channels:
+            edges = list(self.edges(node))
+            # Update channels:
+            for edge in edges:
+                if isinstance(edge[0], QNET.Satellite):
+                    s = edge[0]
+                    n = edge[1]
+                else:
+                    n = edge[0]
+                    s = edge[1]
+                if self.visibility is not None and self.visibility.manages(s, n):
+                    continue
+
+                # Update edge. add_qchan calculates the new costs with "airCost"
+                # TODO: Fix keys to handle multigraph update
+                # A channel that only exists under other keys gets a key 0 channel, as add_qchan has always done
+                old_costs = self.adj[s][n].get(0)
+                old_costs = None if old_costs is None else dict(old_costs)
+                self.add_qchan(edge=(s.name, n.name), key=0)
+                if self.adj[s][n][0] != old_costs:
+                    changed.append((s, n, 0))
+        return changed
+
+    def enable_visibility(self, min_elevation=0, nodes=None, key=0, plan=None):
+        """
+        Manage the channels between satellites and ground nodes by visibility.
+
+        From now on, update only evaluates channels between satellites and the ground nodes that they can see, found
+        through a spatial index over the ground nodes. Channels are created as ground nodes come into view and removed
+        as they leave it. The channels are brought in line with the current positions of the satellites immediately.
+
+        Parameters
+        ----------
+        min_elevation: float, optional
+            Elevation mask in degrees. A ground node sees a satellite if the elevation of the satellite is at least
+            min_elevation. (The default is 0)
+        nodes: list of Qnode(), optional
+            Ground nodes to manage channels to. (The default is None, which means all Ground nodes)
+        key: int, optional
+            Key of the managed channels. (The default is 0)
+        plan: ContactPlan, optional
+            Contact plan whose windows decide visibility over its time span, so that satellites without a contact are
+            skipped. See VisibilityManager. (The default is None)
+
+        Returns
+        -------
+        VisibilityManager
+
+        Examples
+        --------
+        >>> Q.enable_visibility(min_elevation=10)
+        >>> Q.update(60)
+        """
+        self.visibility = QNET.VisibilityManager(self, min_elevation, nodes, key, plan)
+        self.visibility.refresh()
+        return self.visibility
+
+    def disable_visibility(self):
+        """
+        Stop managing satellite channels by visibility. Existing channels are kept
+        """
+        self.visibility = None
 
     def updateName(self, n):
         """
@@ -469,3 +1059,4 @@ class Qnet(nx.MultiGraph):
         """
         for node in self.nodes:
             node.name = str(n)+node.name
+        self.reindex()
@@ -0,0 +1,283 @@
+"""
+Readers.py contains streaming importers for building large Qnet graphs from node and edge tables on disk.
+
+Tables are read in chunks with pandas, and the costs of each chunk are validated and converted to their additive forms
+with NumPy, so that only one chunk of the file is held in memory at a time.
+
+Node tables have a "name" column and optionally the columns:
+    qnode_type: One of {'Ground', 'Satellite', 'Swapper'}. Missing values give a Qnode of the default type
+    x, y, z: Coordinates of the node
+    isMemory: Whether the node has quantum memory
+    swap_prob: Swap probability of Swapper nodes
+    Any cost in Q.cost_vector or Q.memory_vector
+
+Edge tables have "u" and "v" columns for the names of the nodes to be connected, and optionally a "key" column and
+columns for any cost in Q.cost_vector. Missing costs take their default values from Q.cost_vector.
+
+Satellite constellations are read from TLE files with read_tle_file. See Qnet.add_satellites_from_tle_file.
+"""
+
+import QNET
+import numpy as np
+import pandas as pd
+
+
+def chunk_costs(chunk, cost_vector, cost_ranges, conversions):
+    """
+    Returns the validated costs of a chunk of a table, including their additive forms
+
+    Parameters
+    ----------
+    chunk: DataFrame
+    cost_vector: dict
+        Default cost vector, i.e. Q.cost_vector or Q.memory_vector
+    cost_ranges: dict
+        Ranges of the costs
+    conversions: dict
+        Conversions of the costs
+
+    Returns
+    -------
+    dict [str, numpy.ndarray]
+        Dictionary between cost names and arrays of costs
+
+    Raises
+    ------
+    AssertionError
+        If any of the costs are out of their specified ranges
+    """
+    costs = {}
+    for name, default in cost_vector.items():
+        if name in chunk:
+            values = chunk[name].to_numpy(dtype=float)
+            # Missing values take the default cost
+            values = np.where(np.isnan(values), default, values)
+        else:
+            values = np.full(len(chunk), default, dtype=float)
+
+        # Assert that costs are within the correct range:
+        cost_min, cost_max = cost_ranges[name]
+        bad = np.flatnonzero((values < cost_min) | (values > cost_max))
+        if len(bad) > 0:
+            assert False, f"Out of range -- ({cost_min} <= {name} <= {cost_max}), " + \
+                          f"{name} == {values[bad[0]]} in row {chunk.index[bad[0]]}"
+        costs[name] = values
+
+    # Initialize additive costs
+    for name in cost_vector:
+        costs["add_" + name] = np.asarray(conversions[name][0](costs[name]), dtype=float) + np.zeros(len(chunk))
+    return costs
+
+
+def cost_dicts(costs, n):
+    """
+    Turns a dictionary of cost arrays into a list of n cost dictionaries of python floats
+    """
+    keys = list(costs)
+    columns = [costs[key].tolist() for key in keys]
+    return [dict(zip(keys, values)) for values in zip(*columns)] if keys else [{} for i in range(n)]
+
+
+def make_qnode(cls, name, coords, costs, memory, isMemory=False, **attrs):
+    """
+    Create a Qnode of class cls from precomputed cost vectors without running its constructor
+    """
+    node = cls.__new__(cls)
+    node.name = name
+    node.coords = coords
+    node.costs = costs
+    node.memory = memory
+    node.isMemory = isMemory
+    for key, value in attrs.items():
+        setattr(node, key, value)
+    return node
+
+
+def read_qnodes_csv(Q, path, chunksize=100000, **kwargs):
+    """
+    Add Qnodes to a Qnet from a node table, streaming it in chunks
+
+    Ground, Swapper and default Qnodes are built directly from the validated cost arrays. Satellites, and nodes
+    whose names already exist in Q, go through add_qnode.
+
+    Parameters
+    ----------
+    Q: Qnet()
+    path: str
+        Path of the node table. See the documentation of Readers.py for its columns
+    chunksize: int, optional
+        Number of rows read at a time. (The default is 100000)
+    kwargs:
+        Additional keyword arguments for pandas.read_csv, i.e. sep='\\t'
+
+    Returns
+    -------
+    int
+        Number of rows read
+
+    Raises
+    ------
+    AssertionError
+        If a qnode_type is invalid or any of the costs are out of their specified ranges
+    """
+    count = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize, **kwargs):
+        n = len(chunk)
+        names = chunk["name"].astype(str).tolist()
+        types = chunk["qnode_type"].tolist() if "qnode_type" in chunk else [None] * n
+        coords = np.zeros((n, 3))
+        for i, axis in enumerate(["x", "y", "z"]):
+            if axis in chunk:
+                coords[:, i] = np.nan_to_num(chunk[axis].to_numpy(dtype=float))
+        coords = coords.tolist()
+        is_memory = chunk["isMemory"].fillna(False).astype(bool).tolist() if "isMemory" in chunk else [False] * n
+        swap_prob = chunk["swap_prob"].fillna(0.5).tolist() if "swap_prob" in chunk else [0.5] * n
+
+        costs = chunk_costs(chunk, Q.cost_vector, Q.cost_ranges, Q.conversions)
+        memory = chunk_costs(chunk, Q.memory_vector, Q.memory_ranges, Q.memory_conversions)
+        cost_rows = cost_dicts(costs, n)
+        memory_rows = cost_dicts(memory, n)
+
+        # Nodes are collected by name so that a name repeated within the chunk updates the node, as in add_qnode
+        new_nodes = {}
+        for i in range(n):
+            qnode_type = types[i] if isinstance(types[i], str) else None
+            assert qnode_type is None or qnode_type in QNET.typeDict, f"Unsupported qnode type: \'{qnode_type}\'"
+            if qnode_type == 'Satellite' or Q.getNode(names[i]) is not None:
+                cost_kwargs = {key: value for key, value in cost_rows[i].items() if not key.startswith("add_")}
+                Q.add_qnode(name=names[i], qnode_type=qnode_type, coords=coords[i], isMemory=is_memory[i],
+                            **cost_kwargs)
+            elif qnode_type == 'Swapper':
+                assert swap_prob[i] >= 0.5
+                new_nodes[names[i]] = make_qnode(QNET.Swapper, names[i], coords[i], cost_rows[i], memory_rows[i],
+                                                 is_memory[i], swap_prob=swap_prob[i])
+            else:
+                cls = QNET.Qnode if qnode_type is None else QNET.typeDict[qnode_type]
+                new_nodes[names[i]] = make_qnode(cls, names[i], coords[i], cost_rows[i], memory_rows[i], is_memory[i])
+        Q.add_nodes_from(new_nodes.values())
+        count += n
+    return count
+
+
+def read_qchans_csv(Q, path, chunksize=100000, **kwargs):
+    """
+    Add Qchans to a Qnet from an edge table, streaming it in chunks
+
+    As with add_qchan, nodes that are not yet in Q are added as Ground nodes, and the costs of channels to Satellites
+    are calculated with "airCost". All other channels are added directly from the validated cost arrays.
+
+    Parameters
+    ----------
+    Q: Qnet()
+    path: str
+        Path of the edge table. See the documentation of Readers.py for its columns
+    chunksize: int, optional
+        Number of rows read at a time. (The default is 100000)
+    kwargs:
+        Additional keyword arguments for pandas.read_csv, i.e. sep='\\t'
+
+    Returns
+    -------
+    int
+        Number of rows read
+
+    Raises
+    ------
+    AssertionError
+        If any of the costs are out of their specified ranges
+    """
+    default_memory = QNET.make_memory_vector(Q)
+    count = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize, **kwargs):
+        n = len(chunk)
+        us = chunk["u"].astype(str).tolist()
+        vs = chunk["v"].astype(str).tolist()
+        keys = [None if np.isnan(key) else int(key) for key in chunk["key"].tolist()] if "key" in chunk \
+            else [None] * n
+        cost_rows = cost_dicts(chunk_costs(chunk, Q.cost_vector, Q.cost_ranges, Q.conversions), n)
+
+        # Add missing nodes as Ground nodes with default costs
+        default_costs = QNET.make_cost_vector(Q)
+        new_nodes = {}
+        for name in us + vs:
+            if name not in new_nodes and Q.getNode(name) is None:
+                new_nodes[name] = make_qnode(QNET.Ground, name, [0] * 3, dict(default_costs), dict(default_memory))
+        Q.add_nodes_from(new_nodes.values())
+
+        ebunch = []
+        for i in range(n):
+            u = Q.getNode(us[i])
+            v = Q.getNode(vs[i])
+            if isinstance(u, QNET.Satellite) or isinstance(v, QNET.Satellite):
+                Q.add_qchan(edge=(us[i], vs[i]), key=keys[i])
+            elif keys[i] is None:
+                ebunch.append((u, v, cost_rows[i]))
+            else:
+                ebunch.append((u, v, keys[i], cost_rows[i]))
+        Q.add_edges_from(ebunch)
+        count += n
+    return count
+
+
+def read_edgelist(Q, path, costs=(), chunksize=100000, **kwargs):
+    """
+    Add Qchans to a Qnet from a whitespace delimited edge list without a header, streaming it in chunks
+
+    Each line holds the names of the two nodes followed by the values of the costs named in "costs", i.e.
+    "A B 0.9 0.95" with costs=('e', 'f').
+
+    Parameters
+    ----------
+    Q: Qnet()
+    path: str
+    costs: tuple of str, optional
+        Names of the cost columns following the node names
+    chunksize: int, optional
+        Number of lines read at a time. (The default is 100000)
+    kwargs:
+        Additional keyword arguments for pandas.read_csv
+
+    Returns
+    -------
+    int
+        Number of lines read
+    """
+    kwargs.setdefault("sep", r"\s+")
+    return read_qchans_csv(Q, path, chunksize=chunksize, header=None, names=["u", "v", *costs],
+                           dtype={"u": str, "v": str}, **kwargs)
+
+
+def read_tle_file(path):
+    """
+    Read the two-line element sets in a TLE file
+
+    Each element set may be preceded by a line with the name of the satellite, as in the three-line format used by
+    CelesTrak. Satellites without a name line are named by their catalogue number.
+
+    Parameters
+    ----------
+    path: str
+
+    Returns
+    -------
+    list of (str, str, str)
+        List of (name, line1, line2)
+    """
+    elements = []
+    name = None
+    line1 = None
+    with open(path) as file:
+        for line in file:
+            line = line.rstrip()
+            if line.startswith("1 ") and len(line) >= 69:
+                line1 = line
+            elif line.startswith("2 ") and line1 is not None:
+                if name is None:
+                    name = line1[2:7].strip()
+                elements.append((name, line1, line))
+                name = None
+                line1 = None
+            elif line.strip():
+                # Names may be prefixed with "0 " in the three-line format
+                name = line[2:].strip() if line.startswith("0 ") else line.strip()
+    return elements
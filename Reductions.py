@@ -1,21 +1,25 @@
 from QNET import *
 import networkx as nx
 import collections
-import functools
 import copy
 
-def purify_reduce(Q, head, tail, threshold=None, prob=0.5):
+def purify_reduce(Q, head, tail, threshold=None, prob=0.5, method='greedy'):
     """
     Reduce a graph by purifying one or more paths
 
     Given a Qnet Q and two communication parties "head" and "tail," this function purifies paths together starting
     from the highest fidelity path until either the threshold is reached or no more paths exist to purify.
 
+    Each path purified is the best path once the edges of the paths before it are removed. With method="edge_disjoint",
+    "node_disjoint" or "total_disjoint", the threshold + 1 disjoint paths of least total additive fidelity are found
+    together by QNET.disjoint_paths instead. The edges of the purified paths are removed from the reduced graph.
+
     :param Q: Qnet()
     :param head: Source Node
     :param tail: Target Node
     :param: threshold: Maximum number of paths to purify before returning graph
     :param: prob: Probability of a given projective measurement. The default is 0.5
+    :param: method: Method of finding the paths. See QNET.candidate_paths. The default is "greedy"
     :return: A Qnet of the reduced graph
     """
 
@@ -30,26 +34,24 @@ def purify_reduce(Q, head, tail, threshold=None, prob=0.5):
     head = C.getNode(head)
     tail = C.getNode(tail)
 
-    # List of cost_vectors used in purification
-    cv_list = []
+    # Find the paths to purify and remove their edges from C
+    max_paths = None if threshold is None else threshold + 1
+    if method == "greedy":
+        paths = QNET.successive_paths(C, head, tail, 'f', max_paths)
+    else:
+        paths = QNET.candidate_paths(C, head, tail, 'f', max_paths, method)
+        for path in paths:
+            path.remove_edges()
 
-    # Purify paths against each other until either no path exists or threshold is reached
-    path_counter = 0
-    while nx.has_path(C, head, tail) is True:
-        if threshold is not None:
-            if path_counter > threshold:
-                break
-        path = best_path(C, head, tail, 'f')
-        cv_list.append(path.cost_vector)
-        path.remove_edges()
-        path_counter += 1
+    # List of cost_vectors used in purification
+    cv_list = [path.cost_vector for path in paths]
 
     new_cv = {}
 
     # Calculate new_fidelity
     f_list = [d['f'] for d in cv_list]
-    # Iteratively apply fidTransform
-    pur_f = functools.reduce(QNET.fidTransform, f_list)
+    # Purify all fidelities together in closed form
+    pur_f = float(QNET.purify_fidelity(f_list))
     new_cv["f"] = pur_f
 
     # Calculate new_add_f
@@ -57,12 +59,10 @@ def purify_reduce(Q, head, tail, threshold=None, prob=0.5):
 
     # Calculate new_efficiency
     e_list = [d['e'] for d in cv_list]
-    # Efficiency is weakest-link. Update pur_e to whatever the lowest path efficiency is.
-    pur_e = min(e_list)
-    # Each path purification requires 2*(n-1) bell projections, where n is the number of bell pairs
+    # Efficiency is weakest-link, times the loss of the 2*(n-1) bell projections, where n is the number of bell pairs
     # Assume that projections are done with a PBS with e = 1/2
     # WRONG
-    pur_e = pur_e * prob ** (2 * (path_counter - 1))
+    pur_e = float(QNET.purify_efficiency(e_list, prob))
     new_cv["e"] = pur_e
 
     # Calculate new_add_e
@@ -0,0 +1,351 @@
+"""
+Rendering.py contains batched drawing functions for large Qnet graphs.
+
+plot_2d and plot_3d in SimFunctions issue a separate plot and text call for every edge and label, which takes minutes
+for graphs of thousands of nodes. The functions here gather the coordinates of the graph into arrays and draw all of
+the edges as one LineCollection or Line3DCollection and all of the nodes as one scatter.
+
+For graphs larger than the figure can show:
+    resolution: Level of detail. The ends of the edges are snapped to a grid of this many cells across the graph, and
+        only one edge is drawn between each pair of cells
+    max_labels: Labels are culled to at most one in each cell of a coarse grid, so that they do not overlap
+    rasterized: The collections are rasterized when saved to vector formats (pdf, svg), so that the size of the file
+        does not grow with the number of edges. By default, graphs with more than "rasterize_above" edges are
+        rasterized
+
+>>> QNET.draw_2d(Q, edge_color='f', resolution=500, path="lattice.png")
+"""
+
+import QNET
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from mpl_toolkits.mplot3d import art3d
+
+# Number of edges above which collections are rasterized by default
+rasterize_above = 10000
+
+# Dictionary between node types and colours
+node_colours = {QNET.Qnode: 'r', QNET.Ground: 'y', QNET.Swapper: 'c', QNET.Satellite: 'b', QNET.Memory: 'm'}
+
+
+def graph_arrays(Q, axes=(0, 1, 2)):
+    """
+    Gather the node coordinates and edge segments of a Qnet into arrays
+
+    Parameters
+    ----------
+    Q: Qnet()
+    axes: tuple of int, optional
+        Indices of the coordinates to take. (The default is (0, 1, 2))
+
+    Returns
+    -------
+    (list, numpy.ndarray, list, numpy.ndarray)
+        The nodes, their positions of shape (nodes, len(axes)), the edges as (u, v, key) and their segments of shape
+        (edges, 2, len(axes))
+    """
+    nodes = list(Q.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    positions = np.array([[node.coords[axis] for axis in axes] for node in nodes], dtype=float)
+    positions = positions.reshape(len(nodes), len(axes))
+    edges = list(Q.edges(keys=True))
+    ends = np.array([[index[u], index[v]] for u, v, key in edges], dtype=int).reshape(len(edges), 2)
+    return nodes, positions, edges, positions[ends]
+
+
+def grid_cells(points, cells):
+    """
+    Returns the indices of the cells of points on a grid of "cells" cells along the widest axis of the points
+    """
+    points = np.asarray(points, dtype=float)
+    low = points.min(axis=0)
+    span = (points.max(axis=0) - low).max()
+    if span == 0:
+        return np.zeros(points.shape, dtype=np.int64)
+    return np.minimum(np.floor((points - low) / span * cells), cells - 1).astype(np.int64)
+
+
+def decimate(segments, resolution):
+    """
+    Level of detail for edges. Snap the ends of the segments to a grid and keep one segment between each pair of
+    cells, dropping the segments that lie within one cell
+
+    Parameters
+    ----------
+    segments: numpy.ndarray
+        Segments of shape (edges, 2, dimensions)
+    resolution: int
+        Number of cells along the widest axis of the graph
+
+    Returns
+    -------
+    numpy.ndarray
+        Indices of the segments kept, in order
+    """
+    if len(segments) == 0:
+        return np.arange(0)
+    d = segments.shape[2]
+    cells = grid_cells(segments.reshape(-1, d), resolution).reshape(len(segments), 2, d)
+    # Segments between the same cells in either direction are duplicates
+    a = np.ravel_multi_index(cells[:, 0].T, (resolution,) * d)
+    b = np.ravel_multi_index(cells[:, 1].T, (resolution,) * d)
+    ends = np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1)
+    long = np.flatnonzero(a != b)
+    if len(long) == 0:
+        return long
+    unique, first = np.unique(ends[long], axis=0, return_index=True)
+    return long[np.sort(first)]
+
+
+def cull_labels(positions, max_labels):
+    """
+    Choose which points to label, keeping at most one label in each cell of a grid so that labels do not overlap
+
+    Parameters
+    ----------
+    positions: numpy.ndarray
+        Positions of shape (points, dimensions)
+    max_labels: int
+
+    Returns
+    -------
+    numpy.ndarray
+        Indices of at most max_labels points, in order
+    """
+    if len(positions) <= max_labels or max_labels == 0:
+        return np.arange(min(len(positions), max_labels))
+    d = positions.shape[1]
+    cells = max(int(max_labels ** (1 / d)), 1)
+    unique, first = np.unique(grid_cells(positions, cells), axis=0, return_index=True)
+    return np.sort(first)[:max_labels]
+
+
+def marker_size(nodes):
+    """
+    Returns the area of node markers, which shrink as the graph grows so that they do not hide its edges
+    """
+    return min(20, 4000 / max(len(nodes), 1))
+
+
+def edge_values(Q, edges, cost_type):
+    """
+    Returns the costs of a type of the given edges as an array
+    """
+    return np.array([Q.edges[edge][cost_type] for edge in edges], dtype=float)
+
+
+def finish(fig, ax, title, path, dpi, show):
+    """
+    Title the plot, then save it to path or show it
+    """
+    if title is not None:
+        ax.set_title(f"{title}")
+    if path is not None:
+        fig.savefig(path, dpi=dpi)
+        plt.close(fig)
+    elif show is True:
+        plt.show()
+    return ax
+
+
+def draw_2d(Q, node_label=None, edge_label=None, edge_color='k', title=None, FOV=('x', 'y'), ax=None,
+            resolution=None, max_labels=36, rasterized=None, cmap='viridis', path=None, dpi=150):
+    """
+    Draws a 2d view of a Qnet graph in spatial coordinates of nodes with one collection for the edges.
+    See the documentation of Rendering.py
+
+    Parameters
+    ----------
+    Q: Qnet()
+    node_label: str, optional
+        Node cost to be labeled under the name of each labeled node
+    edge_label: str, optional
+        Edge cost to be labeled at the middle of each labeled edge. Unlike plot_2d, every edge of a multigraph can be
+        labeled
+    edge_color: str, optional
+        Colour of the edges, or a type of cost in Q.cost_vector, by which the edges are coloured with the colour map
+        "cmap". (The default is 'k')
+    title: str, optional
+    FOV: (str, str), optional
+        Field of view. Choose any pair of cartesian axes. I.E. ('x','y'), ('y','z')
+    ax: matplotlib.axes.Axes, optional
+        Axes to draw on. (The default is None, which draws on a new figure)
+    resolution: int, optional
+        Level of detail of the edges. (The default is None, which draws every edge)
+    max_labels: int, optional
+        Largest number of node labels, and of edge labels. (The default is 36)
+    rasterized: bool, optional
+        (The default is None, which rasterizes graphs with more than rasterize_above edges)
+    cmap: str, optional
+    path: str, optional
+        File to save the figure to. (The default is None, which shows the figure if it is new)
+    dpi: int, optional
+
+    Returns
+    -------
+    matplotlib.axes.Axes
+    """
+    for axes in FOV:
+        assert axes in ('x', 'y', 'z'), "Field of view usage: Two from (\'x\', \'y\', \'z\')."
+    axis_to_index = {'x': 0, 'y': 1, 'z': 2}
+    nodes, positions, edges, segments = graph_arrays(Q, (axis_to_index[FOV[0]], axis_to_index[FOV[1]]))
+
+    show = ax is None
+    if ax is None:
+        fig, ax = plt.subplots()
+    fig = ax.figure
+    if rasterized is None:
+        rasterized = len(edges) > rasterize_above
+
+    kept = np.arange(len(edges)) if resolution is None else decimate(segments, resolution)
+    collection = LineCollection(segments[kept], linewidths=0.5, rasterized=rasterized, zorder=1)
+    if edge_color in Q.cost_vector:
+        collection.set_array(edge_values(Q, [edges[i] for i in kept], edge_color))
+        collection.set_cmap(cmap)
+        fig.colorbar(collection, ax=ax, label=edge_color)
+    else:
+        collection.set_color(edge_color)
+    ax.add_collection(collection)
+
+    ax.scatter(positions[:, 0], positions[:, 1], c=[node_colours.get(type(node), 'r') for node in nodes],
+               s=marker_size(nodes), zorder=2, rasterized=rasterized, linewidths=0)
+
+    for i in cull_labels(positions, max_labels):
+        text = nodes[i].name
+        if node_label is not None:
+            text += f"\n{node_label} = {round(nodes[i].costs[node_label], 4)}"
+        ax.annotate(text, positions[i], xytext=(0, 4), textcoords="offset points", ha='center', fontsize=8)
+    if edge_label is not None:
+        middles = segments[kept].mean(axis=1)
+        for i in cull_labels(middles, max_labels):
+            ax.text(*middles[i], f"{edge_label} = {round(Q.edges[edges[kept[i]]][edge_label], 4)}", fontsize=6,
+                    ha='center', va='center')
+
+    ax.autoscale_view()
+    ax.margins(0.05)
+    return finish(fig, ax, title, path, dpi, show)
+
+
+def draw_3d(Q, title=None, ax=None, resolution=None, max_labels=36, rasterized=None, path=None, dpi=150):
+    """
+    Draws a 3d plot of a Qnet graph with one collection for ground channels and one for satellite channels, which are
+    dashed. See the documentation of Rendering.py
+
+    Parameters
+    ----------
+    Q: Qnet()
+    title: str, optional
+    ax: mpl_toolkits.mplot3d.Axes3D, optional
+        Axes to draw on. (The default is None, which draws on a new figure)
+    resolution: int, optional
+        Level of detail of the edges. (The default is None, which draws every edge)
+    max_labels: int, optional
+        Largest number of node labels. (The default is 36)
+    rasterized: bool, optional
+        (The default is None, which rasterizes graphs with more than rasterize_above edges)
+    path: str, optional
+        File to save the figure to. (The default is None, which shows the figure if it is new)
+    dpi: int, optional
+
+    Returns
+    -------
+    mpl_toolkits.mplot3d.Axes3D
+    """
+    nodes, positions, edges, segments = graph_arrays(Q)
+
+    show = ax is None
+    if ax is None:
+        fig = plt.figure()
+        ax = fig.add_subplot(111, projection='3d')
+    fig = ax.figure
+    if rasterized is None:
+        rasterized = len(edges) > rasterize_above
+
+    kept = np.arange(len(edges)) if resolution is None else decimate(segments, resolution)
+    space = np.array([not (isinstance(edges[i][0], QNET.Satellite) or isinstance(edges[i][1], QNET.Satellite))
+                      for i in kept], dtype=bool)
+    for mask, linestyle in ((space, '-'), (~space, '--')):
+        if mask.any():
+            ax.add_collection3d(art3d.Line3DCollection(segments[kept[mask]], linestyles=linestyle, linewidths=0.5,
+                                                       rasterized=rasterized))
+
+    ax.scatter(positions[:, 0], positions[:, 1], positions[:, 2],
+               c=[node_colours.get(type(node), 'r') for node in nodes], marker='o', rasterized=rasterized)
+    for i in cull_labels(positions, max_labels):
+        ax.text(*positions[i], '%s' % nodes[i].name, size=8, zorder=1)
+
+    # Draw arrows for satellite velocities
+    satellites = [i for i, node in enumerate(nodes) if isinstance(node, QNET.Satellite)]
+    if len(satellites) > 0:
+        velocities = np.array([nodes[i].velocity[:2] for i in satellites], dtype=float)
+        ax.quiver(*positions[satellites].T, velocities[:, 0], velocities[:, 1], np.zeros(len(satellites)),
+                  length=1.5)
+
+    if len(nodes) > 0:
+        low, high = positions.min(axis=0), positions.max(axis=0)
+        ax.set_xlim(low[0], high[0] if high[0] > low[0] else low[0] + 1)
+        ax.set_ylim(low[1], high[1] if high[1] > low[1] else low[1] + 1)
+        ax.set_zlim(low[2], high[2] if high[2] > low[2] else low[2] + 1)
+    return finish(fig, ax, title, path, dpi, show)
+
+
+def draw_paths(Q, tMax, dt, source='A', target='B', ax=None, rasterized=None, path=None, dpi=150):
+    """
+    Plot the costs of all simple paths between two nodes over time along with the cost from simple_purify, drawing
+    the paths of each type of cost as one collection
+
+    Parameters
+    ----------
+    Q: Qnet()
+    tMax: float
+        Maximum time
+    dt: float
+        Size of time increment
+    source: str, optional
+        (The default is 'A')
+    target: str, optional
+        (The default is 'B')
+    ax: matplotlib.axes.Axes, optional
+    rasterized: bool, optional
+        (The default is None, which rasterizes the paths if there are more than rasterize_above of them)
+    path: str, optional
+        File to save the figure to. (The default is None, which shows the figure if it is new)
+    dpi: int, optional
+
+    Returns
+    -------
+    matplotlib.axes.Axes
+    """
+    time_arr = np.asarray(QNET.getTimeArr(tMax, dt), dtype=float)
+    sink = QNET.ArraySink()
+    QNET.sim_all_simple(Q, source, target, tMax, dt, sink=sink)
+    times, data = sink.read()
+
+    show = ax is None
+    if ax is None:
+        fig, ax = plt.subplots()
+    fig = ax.figure
+    n = data.shape[1] if data.ndim == 3 else 0
+    if rasterized is None:
+        rasterized = n > rasterize_above
+
+    for i, cost in enumerate(Q.cost_vector):
+        if n == 0:
+            break
+        # Lines of shape (paths, times, 2)
+        costs = data[:, :, sink.keys.index(cost)].T
+        lines = np.stack([np.broadcast_to(times, costs.shape), costs], axis=2)
+        ax.add_collection(LineCollection(lines, colors=f"C{i}", linewidths=0.5, alpha=0.5, rasterized=rasterized,
+                                         label=f"{n} simple paths ({cost})"))
+
+    pur_arr = QNET.sim_protocol(Q, source, target, QNET.simple_purify, tMax, dt)
+    for i, cost in enumerate(Q.cost_vector):
+        ax.plot(time_arr, [c[cost] for c in pur_arr], '--', color=f"C{i}", label=f"Path Purification ({cost})")
+
+    ax.autoscale_view()
+    ax.set_xlabel('Time')
+    ax.set_ylabel("Path Costs")
+    ax.legend()
+    return finish(fig, ax, f"Network Path Costs Over Time Between Nodes \"{source}\" and \"{target}\"", path, dpi,
+                  show)
@@ -8,6 +8,9 @@ Created on Fri Feb 28 17:25:13 2020
 import networkx as nx
 import QNET
 import copy
+import heapq
+import multiprocessing
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import art3d
@@ -30,7 +33,23 @@ def getTimeArr(tMax, dt):
     return np.arange(0, tMax, dt)
 
 
-def sim_path(G, path, tMax, dt, cost_type=None):
+def open_sink(sink, C, dt, series, keys=None):
+    """
+    Open a result sink for the given series and move C to the step after the last sample already in the sink
+    :param sink: ResultSink
+    :param C: Qnet Graph being simulated
+    :param float dt: Time increment
+    :param series: List of series
+    :param keys: List of cost keys, optional
+    :return: Step to resume from
+    """
+    step = sink.open(series, keys)
+    if step > 0:
+        C.set_time(C.time + step * dt)
+    return step
+
+
+def sim_path(G, path, tMax, dt, cost_type=None, sink=None):
     """
     Return an array of path costs over time
 
@@ -43,10 +62,13 @@ def sim_path(G, path, tMax, dt, cost_type=None):
     dt: Time increment
     cost_type: string, optional
         (The default value is None, which returns a list of cost vectors for the path over time)
+    sink: ResultSink, optional
+        If given, costs are written to the sink rather than returned in a list, and the simulation resumes after the
+        samples already in the sink. (See Sinks.py)
 
     Returns
     -------
-    List of floats or list of dicts
+    List of floats or list of dicts, or the sink
     """
     if cost_type is not None:
         assert cost_type in G.cost_vector
@@ -57,18 +79,28 @@ def sim_path(G, path, tMax, dt, cost_type=None):
     cost_array = []
     i = 0
     size_arr = len(np.arange(0, tMax, dt))
+    if sink is not None:
+        i = open_sink(sink, C, dt, [path.stringify()], None if cost_type is None else [cost_type])
+        path.update()
     while i < size_arr:
         if cost_type is not None:
-            cost_array.append(path.cost_vector[cost_type])
+            cost = path.cost_vector[cost_type]
+        else:
+            cost = path.cost_vector
+        if sink is None:
+            cost_array.append(cost)
         else:
-            cost_array.append(path.cost_vector)
+            sink.write(i * dt, [cost])
         C.update(dt)
         path.update()
         i += 1
+    if sink is not None:
+        sink.flush()
+        return sink
     return cost_array
 
 
-def sim_method(G, source, target, method, tMax, dt,):
+def sim_method(G, source, target, method, tMax, dt, sink=None):
     """
     Return an array of costs between source and target after running
     a graph reduction method
@@ -84,10 +116,13 @@ def sim_method(G, source, target, method, tMax, dt,):
         Timespan of simulation
     dt: float
         Time increment
+    sink: ResultSink, optional
+        If given, costs are written to the sink rather than returned in a list, and the simulation resumes after the
+        samples already in the sink. (See Sinks.py)
 
     Returns
     -------
-
+    List of costs, or the sink
     """
     C = copy.deepcopy(G)
     u = C.getNode(source)
@@ -98,17 +133,25 @@ def sim_method(G, source, target, method, tMax, dt,):
     # Initialize size of array
     size_arr = len(np.arange(0, tMax, dt))
     i = 0
+    if sink is not None:
+        i = open_sink(sink, C, dt, ["cost"])
     while i < size_arr:
         # Run method to get either scalar cost or cost vector
         cost = method(C, u, v)
-        cost_arr.append(cost)
+        if sink is None:
+            cost_arr.append(cost)
+        else:
+            sink.write(i * dt, [cost])
         # Update graph
         C.update(dt)
         i += 1
+    if sink is not None:
+        sink.flush()
+        return sink
     return cost_arr
 
 
-def sim_all_simple(G, source, target, tMax, dt, cost_type=None):
+def sim_all_simple(G, source, target, tMax, dt, cost_type=None, sink=None):
     """
     Get the cost arrays for all simple paths over time
     :param G: Qnet Graph
@@ -120,7 +163,9 @@ def sim_all_simple(G, source, target, tMax, dt, cost_type=None):
     :param dt: Time interval
     :type dt: float
     :param cost_type: string, optional
-    :return: Dictionary of paths to a list of cost arrays over time
+    :param sink: ResultSink, optional. If given, costs are written to the sink with one series for each path rather
+        than returned, and the simulation resumes after the samples already in the sink. (See Sinks.py)
+    :return: Dictionary of paths to a list of cost arrays over time, or the sink
     """
     C = copy.deepcopy(G)
 
@@ -142,8 +187,12 @@ def sim_all_simple(G, source, target, tMax, dt, cost_type=None):
     # Initialize array size
     size_arr = len(np.arange(0, tMax, dt))
     i = 0
+    if sink is not None:
+        i = open_sink(sink, C, dt, [path.stringify() for path in path_arr],
+                      None if cost_type is None else [cost_type])
     while i < size_arr:
         j = 0
+        costs = []
         while j < len(path_arr):
             # Get the cost of each path and append it to respective array
             if cost_type is None:
@@ -152,8 +201,13 @@ def sim_all_simple(G, source, target, tMax, dt, cost_type=None):
             else:
                 # Fetch specified cost
                 cost = path_arr[j].cost_vector[cost_type]
-            path_dict[path_arr[j]].append(cost)
+            if sink is None:
+                path_dict[path_arr[j]].append(cost)
+            else:
+                costs.append(cost)
             j += 1
+        if sink is not None:
+            sink.write(i * dt, costs)
 
         C.update(dt)
         i += 1
@@ -164,10 +218,13 @@ def sim_all_simple(G, source, target, tMax, dt, cost_type=None):
                 if node.cartesian is False:
                     node.setTime()
 
+    if sink is not None:
+        sink.flush()
+        return sink
     return path_dict
 
 
-def sim_protocol(G, source, target, protocol, tMax, dt):
+def sim_protocol(G, source, target, protocol, tMax, dt, sink=None):
     """
     Get the cost arrays of a simple protocol over time
     :param G: Qnet Graph
@@ -178,7 +235,9 @@ def sim_protocol(G, source, target, protocol, tMax, dt):
     :type tMax: float
     :param dt: Time interval
     :type dt: float
-    :return: List of cost arrays for the protocol over time.
+    :param sink: ResultSink, optional. If given, costs are written to the sink rather than returned, and the
+        simulation resumes after the samples already in the sink. (See Sinks.py)
+    :return: List of cost arrays for the protocol over time, or the sink
     """
     C = copy.deepcopy(G)
     u = C.getNode(source)
@@ -189,13 +248,21 @@ def sim_protocol(G, source, target, protocol, tMax, dt):
     # Initialize size of array
     size_arr = len(np.arange(0, tMax, dt))
     i = 0
+    if sink is not None:
+        i = open_sink(sink, C, dt, ["cost"])
     while i < size_arr:
         # Run protocol to get either scalar cost or cost bector
         cost = protocol(C, u, v)
-        cost_arr.append(cost)
+        if sink is None:
+            cost_arr.append(cost)
+        else:
+            sink.write(i * dt, [cost])
         # Update graph
         C.update(dt)
         i += 1
+    if sink is not None:
+        sink.flush()
+        return sink
     return cost_arr
 
 def plot_cv(x, cva, label):
@@ -206,7 +273,7 @@ def plot_cv(x, cva, label):
         plt.plot(x, a, label=f"{label} ({cost})")
 
 
-def sim_optimal_cost(G, source_name, target_name, cost_type, tMax, dt):
+def sim_optimal_cost(G, source_name, target_name, cost_type, tMax, dt, dynamic=False, sink=None):
     """
     Calculate the costs of the lowest cost path from "source" to "target" over time.
     :param G: Qnet Graph
@@ -215,22 +282,37 @@ def sim_optimal_cost(G, source_name, target_name, cost_type, tMax, dt):
     :param string cost_type: The type of cost to optimise over. Choose from {'loss', 'fid'}
     :param float tMax: Time period
     :param float dt: Time increment
-    :return: Optimal loss array
+    :param bool dynamic: If True, keep a shortest path tree from the source that is repaired after every update
+        instead of searching from scratch. (See DynamicRouter.) The default is False.
+    :param sink: ResultSink, optional. If given, costs are written to the sink rather than returned, and the
+        simulation resumes after the samples already in the sink. (See Sinks.py)
+    :return: Optimal loss array, or the sink
     """
     C = copy.deepcopy(G)
 
     u = C.getNode(source_name)
     v = C.getNode(target_name)
 
+    if dynamic is True:
+        router = QNET.DynamicRouter(C, u, cost_type)
+
     # Initialize arrays
     cost_arr = []
     size = len(np.arange(0, tMax, dt))
 
     # Get optimal path cost and append it to costArr
     i = 0
+    if sink is not None:
+        i = open_sink(sink, C, dt, ["cost"], [cost_type])
     while i < size:
-        cost = QNET.best_path_cost(C, source_name, target_name, cost_type)
-        cost_arr.append(cost)
+        if dynamic is True:
+            cost = router.cost(v)
+        else:
+            cost = QNET.best_path_cost(C, source_name, target_name, cost_type)
+        if sink is None:
+            cost_arr.append(cost)
+        else:
+            sink.write(i * dt, [cost])
         # Update network
         C.update(dt)
         i += 1
@@ -247,8 +329,197 @@ def sim_optimal_cost(G, source_name, target_name, cost_type, tMax, dt):
                     node.setTime()
     """
 
+    if sink is not None:
+        sink.flush()
+        return sink
     return cost_arr
 
+def cost_change(old, new):
+    """
+    Largest change between two costs returned by a method or protocol, which may be numbers or cost vectors.
+    Additive costs in cost vectors are skipped.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        return max((abs(new[key] - old[key]) for key in old if key in new and not key.startswith("add_")), default=0)
+    if isinstance(old, (int, float, np.number)) and isinstance(new, (int, float, np.number)):
+        return abs(new - old)
+    return 0 if old == new else np.inf
+
+
+def node_failure(name):
+    """
+    Event action for sim_adaptive that removes a node from the graph
+    :param str name: Name of the node
+    :return: function
+    """
+    def fail(C):
+        node = C.getNode(name)
+        if node is not None:
+            C.remove_node(node)
+    return fail
+
+
+def sim_adaptive(G, source, target, method, tMax, tol=1e-3, dt=None, dt_min=None, dt_max=None, events=None,
+                 plan=None):
+    """
+    Return the costs between source and target over time with an adaptive time step
+
+    The graph is advanced with set_time, as update does in sim_method. A step is rejected and halved while the costs
+    change by more than "tol" over it, down to dt_min, and it is doubled after steps where they barely change, up to
+    dt_max. Rejected steps are rolled back by setting the graph back to the time before the step, which also restores
+    the channels that visibility created or removed over it.
+
+    Discrete events are taken from a priority queue in order of time. The step is cut short at every event, so that
+    the costs are sampled exactly at it. An event may carry an action, a function of the graph that changes it, such
+    as node_failure. The costs are sampled once more after the actions of an event, so the series has two samples
+    at that time: the costs just before and just after the event. Events are applied over the closed interval
+    [0, tMax], so an event at tMax still adds its sample. Later events are ignored.
+
+    :param G: Qnet Graph
+    :param source: Name of source node
+    :param target: Name of target node
+    :param method: Graph reduction method or protocol, method(Qnet graph, qnode, qnode)
+    :param float tMax: Timespan of simulation
+    :param float tol: Largest change of the costs (or of any cost in a cost vector) between samples
+    :param float dt: Initial time step. (The default is None, which means dt_max)
+    :param float dt_min: Smallest time step. (The default is None, which means dt_max / 10^4)
+    :param float dt_max: Largest time step. (The default is None, which means tMax / 10)
+    :param events: List of (time, action) pairs where action is a function action(Qnet graph) or None
+    :param plan: ContactPlan whose rises and sets are added to the events. (The default is None)
+    :return: (Array of times, List of costs)
+    """
+    C = copy.deepcopy(G)
+    u = C.getNode(source)
+    v = C.getNode(target)
+
+    if dt_max is None:
+        dt_max = tMax / 10
+    if dt_min is None:
+        dt_min = dt_max / 10 ** 4
+    h = dt_max if dt is None else dt
+
+    # Priority queue of (time, order, action)
+    queue = [(time, i, action) for i, (time, action) in enumerate(events or [])]
+    if plan is not None:
+        queue += [(time, len(queue) + i, None) for i, time in enumerate(plan.event_times)]
+    heapq.heapify(queue)
+
+    # Times are kept relative to the time of the graph when the simulation starts
+    start = C.time
+    t = 0
+    times = [t]
+    costs = [method(C, u, v)]
+    while True:
+        # Apply the events that are due
+        acted = False
+        while len(queue) > 0 and queue[0][0] <= t:
+            time, i, action = heapq.heappop(queue)
+            if action is not None:
+                action(C)
+                acted = True
+        if acted:
+            u = C.getNode(source)
+            v = C.getNode(target)
+            times.append(t)
+            costs.append(method(C, u, v))
+            h = dt_min if dt is None else min(dt, dt_max)
+        if t >= tMax:
+            break
+
+        # Do not step past the next event
+        boundary = min(tMax, queue[0][0]) if len(queue) > 0 else tMax
+        step = min(h, dt_max, boundary - t)
+        t_next = boundary if step == boundary - t else t + step
+        C.set_time(start + t_next)
+        cost = method(C, u, v)
+        change = cost_change(costs[-1], cost)
+        if change > tol and step > dt_min:
+            C.set_time(start + t)
+            h = max(step / 2, dt_min)
+            continue
+
+        t = t_next
+        times.append(t)
+        costs.append(cost)
+        if change <= tol / 4:
+            h = max(h, step * 2)
+    return np.array(times), costs
+
+
+def resample(times, costs, tMax, dt):
+    """
+    Resample the irregular series of sim_adaptive onto the uniform grid of getTimeArr
+    Each point of the grid takes the costs of the last sample at or before it.
+    :param times: Array of times
+    :param costs: List of costs
+    :param float tMax: Maximum time
+    :param float dt: Time increment
+    :return: List of costs
+    """
+    indices = np.searchsorted(times, getTimeArr(tMax, dt), side='right') - 1
+    return [costs[i] for i in indices]
+
+
+def sim_chunk(task):
+    """
+    Run a method at each of a chunk of times. See sim_parallel
+    :param task: (Qnet Graph, source name, target name, method, array of times)
+    :return: List of costs
+    """
+    G, source, target, method, times = task
+    C = copy.deepcopy(G)
+    u = C.getNode(source)
+    v = C.getNode(target)
+    start = C.time
+
+    cost_arr = []
+    for t in times:
+        # Satellite positions follow directly from the time, so each chunk can start anywhere
+        C.set_time(start + t)
+        cost_arr.append(method(C, u, v))
+    return cost_arr
+
+
+def sim_parallel(G, source, target, method, tMax, dt, processes=None, chunks=None):
+    """
+    Return an array of costs between source and target after running a graph reduction method or protocol over time,
+    as in sim_method, with the time span split into chunks that are simulated in parallel by a pool of processes
+
+    Every chunk sets its own copy of the graph to its start time with set_time, so it does not depend on earlier
+    chunks. The graph and the method are pickled to the processes, so the method has to be a function defined at
+    the top level of a module rather than a lambda.
+
+    :param G: Qnet Graph
+    :param source: Name of source node
+    :param target: Name of target node
+    :param method: Graph reduction method or protocol, method(Qnet graph, qnode, qnode)
+    :param float tMax: Timespan of simulation
+    :param float dt: Time increment
+    :param int processes: Number of processes. (The default is None, which means the number of CPUs.) With a single
+        process, the chunks are simulated in this process
+    :param int chunks: Number of chunks. (The default is None, which means one per process)
+    :return: List of costs at the times of getTimeArr(tMax, dt)
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    if chunks is None:
+        chunks = processes
+
+    tasks = [(G, source, target, method, times) for times in np.array_split(getTimeArr(tMax, dt), chunks)
+             if len(times) > 0]
+    if processes == 1:
+        results = [sim_chunk(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(sim_chunk, tasks)
+
+    # Concatenate the chunks in order of time
+    cost_arr = []
+    for chunk in results:
+        cost_arr += chunk
+    return cost_arr
+
+
 def posPlot(Q, u, v, tMax, dt):
     """
     Plot the distance between two nodes over time
@@ -291,11 +562,14 @@ def posPlot(Q, u, v, tMax, dt):
     plt.show()    
     
 
-def plot_2d(Q, node_label = None, edge_label=None, edge_color='k', title=None, FOV=('x', 'y')):
+def plot_2d(Q, node_label = None, edge_label=None, edge_color='k', title=None, FOV=('x', 'y'), batched=False,
+            **kwargs):
     """
     Plots a 2d view of a Qnet graph in spatial coordinates of nodes
     Edge costs listed are rounded to four significant figures
 
+    For large graphs, use batched=True, which draws with QNET.draw_2d. Keyword arguments are passed to it.
+
     :param Q: Qnet Graph
     :param node_label: Node cost to be labeled
     :type node_label: string, optional
@@ -305,8 +579,14 @@ def plot_2d(Q, node_label = None, edge_label=None, edge_color='k', title=None, F
     :type title: string
     :param FOV: Field of view. Choose any pair of cartesian axes. I.E. ('x','y'), ('y','z')
     :type FOV: (string, string), optional
+    :param batched: If True, draw all edges as one collection with QNET.draw_2d
+    :type batched: bool, optional
     :return:
     """
+    if batched is True:
+        return QNET.draw_2d(Q, node_label=node_label, edge_label=edge_label, edge_color=edge_color, title=title,
+                            FOV=FOV, **kwargs)
+
     # Dictionary of node positions
     pos_dict = {}
     # Dictionary of node labels
@@ -376,14 +656,18 @@ def plot_2d(Q, node_label = None, edge_label=None, edge_color='k', title=None, F
     plt.show()
 
 
-def plot_3d(Q, title=None):
+def plot_3d(Q, title=None, batched=False, **kwargs):
     """
     Draws a 3d plot of a Qnet graph
     Parameters
     :param Q: Qnet Graph
     :param title: Title of Graph
+    :param batched: If True, draw all edges as collections with QNET.draw_3d, passing it the keyword arguments
     :return:
     """
+    if batched is True:
+        return QNET.draw_3d(Q, title=title, **kwargs)
+
     # Create new matplotlib figure and add axes
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
@@ -413,14 +697,19 @@ def plot_3d(Q, title=None):
         plt.title(f"{title}")
     fig.show()
 
-def plot_paths(Q, tMax, dt):
+def plot_paths(Q, tMax, dt, batched=False, **kwargs):
     """
     Plot the costs of all simple paths over time along with the cost from simple_purify
     :param Q: Qnet Graph
     :param tMax: Maximum time
     :param dt: Size of time increment
+    :param batched: If True, draw the paths of each cost as one collection with QNET.draw_paths, passing it the
+        keyword arguments
     :return: None
     """
+    if batched is True:
+        return QNET.draw_paths(Q, tMax, dt, **kwargs)
+
     # Get Time Array
     time_arr = QNET.getTimeArr(tMax, dt)
 
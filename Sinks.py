@@ -0,0 +1,241 @@
+"""
+Sinks.py contains result sinks, which collect the costs sampled by the simulations in SimFunctions as they are
+produced, rather than as lists of cost vectors.
+
+A sink holds a float array of shape (T, series, keys): T samples in time, one row for each series (i.e. each path
+of sim_all_simple) and one column for each cost. Costs given as numbers rather than cost vectors are stored under
+a single key.
+
+ArraySink keeps the array in memory. ShardSink appends it to a directory of .npy files, flushing a shard every
+"shard_size" samples:
+
+header.json:
+    Names of the series and keys, the number of samples flushed, and the list of shards
+shard_000000.npy, times_000000.npy, ...:
+    Samples of each shard, of shape (n, series, keys), and their times
+
+Shards are written before the header, and the header is replaced atomically, so a run that dies leaves the sink as
+it was at its last flush. A simulation given a ShardSink that already holds samples resumes after them.
+"""
+
+import numpy as np
+import json
+import os
+
+
+class ResultSink:
+    def __init__(self):
+        """
+        Base class of result sinks
+
+        Subclasses implement append, flush and read.
+
+        Attributes
+        ----------
+        series: list of str
+            Names of the series, set by open
+        keys: list of str
+            Names of the costs, set by open or by the first sample
+        steps: int
+            Number of samples written
+        """
+        self.series = None
+        self.keys = None
+        self.steps = 0
+
+    def open(self, series, keys=None):
+        """
+        Start writing samples of the given series
+
+        Parameters
+        ----------
+        series: list
+            Series of the samples. Names are taken with str
+        keys: list of str, optional
+            Names of the costs. (The default is None, which takes the keys of the first sample, or ["cost"] if the
+            costs are numbers)
+
+        Returns
+        -------
+        int
+            Number of samples already in the sink, from which a simulation resumes
+
+        Raises
+        ------
+        AssertionError
+            If the sink already holds samples of different series or keys
+        """
+        series = [str(name) for name in series]
+        if self.series is None:
+            self.series = series
+        assert self.series == series, "The sink holds samples of different series"
+        if keys is not None:
+            keys = list(keys)
+            if self.keys is None:
+                self.keys = keys
+            assert self.keys == keys, "The sink holds samples of different cost keys"
+        return self.steps
+
+    def row(self, costs):
+        """
+        Turn a list of costs, one for each series, into an array of shape (series, keys)
+        """
+        assert len(costs) == len(self.series), f"Expected costs of {len(self.series)} series, got {len(costs)}"
+        if self.keys is None:
+            self.keys = list(costs[0]) if isinstance(costs[0], dict) else ["cost"]
+        if isinstance(costs[0], dict):
+            values = [[cost[key] for key in self.keys] for cost in costs]
+        else:
+            values = [[cost] for cost in costs]
+        return np.array([[np.nan if value is None else value for value in row] for row in values], dtype=float)
+
+    def write(self, t, costs):
+        """
+        Write the costs of every series at time t
+
+        Parameters
+        ----------
+        t: float
+        costs: list
+            Costs of each series, as numbers or cost vectors
+        """
+        self.append(t, self.row(costs))
+        self.steps += 1
+
+    def append(self, t, row):
+        raise NotImplementedError
+
+    def flush(self):
+        """
+        Make the samples written so far durable. Does nothing for sinks in memory
+        """
+        pass
+
+    def read(self):
+        """
+        Returns
+        -------
+        (numpy.ndarray, numpy.ndarray)
+            Times of shape (T,) and costs of shape (T, series, keys)
+        """
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+
+class ArraySink(ResultSink):
+    def __init__(self, capacity=1024):
+        """
+        Sink that keeps its samples in a NumPy array in memory, doubling it as it fills
+
+        Parameters
+        ----------
+        capacity: int, optional
+            Initial number of samples allocated. (The default is 1024)
+        """
+        super().__init__()
+        self.times = np.empty(capacity)
+        self.data = None
+
+    def append(self, t, row):
+        if self.data is None:
+            self.data = np.empty((len(self.times),) + row.shape)
+        if self.steps == len(self.times):
+            size = max(2 * self.steps, 1)
+            self.times = np.concatenate([self.times, np.empty(size - self.steps)])
+            self.data = np.concatenate([self.data, np.empty((size - self.steps,) + row.shape)])
+        self.times[self.steps] = t
+        self.data[self.steps] = row
+
+    def read(self):
+        if self.data is None:
+            return self.times[:0], np.empty((0, len(self.series or []), len(self.keys or [])))
+        return self.times[:self.steps], self.data[:self.steps]
+
+
+class ShardSink(ResultSink):
+    def __init__(self, path, shard_size=1024, resume=True):
+        """
+        Sink that appends its samples to a directory of .npy shards. See the documentation of Sinks.py
+
+        Parameters
+        ----------
+        path: str
+            Directory of the sink
+        shard_size: int, optional
+            Number of samples in each shard, and so between checkpoints. (The default is 1024)
+        resume: bool, optional
+            If True, keep the samples of an existing sink at path. Else, discard them. (The default is True)
+        """
+        super().__init__()
+        self.path = path
+        self.shard_size = shard_size
+        self.shards = []
+        self.buffer_times = []
+        self.buffer = []
+        os.makedirs(path, exist_ok=True)
+
+        header_path = os.path.join(path, "header.json")
+        if os.path.exists(header_path):
+            with open(header_path) as file:
+                header = json.load(file)
+            if resume is True:
+                self.series = header["series"]
+                self.keys = header["keys"]
+                self.shards = header["shards"]
+                self.steps = header["steps"]
+            else:
+                for shard in header["shards"]:
+                    for name in (shard["data"], shard["times"]):
+                        if os.path.exists(os.path.join(path, name)):
+                            os.remove(os.path.join(path, name))
+                os.remove(header_path)
+
+    def append(self, t, row):
+        self.buffer_times.append(t)
+        self.buffer.append(row)
+        if len(self.buffer) >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered samples as a new shard and update the header
+        """
+        if len(self.buffer) == 0:
+            return
+        i = len(self.shards)
+        shard = {"data": f"shard_{i:06d}.npy", "times": f"times_{i:06d}.npy", "steps": len(self.buffer)}
+        np.save(os.path.join(self.path, shard["data"]), np.array(self.buffer))
+        np.save(os.path.join(self.path, shard["times"]), np.array(self.buffer_times, dtype=float))
+        self.shards.append(shard)
+        self.buffer_times = []
+        self.buffer = []
+
+        header = {"series": self.series, "keys": self.keys, "steps": sum(shard["steps"] for shard in self.shards),
+                  "shards": self.shards}
+        temporary = os.path.join(self.path, "header.json.tmp")
+        with open(temporary, "w") as file:
+            json.dump(header, file)
+        os.replace(temporary, os.path.join(self.path, "header.json"))
+
+    def read(self, mmap_mode=None):
+        """
+        Returns the times and costs of the sink, including buffered samples
+
+        Parameters
+        ----------
+        mmap_mode: str, optional
+            Memory map mode of numpy.load for the shards, i.e. 'r'. (The default is None)
+        """
+        times = [np.load(os.path.join(self.path, shard["times"])) for shard in self.shards]
+        data = [np.load(os.path.join(self.path, shard["data"]), mmap_mode=mmap_mode) for shard in self.shards]
+        if len(self.buffer) > 0:
+            times.append(np.array(self.buffer_times, dtype=float))
+            data.append(np.array(self.buffer))
+        if len(data) == 0:
+            return np.empty(0), np.empty((0, len(self.series or []), len(self.keys or [])))
+        return np.concatenate(times), np.concatenate(data)
@@ -0,0 +1,694 @@
+"""
+Snapshot.py contains a compact on-disk format for Qnet graphs.
+
+A snapshot is a directory holding a header.json file and one .npy file per array:
+
+header.json:
+    Cost and memory schemas, names of the conversion functions, node type names and satellite ephemerides
+name_data, name_offsets:
+    utf-8 encoded node names, where node i is name_data[name_offsets[i]:name_offsets[i+1]]
+node_type, coords, node_costs, node_memory, is_memory:
+    Node table. The columns of node_costs and node_memory are given by header["cost_keys"] and
+    header["memory_keys"], including the additive "add_" forms
+cartesian, velocity, swap_prob, t_memory:
+    Type specific node parameters. Entries for nodes of other types are unused
+edge_u, edge_v, edge_key, edge_costs:
+    Edge table, with every edge of the multigraph stored once
+indptr, indices, csr_edge:
+    Compressed sparse row adjacency. The neighbours of node i are indices[indptr[i]:indptr[i+1]], connected by the
+    edges csr_edge[indptr[i]:indptr[i+1]] of the edge table. Every edge appears in both directions.
+
+Snapshots are loaded with memory-mapped arrays, so opening one is instant regardless of its size and the pages are
+shared read-only between processes that load the same snapshot.
+"""
+
+import QNET
+import numpy as np
+import networkx as nx
+import scipy.sparse
+import json
+import os
+import sys
+from multiprocessing import shared_memory
+from scipy.sparse.csgraph import connected_components, dijkstra
+
+SNAPSHOT_FORMAT = 1
+
+# Codes of the Qnode types in the node_type array
+type_names = ['Qnode', 'Ground', 'Satellite', 'Swapper', 'Memory']
+
+array_names = ['name_data', 'name_offsets', 'node_type', 'coords', 'node_costs', 'node_memory', 'is_memory',
+               'cartesian', 'velocity', 'swap_prob', 't_memory', 'edge_u', 'edge_v', 'edge_key', 'edge_costs',
+               'indptr', 'indices', 'csr_edge']
+
+
+def function_name(function):
+    """
+    Returns the name of a conversion function if it can be found in QNET, else None
+    """
+    name = getattr(function, "__name__", None)
+    if name is not None and getattr(QNET, name, None) is function:
+        return name
+    return None
+
+
+def resolve_conversions(names, required=True):
+    """
+    Returns the conversion functions named in a snapshot header
+
+    Parameters
+    ----------
+    names: dict [str, list]
+        Dictionary between costs and the names of their conversion functions, as stored by function_name
+    required: bool, optional
+        If True, assert that every conversion is a QNET function. Otherwise, costs whose conversions are not QNET
+        functions are left out. (The default is True)
+    """
+    conversions = {}
+    for cost, funcs in names.items():
+        if None in funcs:
+            assert required is False, f"Conversions of \"{cost}\" are not QNET functions and must be given"
+            continue
+        conversions[cost] = [getattr(QNET, f) for f in funcs]
+    return conversions
+
+
+class QnetSnapshot:
+    def __init__(self, header, arrays):
+        """
+        Array representation of a Qnet graph.
+
+        Use QnetSnapshot.from_qnet to build a snapshot from a graph, save and load to move it to and from disk, and
+        to_qnet to turn it back into a Qnet.
+
+        Parameters
+        ----------
+        header: dict
+            Schema of the snapshot. See the documentation of Snapshot.py
+        arrays: dict [str, numpy.ndarray]
+            Dictionary between array names and arrays
+
+        Attributes
+        ----------
+        header
+        All arrays listed in the documentation of Snapshot.py
+        """
+        self.header = header
+        for name in array_names:
+            setattr(self, name, arrays[name])
+        self.conversions = resolve_conversions(header["conversions"], required=False)
+        self._index = None
+        self._graphs = {}
+        self._components = None
+        self._last_search = None
+
+    def __len__(self):
+        return len(self.node_type)
+
+    @property
+    def number_of_edges(self):
+        return len(self.edge_u)
+
+    def name(self, i):
+        """
+        Returns the name of node i
+        """
+        start, end = self.name_offsets[i], self.name_offsets[i + 1]
+        return bytes(self.name_data[start:end]).decode("utf-8")
+
+    def names(self):
+        """
+        Returns the list of all node names
+        """
+        return [self.name(i) for i in range(len(self))]
+
+    def index(self, name):
+        """
+        Returns the index of the node with a given name, or None if there is no such node
+        """
+        if self._index is None:
+            self._index = {node_name: i for i, node_name in enumerate(self.names())}
+        return self._index.get(name)
+
+    def node_index(self, node):
+        """
+        Returns the index of a node given by name or as a Qnode, asserting that it exists
+        """
+        if isinstance(node, QNET.Qnode):
+            node = node.name
+        i = self.index(node)
+        assert i is not None, f"Node \"{node}\" is not in the snapshot"
+        return i
+
+    def route_weights(self, cost_type):
+        """
+        Returns the routing weights of the entries of the CSR adjacency for an additive cost, i.e. 'add_e'.
+
+        As in get_weight_function, the weight of a channel is its cost plus half of the costs of its end nodes.
+        """
+        if cost_type in self._graphs:
+            return self._graphs[cost_type].data
+        k = self.header["cost_keys"].index(cost_type)
+        rows = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+        return self.edge_costs[self.csr_edge, k] + self.node_costs[rows, k] / 2 + self.node_costs[self.indices, k] / 2
+
+    def route_graph(self, cost_type):
+        """
+        Returns the CSR adjacency as a scipy.sparse matrix weighted by route_weights(cost_type)
+        """
+        if cost_type not in self._graphs:
+            weights = self.route_weights(cost_type)
+            self._graphs[cost_type] = scipy.sparse.csr_matrix((weights, self.indices, self.indptr),
+                                                              shape=(len(self), len(self)), copy=False)
+        return self._graphs[cost_type]
+
+    def shortest_path(self, source, target, cost_type):
+        """
+        Find the shortest path between two nodes with scipy.sparse.csgraph.dijkstra
+
+        The distances from the last source searched are kept, so repeated queries from one source are only searched
+        once.
+
+        Parameters
+        ----------
+        source: Union[str, Qnode()]
+        target: Union[str, Qnode()]
+        cost_type: str
+            Any additive cost, i.e. 'add_e'
+
+        Returns
+        -------
+        (float, list of int, list of int)
+            Length of the path in cost_type, node indices of the path and the edge table indices of its channels
+
+        Raises
+        ------
+        networkx.NetworkXNoPath
+            If there is no path between source and target
+        """
+        s = self.node_index(source)
+        t = self.node_index(target)
+        if self._last_search is not None and self._last_search[:2] == (cost_type, s):
+            dist, pred = self._last_search[2:]
+        else:
+            dist, pred = dijkstra(self.route_graph(cost_type), indices=s, return_predecessors=True)
+            self._last_search = (cost_type, s, dist, pred)
+        if np.isinf(dist[t]):
+            raise nx.NetworkXNoPath(f"Node {self.name(t)} not reachable from {self.name(s)}")
+
+        node_list = [t]
+        while node_list[-1] != s:
+            node_list.append(int(pred[node_list[-1]]))
+        node_list.reverse()
+
+        # Pick the cheapest of any parallel channels between consecutive nodes
+        weights = self.route_weights(cost_type)
+        edge_list = []
+        for u, v in zip(node_list[:-1], node_list[1:]):
+            start = self.indptr[u]
+            entries = start + np.flatnonzero(self.indices[start:self.indptr[u + 1]] == v)
+            edge_list.append(int(self.csr_edge[entries[np.argmin(weights[entries])]]))
+        return float(dist[t]), node_list, edge_list
+
+    def best_path(self, source, target, cost_type):
+        """
+        Returns the SnapshotPath between two nodes that optimises cost_type. See QNET.best_path
+        """
+        assert cost_type in self.header["cost_vector"], \
+            f"Invalid cost type. \"{cost_type}\" not in {list(self.header['cost_vector'])}"
+        length, node_list, edge_list = self.shortest_path(source, target, "add_" + cost_type)
+        return SnapshotPath(self, node_list, edge_list)
+
+    def best_path_cost(self, source, target, cost_type):
+        """
+        Returns the lowest path cost between two nodes for a given cost_type. See QNET.best_path_cost
+        """
+        assert cost_type in self.conversions, \
+            f"Invalid cost type. \"{cost_type}\" not in {list(self.conversions)}"
+        add_cost = "add_" + cost_type
+        length, node_list, edge_list = self.shortest_path(source, target, add_cost)
+        # Compensate shortest path cost with 1/2 head cost and 1/2 tail cost
+        k = self.header["cost_keys"].index(add_cost)
+        length += self.node_costs[node_list[0], k] / 2 + self.node_costs[node_list[-1], k] / 2
+        return self.conversions[cost_type][1](float(length))
+
+    def has_path(self, source, target):
+        """
+        Returns True if there is a path between two nodes
+        """
+        if self._components is None:
+            graph = scipy.sparse.csr_matrix((np.ones(len(self.indices)), self.indices, self.indptr),
+                                            shape=(len(self), len(self)))
+            self._components = connected_components(graph, directed=False)[1]
+        return bool(self._components[self.node_index(source)] == self._components[self.node_index(target)])
+
+    @classmethod
+    def from_qnet(cls, Q):
+        """
+        Build a snapshot of a Qnet
+
+        Parameters
+        ----------
+        Q: Qnet()
+
+        Returns
+        -------
+        QnetSnapshot
+
+        Warnings
+        --------
+        Edge attributes that are not costs in Q.cost_vector are not stored.
+        """
+        cost_keys = list(Q.cost_vector) + ["add_" + cost for cost in Q.cost_vector]
+        memory_keys = list(Q.memory_vector) + ["add_" + cost for cost in Q.memory_vector]
+        nodes = list(Q.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        n = len(nodes)
+
+        names = [node.name.encode("utf-8") for node in nodes]
+        name_offsets = np.zeros(n + 1, dtype=np.int64)
+        name_offsets[1:] = np.cumsum([len(name) for name in names])
+        name_data = np.frombuffer(b"".join(names), dtype=np.uint8)
+
+        node_type = np.zeros(n, dtype=np.int8)
+        coords = np.zeros((n, 3))
+        node_costs = np.zeros((n, len(cost_keys)))
+        node_memory = np.zeros((n, len(memory_keys)))
+        is_memory = np.zeros(n, dtype=bool)
+        cartesian = np.zeros(n, dtype=bool)
+        velocity = np.zeros((n, 2))
+        swap_prob = np.zeros(n)
+        t_memory = np.zeros(n)
+        ephemerides = {}
+
+        for i, node in enumerate(nodes):
+            node_type[i] = type_names.index(type(node).__name__)
+            coords[i] = node.coords
+            node_costs[i] = [node.costs[key] for key in cost_keys]
+            node_memory[i] = [node.memory[key] for key in memory_keys]
+            is_memory[i] = node.isMemory
+            if isinstance(node, QNET.Satellite):
+                cartesian[i] = node.cartesian
+                if node.cartesian is True:
+                    velocity[i] = node.velocity
+                else:
+                    # Times are stored as (whole, fraction) Julian dates to keep their full precision
+                    ephemerides[str(i)] = {"line1": node.line1, "line2": node.line2,
+                                           "t_now": [node.t_now.whole, node.t_now.tt_fraction],
+                                           "t_startTime": [node.t_startTime.whole, node.t_startTime.tt_fraction],
+                                           "t_new": [node.t_new.whole, node.t_new.tt_fraction]}
+            elif isinstance(node, QNET.Swapper):
+                swap_prob[i] = node.swap_prob
+            elif isinstance(node, QNET.Memory):
+                t_memory[i] = node.t_memory
+
+        edges = list(Q.edges(keys=True, data=True))
+        m = len(edges)
+        edge_u = np.array([index[u] for u, v, key, data in edges], dtype=np.int64)
+        edge_v = np.array([index[v] for u, v, key, data in edges], dtype=np.int64)
+        edge_key = np.array([key for u, v, key, data in edges], dtype=np.int64)
+        edge_costs = np.array([[data[key] for key in cost_keys] for u, v, k, data in edges]).reshape(m, len(cost_keys))
+
+        # Symmetric CSR adjacency
+        rows = np.concatenate([edge_u, edge_v])
+        order = np.argsort(rows, kind="stable")
+        indices = np.concatenate([edge_v, edge_u])[order]
+        csr_edge = np.concatenate([np.arange(m), np.arange(m)])[order]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(rows, minlength=n))
+
+        header = {"format": SNAPSHOT_FORMAT,
+                  "cost_keys": cost_keys,
+                  "memory_keys": memory_keys,
+                  "cost_vector": Q.cost_vector,
+                  "cost_ranges": Q.cost_ranges,
+                  "conversions": {cost: [function_name(f) for f in funcs] for cost, funcs in Q.conversions.items()},
+                  "memory_vector": Q.memory_vector,
+                  "memory_ranges": Q.memory_ranges,
+                  "memory_conversions": {cost: [function_name(f) for f in funcs]
+                                         for cost, funcs in Q.memory_conversions.items()},
+                  "type_names": type_names,
+                  "ephemerides": ephemerides}
+
+        arrays = {"name_data": name_data, "name_offsets": name_offsets, "node_type": node_type, "coords": coords,
+                  "node_costs": node_costs, "node_memory": node_memory, "is_memory": is_memory,
+                  "cartesian": cartesian, "velocity": velocity, "swap_prob": swap_prob, "t_memory": t_memory,
+                  "edge_u": edge_u, "edge_v": edge_v, "edge_key": edge_key, "edge_costs": edge_costs,
+                  "indptr": indptr, "indices": indices, "csr_edge": csr_edge}
+        return cls(header, arrays)
+
+    def save(self, path):
+        """
+        Write the snapshot to the directory path, creating it if necessary
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in array_names:
+            np.save(os.path.join(path, name + ".npy"), np.asarray(getattr(self, name)))
+        with open(os.path.join(path, "header.json"), "w") as file:
+            json.dump(self.header, file, default=float)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a snapshot from the directory path
+
+        Parameters
+        ----------
+        path: str
+        mmap: bool, optional
+            If True, the arrays are memory-mapped read-only instead of read into memory. (The default is True)
+
+        Returns
+        -------
+        QnetSnapshot
+        """
+        with open(os.path.join(path, "header.json")) as file:
+            header = json.load(file)
+        assert header["format"] == SNAPSHOT_FORMAT, f"Unsupported snapshot format: {header['format']}"
+        mmap_mode = "r" if mmap is True else None
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode) for name in array_names}
+        return cls(header, arrays)
+
+    def to_qnet(self, conversions=None, memory_conversions=None):
+        """
+        Rebuild a Qnet from the snapshot
+
+        Parameters
+        ----------
+        conversions: dict [str, (function, function)], optional
+            Conversion functions of the Qnet. Only needed if the conversions were not functions of QNET, such as
+            lambdas, since these cannot be stored.
+        memory_conversions: dict [str, (function, function)], optional
+            Memory conversion functions, as above
+
+        Returns
+        -------
+        Qnet()
+        """
+        header = self.header
+        Q = QNET.Qnet(cost_vector=header["cost_vector"],
+                      cost_ranges={cost: tuple(rng) for cost, rng in header["cost_ranges"].items()},
+                      conversions=conversions or resolve_conversions(header["conversions"]),
+                      memory_vector=header["memory_vector"],
+                      memory_ranges={cost: tuple(rng) for cost, rng in header["memory_ranges"].items()},
+                      memory_conversions=memory_conversions or resolve_conversions(header["memory_conversions"]))
+
+        cost_keys = header["cost_keys"]
+        memory_keys = header["memory_keys"]
+        classes = [getattr(QNET, name) for name in header["type_names"]]
+        ephemerides = header["ephemerides"]
+        ts = QNET.get_timescale() if len(ephemerides) > 0 else None
+
+        # Nodes are restored attribute by attribute rather than through their constructors, which would recompute
+        # costs and satellite positions
+        nodes = []
+        for i in range(len(self)):
+            node = QNET.Qnode.__new__(classes[self.node_type[i]])
+            node.name = self.name(i)
+            node.coords = self.coords[i].tolist()
+            node.costs = dict(zip(cost_keys, self.node_costs[i].tolist()))
+            node.memory = dict(zip(memory_keys, self.node_memory[i].tolist()))
+            node.isMemory = bool(self.is_memory[i])
+            if isinstance(node, QNET.Satellite):
+                node.cartesian = bool(self.cartesian[i])
+                if node.cartesian is True:
+                    node.velocity = self.velocity[i].tolist()
+                    node.line1 = None
+                    node.line2 = None
+                else:
+                    eph = ephemerides[str(i)]
+                    node.line1 = eph["line1"]
+                    node.line2 = eph["line2"]
+                    node.ts = ts
+                    node.t_now = ts.tt_jd(*eph["t_now"])
+                    node.t_startTime = ts.tt_jd(*eph["t_startTime"])
+                    node.t_new = ts.tt_jd(*eph["t_new"])
+                    node.time = (node.t_new - node.t_startTime) * 86400
+                    node.satellite = QNET.get_earth_satellite(node.line1, node.line2, node.name)
+            elif isinstance(node, QNET.Swapper):
+                node.swap_prob = float(self.swap_prob[i])
+            elif isinstance(node, QNET.Memory):
+                node.t_memory = float(self.t_memory[i])
+            nodes.append(node)
+        Q.add_nodes_from(nodes)
+
+        edge_costs = np.asarray(self.edge_costs).tolist()
+        Q.add_edges_from((nodes[u], nodes[v], key, dict(zip(cost_keys, costs)))
+                         for u, v, key, costs in zip(self.edge_u.tolist(), self.edge_v.tolist(),
+                                                     self.edge_key.tolist(), edge_costs))
+        return Q
+
+
+def save_qnet(Q, path):
+    """
+    Save a Qnet as a snapshot in the directory path
+
+    Parameters
+    ----------
+    Q: Qnet()
+    path: str
+
+    Returns
+    -------
+    QnetSnapshot
+    """
+    snapshot = QnetSnapshot.from_qnet(Q)
+    snapshot.save(path)
+    return snapshot
+
+
+def load_qnet(path, conversions=None, memory_conversions=None):
+    """
+    Load a Qnet from a snapshot in the directory path
+
+    See QnetSnapshot.to_qnet for details of the parameters
+
+    Returns
+    -------
+    Qnet()
+    """
+    return QnetSnapshot.load(path).to_qnet(conversions, memory_conversions)
+
+
+class SnapshotPath:
+    def __init__(self, snapshot, node_list, edge_list):
+        """
+        Path through a QnetSnapshot, as returned by best_path for snapshots and shared views of a Qnet.
+
+        Parameters
+        ----------
+        snapshot: QnetSnapshot
+        node_list: list of int
+            Indices of the nodes of the path
+        edge_list: list of int
+            Edge table indices of the channels of the path
+
+        Attributes
+        ----------
+        G: QnetSnapshot
+        node_array: list of str
+            Names of the nodes of the path
+        edge_keys: list of int
+            Multigraph keys of the channels of the path
+        head: str
+        tail: str
+        cost_vector: dict
+            Cost vector of the path, as in Path.cost_vector
+        """
+        self.G = snapshot
+        self.node_array = [snapshot.name(i) for i in node_list]
+        self.edge_keys = [int(snapshot.edge_key[j]) for j in edge_list]
+        self.head = self.node_array[0]
+        self.tail = self.node_array[-1]
+
+        # Sum the costs of all elements in the path and convert additive costs back
+        totals = np.asarray(snapshot.node_costs)[node_list].sum(axis=0) + \
+            np.asarray(snapshot.edge_costs)[edge_list].sum(axis=0)
+        self.cost_vector = dict(zip(snapshot.header["cost_keys"], totals.tolist()))
+        for cost, funcs in snapshot.conversions.items():
+            self.cost_vector[cost] = funcs[1](self.cost_vector["add_" + cost])
+
+    def __str__(self):
+        return "Path: " + self.stringify() + ", Cost: " + str(self.cost_vector)
+
+    def __repr__(self):
+        return self.stringify()
+
+    def stringify(self):
+        """
+        Returns the names of the nodes in the path joined by "-"
+        """
+        return "-".join(self.node_array)
+
+
+# Shared views attached in this process, by the name of their shared memory block
+attached_views = {}
+
+
+class SharedQnet(QnetSnapshot):
+    def __init__(self, handle, shm, owner=False):
+        """
+        Read-only view of a Qnet published in a multiprocessing.shared_memory block.
+
+        The view holds the arrays of a QnetSnapshot, along with the routing weights of every additive cost, in a
+        single shared memory block. Worker processes attach to the block by its handle without copying it, and
+        best_path, best_path_cost and path_exist accept the view in place of a Qnet. Pickling a view only pickles its
+        handle, so it can be passed directly as an argument to multiprocessing.Pool. Each process attaches to a given
+        block once and keeps its view, along with any routing results cached on it, for later tasks.
+
+        Use share_qnet to publish a Qnet and SharedQnet.attach to attach to a published Qnet.
+
+        Parameters
+        ----------
+        handle: dict
+            Name of the shared memory block, header of the snapshot and the layout of its arrays within the block
+        shm: multiprocessing.shared_memory.SharedMemory
+        owner: bool, optional
+            True in the process that published the view, which is responsible for unlinking the block
+
+        Examples
+        --------
+        Evaluate the best efficiency between pairs of nodes in parallel
+
+        >>> with QNET.share_qnet(Q) as view:
+        ...     with multiprocessing.Pool() as pool:
+        ...         costs = pool.starmap(QNET.best_path_cost, [(view, u, v, 'e') for u, v in pairs])
+
+        Warnings
+        --------
+        The block is removed when the owner calls unlink, or leaves the with statement. Views attached by unrelated
+        processes on Python versions before 3.13 are registered with their own resource tracker, which removes the
+        block when they exit. Views attached by processes started with multiprocessing share the tracker of their
+        parent and are unaffected.
+        """
+        arrays = {}
+        for name, (offset, dtype, shape) in handle["layout"].items():
+            array = np.ndarray(tuple(shape), dtype=dtype, buffer=shm.buf, offset=offset)
+            array.flags.writeable = False
+            arrays[name] = array
+        super().__init__(handle["header"], arrays)
+        self.csr_weights = arrays["csr_weights"]
+        self.handle = handle
+        self.shm = shm
+        self.owner = owner
+        attached_views[handle["name"]] = self
+
+    @classmethod
+    def publish(cls, snapshot):
+        """
+        Copy a QnetSnapshot into a new shared memory block
+
+        Parameters
+        ----------
+        snapshot: QnetSnapshot
+
+        Returns
+        -------
+        SharedQnet
+            The view owning the block
+        """
+        route_keys = ["add_" + cost for cost in snapshot.header["cost_vector"]]
+        arrays = {name: np.asarray(getattr(snapshot, name)) for name in array_names}
+        # scipy.sparse.csgraph works on 32 bit indices, which are stored directly when they fit
+        if len(snapshot.indices) < np.iinfo(np.int32).max:
+            arrays["indptr"] = arrays["indptr"].astype(np.int32)
+            arrays["indices"] = arrays["indices"].astype(np.int32)
+        arrays["csr_weights"] = np.array([snapshot.route_weights(key) for key in route_keys]).reshape(
+            len(route_keys), len(snapshot.indices))
+
+        # Place the arrays in the block on 64 byte boundaries
+        layout = {}
+        size = 0
+        for name, array in arrays.items():
+            offset = -(-size // 64) * 64
+            layout[name] = (offset, array.dtype.str, array.shape)
+            size = offset + array.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for name, array in arrays.items():
+            offset, dtype, shape = layout[name]
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = array
+
+        header = dict(snapshot.header, route_keys=route_keys)
+        return cls({"name": shm.name, "header": header, "layout": layout}, shm, owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Attach to a published Qnet by its handle, reusing this process' view of it if there is one
+
+        Parameters
+        ----------
+        handle: dict
+            SharedQnet.handle of the published view
+
+        Returns
+        -------
+        SharedQnet
+        """
+        view = attached_views.get(handle["name"])
+        if view is not None:
+            return view
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=handle["name"], track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=handle["name"])
+        return cls(handle, shm)
+
+    def __reduce__(self):
+        return SharedQnet.attach, (self.handle,)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.owner is True:
+            self.unlink()
+        else:
+            self.close()
+
+    def route_weights(self, cost_type):
+        return self.csr_weights[self.header["route_keys"].index(cost_type)]
+
+    def close(self):
+        """
+        Detach from the shared memory block. Arrays taken from the view must be released beforehand.
+        """
+        if self.shm is None:
+            return
+        for name in array_names:
+            setattr(self, name, None)
+        self.csr_weights = None
+        self._graphs = {}
+        self._last_search = None
+        attached_views.pop(self.handle["name"], None)
+        self.shm.close()
+        self.shm = None
+
+    def unlink(self):
+        """
+        Detach from and remove the shared memory block. Only the owner of the view may remove the block.
+        """
+        assert self.owner is True, "Only the process that published a SharedQnet may unlink it"
+        shm = self.shm
+        self.close()
+        if shm is not None:
+            shm.unlink()
+
+
+def share_qnet(Q):
+    """
+    Publish a read-only view of a Qnet in shared memory. See SharedQnet for details
+
+    Parameters
+    ----------
+    Q: Qnet()
+
+    Returns
+    -------
+    SharedQnet
+        The view owning the shared memory block
+    """
+    view = SharedQnet.publish(QnetSnapshot.from_qnet(Q))
+    # Conversions that are not QNET functions are only available to the owner
+    view.conversions = dict(Q.conversions)
+    return view
@@ -0,0 +1,482 @@
+"""
+Visibility.py contains a spatial index over the ground nodes of a Qnet, the management of satellite channels by
+visibility, and contact plans of the visibility windows between satellites and ground nodes over time.
+
+A ground node is visible from a satellite if the satellite is above the node and its elevation, seen from the node,
+is at least a given elevation mask. With visibility enabled (See Qnet.enable_visibility), Qnet.update only evaluates
+the costs of channels between satellites and the ground nodes that they can currently see, creating channels as
+satellites rise and removing them as they set.
+
+A ContactPlan precomputes the visibility windows over a time span. Passed to enable_visibility, its windows replace
+the index while the Qnet is within the span, so satellites below the horizon of every node are skipped outright. The
+channels it creates and removes are recorded in the change log like any others, so cached routes and DynamicRouter
+trees follow them.
+"""
+
+import QNET
+import numpy as np
+import bisect
+from scipy.spatial import cKDTree
+
+# Mean radius of the Earth in km
+EARTH_RADIUS = 6371.0
+# Margin in degrees added to the footprints of satellites with geodesic coordinates, which are rounded to whole degrees
+# and computed for a spherical Earth
+FOOTPRINT_MARGIN = 2.0
+
+
+def unit_vectors(lat, lon):
+    """
+    Returns the unit vectors from the centre of the Earth towards the given latitudes and longitudes, in degrees
+    """
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+class GroundIndex:
+    def __init__(self, Q, nodes=None):
+        """
+        Spatial index over the coordinates of the ground nodes of a Qnet, used to find the nodes visible from a
+        satellite without checking every node.
+
+        Nodes are indexed in the two coordinate systems used by satellites: by their (x, y) coordinates for cartesian
+        satellites, and by the direction of their (latitude, longitude) from the centre of the Earth for satellites
+        with geodesic coordinates. Each KD-tree is built on first use.
+
+        The index is rebuilt when the change log of Q shows that nodes other than satellites were added, removed or
+        updated. Coordinates assigned to nodes directly are not recorded in the log, so call rebuild afterwards.
+
+        Parameters
+        ----------
+        Q: Qnet()
+        nodes: list of Qnode(), optional
+            Nodes to index. (The default is None, which indexes all Ground nodes of Q)
+        """
+        self.Q = Q
+        self.given = None if nodes is None else list(nodes)
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Rebuild the index from the current nodes of Q
+        """
+        Q = self.Q
+        if self.given is None:
+            nodes = [node for node in Q.nodes if isinstance(node, QNET.Ground)]
+        else:
+            nodes = [node for node in self.given if node in Q]
+        self.nodes = nodes
+        self.node_set = set(nodes)
+        self.node_ids = {id(node) for node in nodes}
+        self.coords = np.array([node.coords for node in nodes], dtype=float).reshape(len(nodes), 3)
+        self.lowest = self.coords[:, 2].min() if len(nodes) > 0 else 0
+        self.version = Q.version
+        self._plane_tree = None
+        self._sphere_tree = None
+
+    def is_stale(self):
+        """
+        Returns True if nodes of Q other than satellites have changed since the index was built
+        """
+        Q = self.Q
+        if Q.version == self.version:
+            return False
+        # If the log no longer reaches back to the index, assume the worst
+        if len(Q.changes) == 0 or Q.changes[0][0] > self.version + 1:
+            return True
+        for version, nodes, edges, costs, decreased in reversed(Q.changes):
+            if version <= self.version:
+                break
+            for i in nodes:
+                node = Q.node_from_id(i)
+                if node is None:
+                    # A node that is gone from Q only matters if it was indexed
+                    if i in self.node_ids:
+                        return True
+                elif not isinstance(node, QNET.Satellite):
+                    return True
+        # Nothing relevant has changed, so the index is valid at the current version
+        self.version = Q.version
+        return False
+
+    def visible(self, satellite, min_elevation=0):
+        """
+        Find the indexed nodes that are visible from a satellite
+
+        Parameters
+        ----------
+        satellite: Satellite()
+        min_elevation: float, optional
+            Elevation mask in degrees. (The default is 0)
+
+        Returns
+        -------
+        list of Qnode()
+        """
+        if self.is_stale():
+            self.rebuild()
+        if len(self.nodes) == 0:
+            return []
+        if satellite.cartesian is True:
+            return self.visible_cartesian(satellite, min_elevation)
+        return self.visible_geodesic(satellite, min_elevation)
+
+    def visible_cartesian(self, satellite, min_elevation):
+        sx, sy, sz = satellite.coords
+        dz_max = sz - self.lowest
+        if dz_max <= 0:
+            return []
+        if min_elevation > 0:
+            # Nodes further than dz / tan(elevation) from the point below the satellite see it too low
+            if self._plane_tree is None:
+                self._plane_tree = cKDTree(self.coords[:, :2])
+            radius = dz_max / np.tan(np.radians(min_elevation))
+            candidates = np.array(self._plane_tree.query_ball_point([sx, sy], radius), dtype=int)
+        else:
+            candidates = np.arange(len(self.nodes))
+        if len(candidates) == 0:
+            return []
+
+        # As in Satellite.airCost
+        diff = np.array([sx, sy, sz]) - self.coords[candidates]
+        dz = diff[:, 2]
+        dist = np.sqrt((diff ** 2).sum(axis=1))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            elevation = np.degrees(np.arcsin(dz / dist))
+        keep = (dz > 0) & (elevation >= min_elevation)
+        return [self.nodes[i] for i in candidates[keep]]
+
+    def visible_geodesic(self, satellite, min_elevation):
+        if self._sphere_tree is None:
+            self._sphere_tree = cKDTree(unit_vectors(self.coords[:, 0], self.coords[:, 1]))
+        lat, lon, altitude = satellite.coords
+        # Earth central angle of the footprint of the satellite for the elevation mask
+        mask = np.radians(min_elevation)
+        ratio = EARTH_RADIUS / (EARTH_RADIUS + max(altitude, 0)) * np.cos(mask)
+        angle = min(np.arccos(min(ratio, 1)) - mask + np.radians(FOOTPRINT_MARGIN), np.pi)
+        candidates = self._sphere_tree.query_ball_point(unit_vectors([lat], [lon])[0], 2 * np.sin(angle / 2))
+
+        # Check the elevation of every candidate exactly, as in Satellite.airCost
+        visible = []
+        for i in candidates:
+            node = self.nodes[i]
+            topocentric = (satellite.satellite - QNET.get_topos(node.coords)).at(satellite.t_new)
+            alt, az, distance = topocentric.altaz()
+            if alt.degrees >= min_elevation and alt.degrees > 0:
+                visible.append(node)
+        return visible
+
+
+class VisibilityManager:
+    def __init__(self, Q, min_elevation=0, nodes=None, key=0, plan=None):
+        """
+        Keeps the channels between the satellites of a Qnet and its ground nodes in line with visibility.
+
+        On every refresh, the channels from each satellite to the ground nodes it can see are created or have their
+        costs recalculated with "airCost", and the channels to ground nodes it can no longer see are removed. Only
+        the visible pairs are evaluated, so the cost of a refresh scales with the number of visible pairs rather than
+        with the number of satellites times the number of ground nodes.
+
+        Existing channels between satellites and indexed ground nodes with the given key are managed from the start.
+
+        With a contact plan, the windows of the plan decide visibility while Q is within its time span. A satellite
+        without a contact at the current time is skipped without querying the index, and only the pairs in contact
+        are evaluated. Satellites that are not in the plan, and times outside of its span, fall back to the index.
+
+        Parameters
+        ----------
+        Q: Qnet()
+        min_elevation: float, optional
+            Elevation mask in degrees. (The default is 0)
+        nodes: list of Qnode(), optional
+            Ground nodes to manage channels to. (The default is None, which means all Ground nodes of Q)
+        key: int, optional
+            Key of the managed channels. (The default is 0)
+        plan: ContactPlan, optional
+            Contact plan of the satellites and ground nodes of Q, built from the current state of Q. (The default is
+            None)
+
+        Attributes
+        ----------
+        index: GroundIndex
+        links: dict [Satellite(), set of Qnode()]
+            Dictionary between satellites and the nodes of their managed channels
+        plan: ContactPlan or None
+        """
+        self.Q = Q
+        self.min_elevation = min_elevation
+        self.key = key
+        self.plan = plan
+        self.index = GroundIndex(Q, nodes)
+        self.links = {}
+        for s in Q.nodes:
+            if isinstance(s, QNET.Satellite):
+                nodes = {n for n in Q.adj[s] if n in self.index.node_set and key in Q.adj[s][n]}
+                if len(nodes) > 0:
+                    self.links[s] = nodes
+
+    def manages(self, satellite, node):
+        """
+        Returns True if the channel between a satellite and a node is managed by visibility
+        """
+        return isinstance(satellite, QNET.Satellite) and node in self.index.node_set
+
+    def refresh(self, satellites=None):
+        """
+        Create, update and remove the managed channels of satellites according to what they can currently see
+
+        Parameters
+        ----------
+        satellites: list of Satellite(), optional
+            Satellites to refresh. (The default is None, which means all satellites of Q)
+
+        Returns
+        -------
+        list of (Qnode, Qnode, int)
+            The channels that were created, removed or had their costs changed
+        """
+        Q = self.Q
+        if satellites is None:
+            satellites = [node for node in Q.nodes if isinstance(node, QNET.Satellite)]
+        key = self.key
+        contacts = self.plan.contacts_at(Q.time) if self.plan is not None else None
+        changed = []
+        for s in satellites:
+            if contacts is not None and s in self.plan.satellites:
+                visible = contacts.get(s, set()) & self.index.node_set
+            else:
+                visible = set(self.index.visible(s, self.min_elevation))
+            for n in visible:
+                old_costs = Q.adj[s][n].get(key) if n in Q.adj[s] else None
+                old_costs = dict(old_costs) if old_costs is not None else None
+                Q.add_qchan(edge=(s.name, n.name), key=key)
+                if Q.adj[s][n][key] != old_costs:
+                    changed.append((s, n, key))
+            for n in self.links.get(s, set()) - visible:
+                if Q.has_edge(s, n, key):
+                    Q.remove_edge(s, n, key)
+                    changed.append((s, n, key))
+            self.links[s] = visible
+        # Forget the channels of satellites that were removed from Q
+        for s in [s for s in self.links if s not in Q]:
+            del self.links[s]
+        return changed
+
+
+class ContactPlan:
+    def __init__(self, Q, tMax, min_elevation=0, satellites=None, nodes=None):
+        """
+        Visibility windows between the satellites and ground nodes of a Qnet over the time span [0, tMax].
+
+        Times are in seconds from the current state of Q, as advanced by Qnet.update. The windows of cartesian
+        satellites follow in closed form from their straight line motion. The windows of satellites with geodesic
+        coordinates are found with the rise, culmination and set events of skyfield's EarthSatellite.find_events.
+        Visibility is defined as in GroundIndex.visible.
+
+        Windows are kept in an interval index sorted by their start times, so that the contacts active at a time, or
+        overlapping a time interval, are found without scanning the whole plan.
+
+        Parameters
+        ----------
+        Q: Qnet()
+        tMax: float
+            Time span of the plan
+        min_elevation: float, optional
+            Elevation mask in degrees. (The default is 0)
+        satellites: list of Satellite(), optional
+            (The default is None, which means all satellites of Q)
+        nodes: list of Qnode(), optional
+            Ground nodes. (The default is None, which means all Ground nodes of Q)
+
+        Attributes
+        ----------
+        start: float
+            Time of Q when the plan was built. See Qnet.set_time
+        satellites: set of Satellite()
+        windows: dict [(Satellite(), Qnode()), list of (float, float, float)]
+            Dictionary between satellite-node pairs and the (rise, culmination, set) times of their windows, in order.
+            Windows cut by the ends of the time span rise at 0 or set at tMax. Pairs that are never in contact are
+            left out.
+
+        Examples
+        --------
+        Find the satellites that a ground station sees during the first hour of a simulation
+
+        >>> plan = QNET.ContactPlan(Q, 3600, min_elevation=10)
+        >>> [s for s, n in plan.overlapping(0, 3600) if n.name == 'Perth']
+        """
+        self.tMax = tMax
+        self.min_elevation = min_elevation
+        self.start = Q.time
+        if satellites is None:
+            satellites = [node for node in Q.nodes if isinstance(node, QNET.Satellite)]
+        self.satellites = set(satellites)
+        if nodes is None:
+            nodes = [node for node in Q.nodes if isinstance(node, QNET.Ground)]
+
+        self.windows = {}
+        for satellite in satellites:
+            if satellite.cartesian is True:
+                self.add_cartesian(satellite, nodes)
+            else:
+                self.add_geodesic(satellite, nodes)
+        self.build_index()
+
+    def add_cartesian(self, satellite, nodes):
+        """
+        Find the windows of a cartesian satellite in closed form.
+
+        The height dz of the satellite above a node is fixed, so the elevation of the satellite is at least
+        min_elevation while its horizontal distance from the node is at most dz / tan(min_elevation). The horizontal
+        distance squared is quadratic in time, so each window lies between the roots of a quadratic.
+        """
+        if len(nodes) == 0:
+            return
+        sx, sy, sz = satellite.coords
+        vx, vy = satellite.velocity
+        coords = np.array([node.coords for node in nodes], dtype=float).reshape(len(nodes), 3)
+        dz = sz - coords[:, 2]
+        hx = sx - coords[:, 0]
+        hy = sy - coords[:, 1]
+
+        a = vx ** 2 + vy ** 2
+        b = 2 * (hx * vx + hy * vy)
+        if self.min_elevation > 0:
+            c = hx ** 2 + hy ** 2 - (dz / np.tan(np.radians(self.min_elevation))) ** 2
+        else:
+            c = np.full(len(nodes), -np.inf)
+
+        if a == 0:
+            # A stationary satellite is in contact for all time or none of it
+            start = np.where(c <= 0, 0.0, np.inf)
+            end = np.where(c <= 0, self.tMax, -np.inf)
+            peak = start
+        else:
+            with np.errstate(invalid="ignore"):
+                root = np.sqrt(b ** 2 - 4 * a * c)
+            start = np.maximum((-b - root) / (2 * a), 0)
+            end = np.minimum((-b + root) / (2 * a), self.tMax)
+            # Closest approach
+            peak = np.clip(-b / (2 * a), start, end)
+
+        for i in np.flatnonzero((dz > 0) & (start <= end)):
+            self.windows[(satellite, nodes[i])] = [(float(start[i]), float(peak[i]), float(end[i]))]
+
+    def add_geodesic(self, satellite, nodes):
+        """
+        Find the windows of a satellite with geodesic coordinates from its rise, culmination and set events
+        """
+        ts = satellite.ts
+        t0 = satellite.t_new
+        t1 = ts.tt_jd(t0.whole, t0.tt_fraction + self.tMax / 86400)
+        altitude = max(self.min_elevation, 0)
+
+        for node in nodes:
+            topos = QNET.get_topos(node.coords)
+            difference = satellite.satellite - topos
+            times, kinds = satellite.satellite.find_events(topos, t0, t1, altitude_degrees=altitude)
+            seconds = [(t - t0) * 86400 for t in times]
+
+            def elevation(second):
+                return difference.at(ts.tt_jd(t0.whole, t0.tt_fraction + second / 86400)).altaz()[0].degrees
+
+            # Walk through the events, starting in contact if the satellite is already up
+            windows = []
+            start = 0.0 if elevation(0) >= altitude else None
+            peak = None
+            for second, kind in zip(seconds, kinds):
+                if kind == 0:
+                    start, peak = second, None
+                elif kind == 1:
+                    peak = second
+                else:
+                    windows.append([0.0 if start is None else start, peak, second])
+                    start, peak = None, None
+            if start is not None:
+                windows.append([start, peak, float(self.tMax)])
+
+            for window in windows:
+                if window[1] is None:
+                    # Cut windows without a culmination peak at whichever end is higher
+                    window[1] = window[0] if elevation(window[0]) >= elevation(window[2]) else window[2]
+            if len(windows) > 0:
+                self.windows[(satellite, node)] = [tuple(window) for window in windows]
+
+    def build_index(self):
+        """
+        Sort the windows of the plan by their start times
+        """
+        contacts = sorted(((start, peak, end, pair) for pair, windows in self.windows.items()
+                          for start, peak, end in windows), key=lambda contact: contact[0])
+        self.contacts = contacts
+        self.starts = [contact[0] for contact in contacts]
+        # No window is longer than this, which bounds the search for windows containing a given time
+        self.longest = max((end - start for start, peak, end, pair in contacts), default=0)
+        self.event_times = sorted({contact[0] for contact in contacts} | {contact[2] for contact in contacts})
+
+    def in_contact(self, satellite, node, t):
+        """
+        Returns True if a satellite and a node are in contact at time t
+        """
+        windows = self.windows.get((satellite, node), [])
+        i = bisect.bisect_right(windows, (t, np.inf, np.inf)) - 1
+        return i >= 0 and windows[i][2] >= t
+
+    def overlapping(self, t0, t1):
+        """
+        Returns the (satellite, node) pairs in contact at some time in [t0, t1]
+        """
+        lo = bisect.bisect_left(self.starts, t0 - self.longest)
+        hi = bisect.bisect_right(self.starts, t1)
+        # Pairs in order of their first window, without repeats
+        pairs = {}
+        for start, peak, end, pair in self.contacts[lo:hi]:
+            if end >= t0:
+                pairs[pair] = None
+        return list(pairs)
+
+    def active(self, t):
+        """
+        Returns the (satellite, node) pairs in contact at time t
+        """
+        return self.overlapping(t, t)
+
+    def contacts_at(self, time):
+        """
+        Returns the nodes in contact with each satellite at a time of the Qnet, as in Qnet.time
+
+        Parameters
+        ----------
+        time: float
+
+        Returns
+        -------
+        dict [Satellite(), set of Qnode()] or None
+            Dictionary between the satellites with contacts and the nodes they are in contact with, or None if the
+            time is outside of the span of the plan
+        """
+        t = time - self.start
+        if not 0 <= t <= self.tMax:
+            return None
+        contacts = {}
+        for satellite, node in self.active(t):
+            contacts.setdefault(satellite, set()).add(node)
+        return contacts
+
+    def events(self):
+        """
+        Returns the list of (time, kind, satellite, node) of the rises and sets of the plan in order of time, where
+        kind is 'rise' or 'set'
+        """
+        events = [(start, 'rise', pair) for start, peak, end, pair in self.contacts] + \
+                 [(end, 'set', pair) for start, peak, end, pair in self.contacts]
+        events.sort(key=lambda event: (event[0], event[1] == 'rise'))
+        return [(t, kind, satellite, node) for t, kind, (satellite, node) in events]
+
+    def next_event(self, t):
+        """
+        Returns the time of the first rise or set after time t, or None if there is none
+        """
+        i = bisect.bisect_right(self.event_times, t)
+        return self.event_times[i] if i < len(self.event_times) else None
@@ -14,3 +14,12 @@ from .SimFunctions import *
 from .Reductions import *
 from .Misc import *
 from .Bramble import *
+from .Snapshot import *
+from .Readers import *
+from .Visibility import *
+from .Sinks import *
+from .Instrumentation import *
+from .MemoryProfile import *
+from .Rendering import *
+from .Animation import *
+from .Purification import *
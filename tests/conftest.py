@@ -0,0 +1,16 @@
+"""
+The repository is the QNET package itself, so it is imported as QNET from its root, whatever the name of the
+directory it was checked out to.
+"""
+
+import importlib.util
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "QNET" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("QNET", os.path.join(root, "__init__.py"),
+                                                  submodule_search_locations=[root])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["QNET"] = module
+    spec.loader.exec_module(module)
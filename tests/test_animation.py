@@ -0,0 +1,153 @@
+"""
+Tests of the frames and the streaming exporter of Animation.py
+"""
+
+import copy
+import os
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib import animation
+
+import QNET
+from QNET import Animation
+
+
+def moving_qnet():
+    Q = QNET.Qnet()
+    for i in range(5):
+        Q.add_qnode(name=f"G{i}", qnode_type="Ground", coords=[100 * i, 0, 0])
+    for i in range(4):
+        Q.add_qchan(edge=(f"G{i}", f"G{i + 1}"), e=0.9, f=0.95)
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[-200, 0, 300], v_cart=[20, 0])
+    Q.enable_visibility(min_elevation=45)
+    return Q
+
+
+def replay(frames):
+    """
+    Yields the whole state after each frame, keyed by the names of nodes
+    """
+    positions = {}
+    edges = {}
+    for t, nodes, frame_edges in frames:
+        positions.update({node.name: position for node, position in nodes.items()})
+        for (ends, key), edge in frame_edges.items():
+            name = (frozenset(node.name for node in ends), key)
+            if edge is None:
+                edges.pop(name, None)
+            else:
+                edges[name] = edge[2]
+        yield t, dict(positions), dict(edges)
+
+
+def state(C):
+    positions = {node.name: (node.coords[0], node.coords[1]) for node in C.nodes}
+    edges = {(frozenset((u.name, v.name)), key): data['e'] for u, v, key, data in C.edges(keys=True, data=True)}
+    return positions, edges
+
+
+def check_replay(Q, tMax, dt):
+    D = copy.deepcopy(Q)
+    frames = Animation.qnet_frames(Q, tMax, dt, 'e')
+    count = 0
+    for i, (t, positions, edges) in enumerate(replay(frames)):
+        if i > 0:
+            D.update(dt)
+        assert t == pytest.approx(i * dt)
+        assert (positions, edges) == state(D)
+        count += 1
+    assert count == len(QNET.getTimeArr(tMax, dt))
+
+
+def test_qnet_frames():
+    Q = moving_qnet()
+    check_replay(Q, 40, 1)
+    # The copy is stepped, not Q
+    assert Q.time == 0 and Q.getNode("S").coords[0] == -200
+
+    frames = list(Animation.qnet_frames(Q, 40, 1, 'e'))
+    t, nodes, edges = frames[0]
+    assert len(nodes) == 6 and len(edges) == len(state(Q)[1])
+    # Later frames only hold the satellite and its channels, which come and go as it passes over
+    removed = 0
+    for t, nodes, edges in frames[1:]:
+        assert {node.name for node in nodes} <= {"S"}
+        assert all("S" in {node.name for node in ends} for ends, key in edges)
+        removed += sum(edge is None for edge in edges.values())
+    assert removed > 0
+
+
+def test_qnet_frames_without_change_log(monkeypatch):
+    # A change log that no longer reaches back to the last frame falls back to sending everything
+    update = QNET.Qnet.update
+
+    def forgetful_update(self, *args, **kwargs):
+        update(self, *args, **kwargs)
+        self.changes.clear()
+    monkeypatch.setattr(QNET.Qnet, "update", forgetful_update)
+    Q = moving_qnet()
+    frames = list(Animation.qnet_frames(Q, 40, 1, 'e'))
+    assert all(len(nodes) == 6 for t, nodes, edges in frames)
+    check_replay(Q, 40, 1)
+
+
+def test_array_frames():
+    times = np.array([0, 1, 2])
+    positions = np.array([[[0, 0], [1, 0], [2, 0]],
+                          [[0, 0], [1, 1], [2, 0]],
+                          [[0, 0], [1, 1], [2, 0]]], dtype=float)
+    edges = np.array([[0, 1], [1, 2]])
+    values = np.array([[0.5, 0.7],
+                       [0.5, np.nan],
+                       [0.6, np.nan]])
+    frames = list(Animation.array_frames(times, positions, edges, values))
+    assert frames[0] == (0, {0: (0, 0), 1: (1, 0), 2: (2, 0)}, {0: (0, 1, 0.5), 1: (1, 2, 0.7)})
+    assert frames[1] == (1, {1: (1, 1)}, {1: None})
+    assert frames[2] == (2, {}, {0: (0, 1, 0.6)})
+
+
+def test_get_writer(monkeypatch):
+    writer = Animation.FrameWriter(fps=5)
+    assert Animation.get_writer(writer, 10) is writer
+    assert isinstance(Animation.get_writer('pillow', 10), animation.PillowWriter)
+    monkeypatch.setattr(animation.writers, "is_available", lambda name: False)
+    writer = Animation.get_writer(None, 12)
+    assert isinstance(writer, Animation.FrameWriter) and writer.fps == 12
+
+
+def test_animate_qnet(tmp_path):
+    Q = moving_qnet()
+    path = str(tmp_path / "frames")
+    count = QNET.animate(Q, path, tMax=10, dt=1, writer=Animation.FrameWriter(fps=5), dpi=50)
+    assert count == len(QNET.getTimeArr(10, 1))
+    files = sorted(os.listdir(path))
+    assert files == [f"frame_{i:06d}.png" for i in range(count)]
+    images = [plt.imread(os.path.join(path, file)) for file in files]
+    assert all(image.shape == images[0].shape for image in images)
+    # The satellite moves, so the frames differ
+    assert not np.array_equal(images[0], images[-1])
+    # Nothing is left open in pyplot
+    assert plt.get_fignums() == []
+
+    with pytest.raises(AssertionError, match="tMax and dt"):
+        QNET.animate(Q, path)
+
+
+def test_animate_array_frames(tmp_path):
+    PIL = pytest.importorskip("PIL.Image")
+    rng = np.random.default_rng(0)
+    positions = np.cumsum(rng.normal(size=(8, 20, 2)), axis=0)
+    edges = np.array([[i, i + 1] for i in range(19)])
+    values = rng.uniform(size=(8, 19))
+    values[3:, :5] = np.nan
+    path = str(tmp_path / "walk.gif")
+    frames = Animation.array_frames(np.arange(8), positions, edges, values)
+    assert QNET.animate(frames, path, writer='pillow', fps=4, dpi=40, title="walk") == 8
+    with PIL.open(path) as image:
+        assert image.n_frames == 8
@@ -0,0 +1,61 @@
+"""
+Tests of the benchmark suite and of its comparison with a baseline report
+"""
+
+import io
+import json
+
+import pytest
+
+from QNET import Benchmarks
+
+
+def test_every_benchmark_runs():
+    log = io.StringIO()
+    report = Benchmarks.run_benchmarks(sizes=[3], repeat=1, log=log)
+    assert [result["name"] for result in report["results"]] == list(Benchmarks.benchmarks)
+    for result in report["results"]:
+        assert "error" not in result, result
+        assert result["best"] <= result["median"] and result["items"] > 0 and result["peak_bytes"] > 0
+    assert len(log.getvalue().splitlines()) == len(Benchmarks.benchmarks)
+    assert set(report["meta"]) >= {"python", "numpy", "networkx", "repeat"}
+
+
+def test_failing_benchmark(monkeypatch):
+    def broken(size):
+        raise ValueError("no graph")
+    monkeypatch.setitem(Benchmarks.benchmarks, "broken", broken)
+    assert Benchmarks.run_benchmark("broken", 3) == {"name": "broken", "size": 3, "error": "ValueError: no graph"}
+    with pytest.raises(AssertionError, match="Unknown benchmark"):
+        Benchmarks.run_benchmarks(names=["missing"])
+
+
+def report(*results):
+    return {"meta": {}, "results": [{"name": name, "size": size, "best": best} for name, size, best in results]}
+
+
+def test_compare_benchmarks():
+    baseline = report(("a", 10, 1.0), ("b", 10, 1.0), ("c", 10, 1.0))
+    baseline["results"].append({"name": "d", "size": 10, "error": "ValueError"})
+    new = report(("a", 10, 1.05), ("b", 10, 1.5), ("a", 20, 3.0), ("d", 10, 1.0))
+    comparisons = Benchmarks.compare_benchmarks(new, baseline, threshold=0.1)
+    assert [(c["name"], c["size"], c["regression"]) for c in comparisons] == [("a", 10, False), ("b", 10, True)]
+    assert comparisons[1]["ratio"] == pytest.approx(1.5)
+
+
+def test_main_with_a_baseline(tmp_path):
+    output = str(tmp_path / "report.json")
+    assert Benchmarks.main(["--sizes", "3", "--only", "getNode", "deepcopy", "--repeat", "1",
+                            "--output", output]) == 0
+    with open(output) as file:
+        first = json.load(file)
+    # A baseline that was impossibly fast makes every benchmark a regression
+    for result in first["results"]:
+        result["best"] /= 1000
+    baseline = str(tmp_path / "baseline.json")
+    with open(baseline, "w") as file:
+        json.dump(first, file)
+    assert Benchmarks.main(["--sizes", "3", "--only", "getNode", "deepcopy", "--repeat", "1", "--output", output,
+                            "--baseline", baseline]) == 1
+    with open(output) as file:
+        assert all(comparison["regression"] for comparison in json.load(file)["comparison"])
@@ -0,0 +1,76 @@
+"""
+Tests of Qnet.clone and of the deep copies of Qnets and Qnodes
+"""
+
+import copy
+
+import pytest
+
+import QNET
+
+
+def small_qnet():
+    Q = QNET.Qnet()
+    Q.add_qnode(name="A", qnode_type="Ground", coords=[0, 0, 0], e=0.95)
+    Q.add_qnode(name="R", qnode_type="Swapper", coords=[100, 0, 0], swap_prob=0.8)
+    Q.add_qnode(name="B", qnode_type="Ground", coords=[200, 0, 0])
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[0, 0, 500], v_cart=[10, 0])
+    Q.add_qchan(edge=("A", "R"), e=0.9, f=0.95)
+    Q.add_qchan(edge=("R", "B"), e=0.8, f=0.97)
+    Q.add_qchan(edge=("R", "B"), e=0.85, f=0.9)
+    Q.add_qchan(edge=("S", "A"))
+    Q.add_qchan(edge=("S", "B"))
+    return Q
+
+
+def channels(Q):
+    return sorted((u.name, v.name, key, tuple(sorted(data.items()))) for u, v, key, data in Q.edges(keys=True, data=True))
+
+
+@pytest.mark.parametrize("clone", [lambda Q: Q.clone(), copy.deepcopy])
+def test_clone_is_identical(clone):
+    Q = small_qnet()
+    C = clone(Q)
+    assert type(C) is QNET.Qnet and C.version == Q.version
+    assert channels(C) == channels(Q)
+    for node in Q.nodes:
+        other = C.getNode(node.name)
+        assert other is not node and type(other) is type(node)
+        assert other.coords == node.coords and other.costs == node.costs and other.memory == node.memory
+    assert C.getNode("R").swap_prob == 0.8
+    for cost_type in ('e', 'f'):
+        assert QNET.best_path_cost(C, "A", "B", cost_type) == QNET.best_path_cost(Q, "A", "B", cost_type)
+    # Both directions of an edge share one key dictionary, as in networkx
+    a, r = C.getNode("A"), C.getNode("R")
+    assert C._adj[a][r] is C._adj[r][a]
+
+
+def test_clone_is_independent():
+    Q = small_qnet()
+    before = channels(Q)
+    C = Q.clone()
+    C.add_qchan(edge=("A", "R"), key=0, e=0.5, f=0.9)
+    C.getNode("A").costs['e'] = 0.1
+    C.getNode("B").coords[0] = 999
+    C.remove_qnode("S")
+    C.add_qchan(edge=("A", "B"), e=0.99, f=0.99)
+    C.update(5)
+    assert channels(Q) == before
+    assert Q.getNode("A").costs['e'] == 0.95
+    assert Q.getNode("B").coords[0] == 200
+    assert Q.getNode("S").coords == [0, 0, 500]
+    assert QNET.best_path_cost(Q, "A", "B", 'e') == pytest.approx(0.95 * 0.9 * 0.85)
+    assert [node.name for node in QNET.best_path(Q, "A", "B", 'e').node_array] == ["A", "R", "B"]
+    assert [node.name for node in QNET.best_path(C, "A", "B", 'e').node_array] == ["A", "B"]
+    # Changes to the clone do not enter the change log of the original
+    assert Q.version < C.version
+
+
+def test_deepcopy_of_a_node():
+    Q = small_qnet()
+    node = Q.getNode("S")
+    other = copy.deepcopy(node)
+    assert other.coords == node.coords and other.velocity == node.velocity
+    other.velocity[0] = 50
+    other.costs['e'] = 0.5
+    assert node.velocity == [10, 0] and node.costs['e'] != 0.5
@@ -0,0 +1,107 @@
+"""
+Tests of merging collector snapshots across processes, and of the counts of routing work
+"""
+
+import collections
+import multiprocessing
+import os
+
+import networkx as nx
+import pytest
+
+import QNET
+
+
+def record(collector, i):
+    collector.count("events", i)
+    collector.observe("sizes", i % 3)
+    with collector.timer("phase"):
+        pass
+
+
+def test_collector_merge():
+    workers = [QNET.Collector() for i in range(3)]
+    for i, worker in enumerate(workers):
+        for j in range(i + 1):
+            record(worker, i + 1)
+    snapshots = [worker.snapshot() for worker in workers]
+    for i, snapshot in enumerate(snapshots):
+        snapshot["processes"] = [10 ** 6 + i]
+
+    collector = QNET.Collector()
+    record(collector, 5)
+    local = collector.seconds["phase"]
+    for snapshot in snapshots:
+        collector.merge(snapshot)
+    assert collector.counts == {"events": 5 + 1 + 2 * 2 + 3 * 3}
+    assert collector.calls == {"phase": 1 + 1 + 2 + 3}
+    assert collector.seconds["phase"] == pytest.approx(local + sum(snapshot["seconds"]["phase"]
+                                                                   for snapshot in snapshots))
+    assert collector.histograms["sizes"] == collections.Counter({0: 3, 1: 1, 2: 3})
+    assert collector.snapshot()["processes"] == sorted([os.getpid()] + [10 ** 6 + i for i in range(3)])
+    assert collector.report()["processes"] == 4
+
+    # Merging does not change the snapshots, and merge_snapshots gives the same records
+    merged = QNET.merge_snapshots(snapshots)
+    assert merged["counts"] == {"events": 1 + 2 * 2 + 3 * 3}
+    assert merged["histograms"]["sizes"] == {2: 2, 1: 1, 0: 3}
+    assert snapshots[2]["counts"] == {"events": 9}
+
+
+def task(i):
+    with QNET.collecting() as collector:
+        record(collector, i)
+    return collector.snapshot()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs the fork start method")
+def test_collector_merge_processes():
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        snapshots = pool.map(task, range(1, 7))
+    collector = QNET.Collector()
+    for snapshot in snapshots:
+        collector.merge(snapshot)
+    assert collector.counts == {"events": sum(range(1, 7))}
+    assert collector.calls == {"phase": 6}
+    pids = {pid for snapshot in snapshots for pid in snapshot["processes"]}
+    assert os.getpid() not in pids
+    assert collector.snapshot()["processes"] == sorted(pids | {os.getpid()})
+
+
+@pytest.mark.parametrize("method", ["dijkstra", "astar", "bidirectional"])
+def test_search_counts(method):
+    Q = QNET.square_lattice(6, 6, 0.9, 0.95)
+    source, target = Q.getNode("(0, 0)"), Q.getNode("(5, 3)")
+
+    # The same search through networkx, with a weight function that counts its calls
+    calls = []
+    edge_weight = QNET.get_weight_function("add_e")
+
+    def weight(u, v, d):
+        calls.append(u)
+        return edge_weight(u, v, d)
+    if method == "dijkstra":
+        nx.single_source_dijkstra(Q, source, target, weight=weight)
+    elif method == "astar":
+        nx.astar_path(Q, source, target, QNET.get_heuristic(Q, target, "add_e"), weight)
+    else:
+        nx.bidirectional_dijkstra(Q, source, target, weight)
+
+    with QNET.collecting() as collector:
+        QNET.shortest_path(Q, source, target, "add_e", method)
+    assert collector.counts[f"searches ({method})"] == 1
+    assert collector.counts["edges relaxed"] == len(calls)
+    assert collector.histograms["edges relaxed per search"] == {len(calls): 1}
+    assert collector.histograms["nodes popped per search"] == {len(set(calls)): 1}
+
+
+def test_route_cache_counts():
+    Q = QNET.square_lattice(4, 4, 0.9, 0.95)
+    with QNET.collecting() as collector:
+        for i in range(3):
+            QNET.best_path_cost(Q, "(0, 0)", "(3, 3)", 'e')
+        QNET.best_path(Q, "(0, 0)", "(3, 3)", 'f')
+    counts = collector.counts
+    assert counts["best_path_cost calls"] == 3 and counts["best_path calls"] == 1
+    assert counts["route cache hits"] == 2 and counts["route cache misses"] == 2
+    assert counts["searches (dijkstra)"] == 2
@@ -0,0 +1,82 @@
+"""
+Tests of constrained_best_path against enumeration of every simple path
+"""
+
+import itertools
+import random
+
+import networkx as nx
+import pytest
+
+import QNET
+
+
+def random_qnet(n, m, seed):
+    """Connected random Qnet of n nodes and m channels, some of them parallel"""
+    rng = random.Random(seed)
+    G = nx.gnm_random_graph(n, m, seed=seed)
+    while not nx.is_connected(G):
+        seed += 1000
+        G = nx.gnm_random_graph(n, m, seed=seed)
+    Q = QNET.Qnet()
+    for u, v in list(G.edges) + rng.sample(list(G.edges), 3):
+        Q.add_qchan(edge=(str(u), str(v)), e=rng.uniform(0.6, 1.0), f=rng.uniform(0.75, 1.0))
+    return Q
+
+
+def all_paths(Q, source, target):
+    """Every simple path between two nodes, over every choice of parallel channels"""
+    for node_list in nx.all_simple_paths(nx.Graph(Q), source, target):
+        for keys in itertools.product(*[list(Q.adj[u][v]) for u, v in zip(node_list[:-1], node_list[1:])]):
+            yield QNET.Path(Q, node_list, list(keys))
+
+
+def test_fidelity_floor_changes_the_route():
+    Q = QNET.Qnet()
+    Q.add_qchan(edge=("A", "B"), e=0.9, f=0.7)
+    Q.add_qchan(edge=("A", "C"), e=0.8, f=0.95)
+    Q.add_qchan(edge=("C", "B"), e=0.8, f=0.95)
+
+    assert [node.name for node in QNET.constrained_best_path(Q, "A", "B", 'e', {}).node_array] == ["A", "B"]
+    path = QNET.constrained_best_path(Q, "A", "B", 'e', {'f': 0.85})
+    assert [node.name for node in path.node_array] == ["A", "C", "B"]
+    assert path.cost_vector['e'] == pytest.approx(0.64)
+    assert path.cost_vector['f'] == pytest.approx((1 + 0.9 ** 2) / 2)
+    with pytest.raises(nx.NetworkXNoPath):
+        QNET.constrained_best_path(Q, "A", "B", 'e', {'f': 0.95})
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("cost_type, bound_type", [('e', 'f'), ('f', 'e')])
+def test_matches_enumeration(seed, cost_type, bound_type):
+    Q = random_qnet(7, 12, seed)
+    source, target = Q.getNode("0"), Q.getNode("6")
+    paths = list(all_paths(Q, source, target))
+    values = sorted(path.cost_vector[bound_type] for path in paths)
+    for bound in [values[0], values[len(values) // 2], values[-2], values[-1], 1.0]:
+        limit = Q.conversions[bound_type][0](bound) + 1e-9
+        feasible = [path.cost_vector["add_" + cost_type] for path in paths
+                    if path.cost_vector["add_" + bound_type] <= limit]
+        if len(feasible) == 0:
+            with pytest.raises(nx.NetworkXNoPath):
+                QNET.constrained_best_path(Q, source, target, cost_type, {bound_type: bound})
+            continue
+        path = QNET.constrained_best_path(Q, source, target, cost_type, {bound_type: bound})
+        assert path.node_array[0] is source and path.node_array[-1] is target
+        assert path.cost_vector["add_" + bound_type] <= limit
+        assert path.cost_vector["add_" + cost_type] == pytest.approx(min(feasible))
+
+
+def test_unbounded_is_best_path():
+    Q = random_qnet(30, 60, seed=1)
+    for cost_type in ('e', 'f'):
+        path = QNET.constrained_best_path(Q, "0", "29", cost_type, {})
+        assert path.cost_vector[cost_type] == pytest.approx(QNET.best_path_cost(Q, "0", "29", cost_type))
+
+
+def test_invalid_cost_type():
+    Q = random_qnet(5, 6, seed=2)
+    with pytest.raises(AssertionError):
+        QNET.constrained_best_path(Q, "0", "4", 'x', {})
+    with pytest.raises(AssertionError):
+        QNET.constrained_best_path(Q, "0", "4", 'e', {'f': 0.2})
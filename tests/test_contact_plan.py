@@ -0,0 +1,107 @@
+"""
+Tests of ContactPlan against the visibility found by GroundIndex at sampled times
+"""
+
+import copy
+import random
+
+import pytest
+
+import QNET
+
+iss = ("1 25544U 98067A   20154.85125762  .00002004  00000-0  43906-4 0  9990",
+       "2 25544  51.6443  59.4222 0002071  22.0017  92.6243 15.49416742229799")
+
+
+def plane_qnet(seed):
+    rng = random.Random(seed)
+    Q = QNET.Qnet()
+    for i in range(100):
+        Q.add_qnode(name=f"G{i}", qnode_type="Ground", coords=[rng.uniform(-1000, 1000), rng.uniform(-1000, 1000), 0])
+    Q.add_qnode(name="S1", qnode_type="Satellite", coords=[-1500, -200, 400], v_cart=[20, 3])
+    Q.add_qnode(name="S2", qnode_type="Satellite", coords=[300, 1200, 300], v_cart=[-4, -15])
+    Q.add_qnode(name="S3", qnode_type="Satellite", coords=[0, 0, 500], v_cart=[0, 0])
+    return Q
+
+
+def near_a_window_edge(plan, t, tolerance):
+    return any(abs(t - start) < tolerance or abs(t - end) < tolerance for start, peak, end, pair in plan.contacts)
+
+
+@pytest.mark.parametrize("min_elevation", [0, 20, 60])
+def test_in_contact_agrees_with_visible_cartesian(min_elevation):
+    Q = plane_qnet(min_elevation)
+    plan = QNET.ContactPlan(Q, 150, min_elevation)
+    satellites = [Q.getNode(name) for name in ("S1", "S2", "S3")]
+    index = QNET.GroundIndex(Q)
+    rng = random.Random(0)
+    for t in sorted(rng.uniform(0, 150) for i in range(40)):
+        Q.set_time(t)
+        contacts = plan.contacts_at(t)
+        for S in satellites:
+            visible = set(index.visible_cartesian(S, min_elevation))
+            assert {node for node in index.nodes if plan.in_contact(S, node, t)} == visible
+            assert contacts.get(S, set()) == visible
+    assert len(plan.contacts) > 0
+
+
+def test_in_contact_agrees_with_visible_geodesic():
+    rng = random.Random(1)
+    Q = QNET.Qnet()
+    nodes = [QNET.Ground(Q, name=f"G{i}", coords=[rng.uniform(-50, 50), rng.uniform(-180, 180), 0])
+             for i in range(40)]
+    Q.add_nodes_from(nodes)
+    S = QNET.Satellite(Q, name="ISS", line1=iss[0], line2=iss[1], cartesian=False)
+    Q.add_node(S)
+    plan = QNET.ContactPlan(Q, 6000, min_elevation=10)
+    index = QNET.GroundIndex(Q)
+    assert len(plan.contacts) > 0
+    checked = 0
+    for t in [rng.uniform(0, 6000) for i in range(60)] + [peak for start, peak, end, pair in plan.contacts]:
+        # find_events locates rises and sets to within about a second
+        if near_a_window_edge(plan, t, 2):
+            continue
+        S.set_time(t)
+        assert {node for node in nodes if plan.in_contact(S, node, t)} == set(index.visible_geodesic(S, 10))
+        checked += 1
+    assert checked > 40
+
+
+def test_windows_of_a_cartesian_pass():
+    Q = QNET.Qnet()
+    Q.add_qnode(name="G", qnode_type="Ground", coords=[0, 0, 0])
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[-1000, 0, 100], v_cart=[10, 0])
+    plan = QNET.ContactPlan(Q, 300, min_elevation=45)
+    # The satellite is at 45 degrees 100 km either side of the node
+    (start, peak, end), = plan.windows[(Q.getNode("S"), Q.getNode("G"))]
+    assert (start, peak, end) == pytest.approx((90, 100, 110))
+    assert plan.events() == [(start, 'rise', Q.getNode("S"), Q.getNode("G")),
+                             (end, 'set', Q.getNode("S"), Q.getNode("G"))]
+    assert plan.next_event(0) == start and plan.next_event(start) == end and plan.next_event(end) is None
+    assert plan.overlapping(0, 89) == [] and len(plan.overlapping(80, 95)) == 1 and plan.active(111) == []
+    assert plan.contacts_at(-1) is None and plan.contacts_at(301) is None
+
+
+def test_overlapping_matches_the_windows():
+    Q = plane_qnet(5)
+    plan = QNET.ContactPlan(Q, 150, 20)
+    rng = random.Random(5)
+    for i in range(30):
+        t0 = rng.uniform(0, 150)
+        t1 = t0 + rng.uniform(0, 30)
+        want = {pair for pair, windows in plan.windows.items()
+                if any(start <= t1 and end >= t0 for start, peak, end in windows)}
+        assert set(plan.overlapping(t0, t1)) == want
+
+
+def test_enable_visibility_with_a_plan():
+    Q = plane_qnet(6)
+    R = copy.deepcopy(Q)
+    Q.enable_visibility(20, plan=QNET.ContactPlan(Q, 100, 20))
+    R.enable_visibility(20)
+    for step in range(15):
+        # The last steps are past the end of the plan, where the index takes over
+        Q.update(8)
+        R.update(8)
+        channels = sorted((u.name, v.name) for u, v in Q.edges())
+        assert channels == sorted((u.name, v.name) for u, v in R.edges())
@@ -0,0 +1,133 @@
+"""
+Tests of disjoint_paths against brute force, and of the path methods of the purification entry points
+"""
+
+import itertools
+import random
+
+import networkx as nx
+import pytest
+
+import QNET
+
+methods = ["greedy", "edge_disjoint", "node_disjoint", "total_disjoint"]
+
+
+def random_lattice(m, n, seed, parallel=3):
+    """
+    Returns an m x n square lattice with random channel costs, and a few parallel channels
+    """
+    rng = random.Random(seed)
+    Q = QNET.square_lattice(m, n, 0.9, 0.9)
+    edges = list(Q.edges(keys=True))
+    for u, v, key in edges:
+        Q.add_qchan(edge=(u.name, v.name), key=key, e=rng.uniform(0.7, 1), f=rng.uniform(0.75, 1))
+    for u, v, key in rng.sample(edges, parallel):
+        Q.add_qchan(edge=(u.name, v.name), e=rng.uniform(0.7, 1), f=rng.uniform(0.75, 1))
+    return Q
+
+
+def channels_of(path):
+    return {(frozenset((u, v)), key) for u, v, key in zip(path.node_array, path.node_array[1:], path.edge_keys)}
+
+
+def brute_force_cost(Q, head, tail, k, method):
+    """
+    Least total additive fidelity of k disjoint paths, by trying every combination of simple paths
+    """
+    candidates = []
+    for nodes in nx.all_simple_paths(nx.Graph(Q), head, tail):
+        for keys in itertools.product(*[list(Q.adj[u][v]) for u, v in zip(nodes, nodes[1:])]):
+            path = QNET.Path(Q, nodes, list(keys))
+            candidates.append((path.cost_vector['add_f'], set(nodes[1:-1]), channels_of(path)))
+    best = None
+    for combination in itertools.combinations(candidates, k):
+        if all(not (x[2] & y[2]) and (method == 'edge_disjoint' or not (x[1] & y[1]))
+               for x, y in itertools.combinations(combination, 2)):
+            cost = sum(x[0] for x in combination)
+            best = cost if best is None else min(best, cost)
+    return best
+
+
+@pytest.mark.parametrize("method", ["edge_disjoint", "node_disjoint", "total_disjoint"])
+@pytest.mark.parametrize("seed", range(6))
+def test_disjoint_paths(seed, method):
+    Q = random_lattice(3, 3, seed)
+    head, tail = Q.getNode("(0, 0)"), Q.getNode("(2, 2)")
+    for k in (1, 2, 3):
+        paths = QNET.disjoint_paths(Q, head, tail, k, 'f', method)
+        want = brute_force_cost(Q, head, tail, k, method)
+        if want is None:
+            assert len(paths) < k
+            continue
+        assert len(paths) == k
+        assert sum(path.cost_vector['add_f'] for path in paths) == pytest.approx(want)
+        assert [path.cost_vector['add_f'] for path in paths] == sorted(path.cost_vector['add_f'] for path in paths)
+        assert all(path.node_array[0] is head and path.node_array[-1] is tail for path in paths)
+        channels = [channel for path in paths for channel in channels_of(path)]
+        assert len(channels) == len(set(channels))
+        if method != 'edge_disjoint':
+            inner = [node for path in paths for node in path.node_array[1:-1]]
+            assert len(inner) == len(set(inner))
+
+
+def test_disjoint_paths_max_flow():
+    # Without a k, as many paths are found as the connectivity of head and tail
+    Q = random_lattice(5, 5, seed=0, parallel=0)
+    for method, connectivity in [("edge_disjoint", nx.edge_connectivity), ("node_disjoint", nx.node_connectivity)]:
+        for head, tail in [("(1, 1)", "(3, 3)"), ("(0, 0)", "(4, 2)")]:
+            paths = QNET.disjoint_paths(Q, head, tail, None, 'f', method)
+            assert len(paths) == connectivity(nx.Graph(Q), Q.getNode(head), Q.getNode(tail))
+
+
+@pytest.mark.parametrize("method", ["edge_disjoint", "node_disjoint"])
+def test_disjoint_paths_nested(method):
+    Q = random_lattice(5, 5, seed=3)
+    path_sets = QNET.disjoint_paths(Q, "(1, 1)", "(3, 3)", None, 'f', method, nested=True)
+    assert [len(paths) for paths in path_sets] == list(range(1, len(path_sets) + 1))
+    for n, paths in enumerate(path_sets, 1):
+        direct = QNET.disjoint_paths(Q, "(1, 1)", "(3, 3)", n, 'f', method)
+        assert sum(path.cost_vector['add_f'] for path in paths) == \
+            pytest.approx(sum(path.cost_vector['add_f'] for path in direct))
+
+
+@pytest.mark.parametrize("method", methods)
+@pytest.mark.parametrize("seed", range(4))
+def test_entry_points_purify_the_same_paths(seed, method):
+    Q = random_lattice(4, 4, seed)
+    head, tail = "(0, 1)", "(3, 2)"
+    paths = QNET.candidate_paths(Q, head, tail, 'f', None, method)
+    fidelity = QNET.purify_fidelity([path.cost_vector['f'] for path in paths])
+
+    assert QNET.purify(Q, head, tail, method) == pytest.approx(fidelity)
+    assert QNET.simple_purify(Q, head, tail, method=method)['f'] == pytest.approx(fidelity)
+    # purify_reduce removes the channels of the paths that it purifies
+    R = QNET.purify_reduce(Q, head, tail, method=method)
+    channels = {(frozenset((u.name, v.name)), key) for u, v, key in Q.edges(keys=True)}
+    remaining = {(frozenset((u.name, v.name)), key) for u, v, key in R.edges(keys=True)}
+    purified = {(frozenset(node.name for node in ends), key) for path in paths for ends, key in channels_of(path)}
+    assert channels - remaining == purified
+    new, = remaining - channels
+    assert R.adj[R.getNode(head)][R.getNode(tail)][new[1]]['f'] == pytest.approx(fidelity)
+
+
+def test_purify_default_method():
+    Q = random_lattice(4, 4, seed=1)
+    head, tail = "(0, 1)", "(3, 2)"
+    assert QNET.purify(Q, head, tail) == QNET.purify(Q, head, tail, 'node_disjoint')
+    assert QNET.simple_purify(Q, head, tail) == QNET.simple_purify(Q, head, tail, method='greedy')
+    with pytest.raises(ValueError):
+        QNET.purify(Q, head, tail, 'all')
+
+
+def test_simple_purify_efficiency():
+    # Weakest efficiency times prob**(2n - 1), as before the purification kernels
+    Q = QNET.Qnet()
+    for node, e, f in [("B", 0.6, 0.8), ("C", 0.8, 0.85), ("D", 0.9, 0.95)]:
+        Q.add_qchan(edge=("A", node), e=1, f=1)
+        Q.add_qchan(edge=(node, "E"), e=e, f=f)
+    assert QNET.simple_purify(Q, "A", "E")['e'] == pytest.approx(0.6 * 0.5 ** 5)
+    assert QNET.simple_purify(Q, "A", "E", threshold=1)['e'] == pytest.approx(0.8 * 0.5 ** 3)
+    assert QNET.simple_purify(Q, "A", "E", threshold=1, prob=0.8)['e'] == pytest.approx(0.8 * 0.8 ** 3)
+    R = QNET.purify_reduce(Q, "A", "E")
+    assert R.adj[R.getNode("A")][R.getNode("E")][0]['e'] == pytest.approx(0.6 * 0.5 ** 4)
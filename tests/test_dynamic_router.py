@@ -0,0 +1,117 @@
+"""
+Tests of DynamicRouter against networkx Dijkstra as the graph changes
+"""
+
+import random
+
+import networkx as nx
+import pytest
+
+import QNET
+
+
+def ring_with_chords(n, chords, seed):
+    """A ring of n nodes with random chords, so that routes change as costs do"""
+    rng = random.Random(seed)
+    Q = QNET.Qnet()
+    for i in range(n):
+        Q.add_qchan(edge=(str(i), str((i + 1) % n)), e=rng.uniform(0.6, 1.0), f=rng.uniform(0.75, 1.0))
+    for i in range(chords):
+        u, v = rng.sample(range(n), 2)
+        Q.add_qchan(edge=(str(u), str(v)), e=rng.uniform(0.3, 1.0), f=rng.uniform(0.75, 1.0))
+    return Q
+
+
+def distances(Q, source, cost_type):
+    lengths = nx.single_source_dijkstra_path_length(Q, source, weight=QNET.get_weight_function("add_" + cost_type))
+    return {node: Q.conversions[cost_type][1](length) for node, length in lengths.items()}
+
+
+def assert_router_is_exact(router):
+    Q = router.Q
+    want = distances(Q, router.source, router.cost_type)
+    for node in Q.nodes:
+        if node in want:
+            assert router.cost(node) == pytest.approx(want[node])
+            path = router.path(node)
+            assert path.node_array[0] is router.source and path.node_array[-1] is node
+            assert path.cost_vector[router.cost_type] == pytest.approx(want[node])
+        else:
+            with pytest.raises(nx.NetworkXNoPath):
+                router.cost(node)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("cost_type", ['e', 'f'])
+def test_repair_after_random_changes(seed, cost_type):
+    rng = random.Random(seed)
+    Q = ring_with_chords(20, 10, seed)
+    router = QNET.DynamicRouter(Q, "0", cost_type)
+    removed = []
+    for step in range(80):
+        kind = rng.choice(["worse", "better", "add", "remove edge", "remove node", "restore node"])
+        edges = list(Q.edges(keys=True))
+        if kind in ("worse", "better") and edges:
+            u, v, key = rng.choice(edges)
+            data = Q.adj[u][v][key]
+            scale = 0.8 if kind == "worse" else 1.2
+            Q.add_qchan(edge=(u.name, v.name), key=key, e=min(data['e'] * scale, 1),
+                        f=min(max(0.5 + (data['f'] - 0.5) * scale, 0.5), 1))
+        elif kind == "add":
+            u, v = rng.sample(list(Q.nodes), 2)
+            Q.add_qchan(edge=(u.name, v.name), e=rng.uniform(0.3, 1.0), f=rng.uniform(0.75, 1.0))
+        elif kind == "remove edge" and edges:
+            Q.remove_edge(*rng.choice(edges))
+        elif kind == "remove node":
+            node = rng.choice([node for node in Q.nodes if node.name != "0"])
+            removed.append((node, [(v.name, dict(data)) for v, keydict in Q.adj[node].items()
+                                   for data in keydict.values()]))
+            Q.remove_qnode(node)
+        elif kind == "restore node" and removed:
+            node, channels = removed.pop(rng.randrange(len(removed)))
+            Q.add_node(node)
+            for name, data in channels:
+                if Q.getNode(name) is not None:
+                    Q.add_qchan(edge=(node.name, name), e=data['e'], f=data['f'])
+        assert_router_is_exact(router)
+
+
+def test_rebuild_after_the_change_log_overflows():
+    Q = ring_with_chords(12, 4, seed=1)
+    router = QNET.DynamicRouter(Q, "0", 'f')
+    rng = random.Random(1)
+    for i in range(Q.changes.maxlen + 10):
+        u, v, key = rng.choice(list(Q.edges(keys=True)))
+        Q.add_qchan(edge=(u.name, v.name), key=key, e=0.9, f=rng.uniform(0.75, 1.0))
+    assert_router_is_exact(router)
+
+
+def test_source_removed_and_restored():
+    Q = ring_with_chords(8, 0, seed=2)
+    router = QNET.DynamicRouter(Q, "0", 'e')
+    source = router.source
+    channels = [(v.name, dict(data)) for v, keydict in Q.adj[source].items() for data in keydict.values()]
+    Q.remove_qnode(source)
+    with pytest.raises(nx.NetworkXNoPath):
+        router.cost("1")
+    Q.add_node(source)
+    for name, data in channels:
+        Q.add_qchan(edge=(source.name, name), e=data['e'], f=data['f'])
+    assert_router_is_exact(router)
+
+
+def test_sim_optimal_cost_dynamic_matches_static():
+    Q = QNET.Qnet()
+    for i in range(4):
+        Q.add_qnode(name=f"G{i}", qnode_type="Ground", coords=(100 * i, 0, 0))
+    for i in range(3):
+        Q.add_qchan(edge=(f"G{i}", f"G{i + 1}"), e=0.08, f=0.9)
+    # The route goes through the satellite while it passes over the ground nodes
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=(-200, 0, 500), v_cart=[40, 0])
+    for i in range(4):
+        Q.add_qchan(edge=("S", f"G{i}"))
+    static = QNET.sim_optimal_cost(Q, "G0", "G3", 'e', 20, 1)
+    dynamic = QNET.sim_optimal_cost(Q, "G0", "G3", 'e', 20, 1, dynamic=True)
+    assert dynamic == pytest.approx(static)
+    assert static[-1] == pytest.approx(0.08 ** 3)
+    assert max(static) > 3 * 0.08 ** 3
@@ -0,0 +1,92 @@
+"""
+Tests of Collector and of the instrumentation of QNET while it is enabled and disabled
+"""
+
+import collections
+import contextlib
+import io
+import random
+import threading
+
+import pytest
+
+import QNET
+
+
+def record(collector, i):
+    collector.count("events", i)
+    collector.observe("sizes", i % 3)
+    with collector.timer("phase"):
+        pass
+
+
+def test_collector_threads():
+    collector = QNET.Collector()
+    threads = [threading.Thread(target=lambda i=i: [record(collector, i) for j in range(100)]) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert collector.counts == {"events": 100 * sum(range(8))}
+    assert collector.calls == {"phase": 800}
+    assert collector.histograms["sizes"] == collections.Counter({0: 300, 1: 300, 2: 200})
+    assert len(collector.shards) == 8
+    report = collector.report()
+    assert report["processes"] == 1 and report["histograms"]["sizes"]["n"] == 800
+    frame = collector.to_dataframe()
+    assert frame.loc["phase", "calls"] == 800 and frame.loc["events", "kind"] == "count"
+    collector.reset()
+    assert collector.counts == {} and collector.calls == {}
+
+
+def test_collecting_is_nested():
+    assert QNET.get_collector() is None
+    assert QNET.collector_timer("phase") is QNET.null_timer
+    outer = QNET.Collector()
+    with QNET.collecting(outer):
+        with QNET.collecting() as inner:
+            assert QNET.get_collector() is inner
+            QNET.collector_count("events")
+        assert QNET.get_collector() is outer
+        with pytest.raises(ValueError):
+            with QNET.collecting():
+                raise ValueError
+        assert QNET.get_collector() is outer
+    assert QNET.get_collector() is None
+    assert inner.counts == {"events": 1} and outer.counts == {}
+
+
+def test_counts_only_while_collecting():
+    Q = QNET.Qnet()
+    Q.add_qchan(edge=("A", "B"), e=0.9, f=0.9)
+    with QNET.collecting() as collector:
+        Q.getNode("A")
+        Q.subgraph(list(Q.nodes)).getNode("B")
+        QNET.make_cost_vector(Q, e=0.5)
+        QNET.to_log(0.5)
+        QNET.from_add_f(0.1)
+    counts = collector.counts
+    assert counts["getNode calls"] == 2 and counts["getNode scans"] == 1
+    assert counts["make_cost_vector calls"] == 1
+    # make_cost_vector converts every cost of the vector
+    assert counts["conversions (to_log)"] == 2 and counts["conversions (to_add_f)"] == 1
+    assert counts["conversions (from_add_f)"] == 1
+
+    # Nothing is recorded once the collector is no longer active
+    Q.getNode("A")
+    QNET.to_log(0.5)
+    assert collector.counts == counts
+
+
+def test_monte_method_phases():
+    Q = QNET.multidim_lattice(2, 4, 0.99, 0.99)
+    pair_method = QNET.get_diagonal_pair_method(2, 4, Q)
+    random.seed(0)
+    with QNET.collecting() as collector, contextlib.redirect_stdout(io.StringIO()):
+        QNET.monte_method(Q, pair_method, QNET.purify_reduce, QNET.data_method, 3, 2)
+    calls = collector.calls
+    assert calls["monte_method"] == 1 and calls["generate_graphs"] == 2
+    assert calls["percolate"] == calls["percolate: deepcopy"] == 6
+    assert collector.counts["samples"] == 6
+    assert calls["reduce_graph: has_path"] == 6
+    assert calls["reduce_graph: reduction_method"] == 6 - collector.counts.get("samples discarded (disconnected)", 0)
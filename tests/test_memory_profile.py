@@ -0,0 +1,88 @@
+"""
+Tests of memory_report, deep_sizeof and the memory scaling model of MemoryProfile.py
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import QNET
+
+iss = ("1 25544U 98067A   20154.85125762  .00002004  00000-0  43906-4 0  9990",
+       "2 25544  51.6443  59.4222 0002071  22.0017  92.6243 15.49416742229799")
+
+components = ["adjacency", "edge costs", "node costs", "coords", "skyfield", "nodes", "name index", "change log",
+              "other"]
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    shared = list(range(1000))
+    seen = set()
+    container = {"a": shared, "b": shared}
+    first = QNET.deep_sizeof(container, seen)
+    assert first == QNET.deep_sizeof(shared, set()) + sys.getsizeof(container) + sys.getsizeof("a") + \
+        sys.getsizeof("b")
+    # Everything counted is remembered
+    assert QNET.deep_sizeof(shared, seen) == 0
+
+    array = np.zeros(10000)
+    assert QNET.deep_sizeof([array[:10], array[10:]], set()) == pytest.approx(
+        sys.getsizeof([1, 2]) + 2 * sys.getsizeof(array[:10]) + sys.getsizeof(array))
+
+
+def test_memory_report():
+    Q = QNET.square_lattice(10, 10, 0.9, 0.9)
+    report = Q.memory_report()
+    assert list(report) == components + ["total"]
+    assert report["total"] == sum(report[name] for name in components)
+    assert all(report[name] > 0 for name in components if name != "skyfield")
+    assert report["skyfield"] == 0
+    assert QNET.memory_report(Q) == report
+
+    # The graph components grow with the graph
+    R = QNET.square_lattice(20, 20, 0.9, 0.9)
+    bigger = R.memory_report()
+    for name in ["adjacency", "edge costs", "node costs", "coords", "nodes", "name index"]:
+        assert 3 < bigger[name] / report[name] < 5
+
+
+def test_memory_report_matches_tracemalloc():
+    Q, peak, retained = QNET.measure_peak(QNET.square_lattice, 15, 15, 0.9, 0.9)
+    total = QNET.memory_report(Q)["total"]
+    assert peak >= retained
+    assert 0.5 < total / retained < 2
+
+
+def test_shared_skyfield_objects_are_counted_once():
+    def skyfield_bytes(n):
+        Q = QNET.Qnet()
+        for i in range(n):
+            Q.add_node(QNET.Satellite(Q, name=f"S{i}", line1=iss[0], line2=iss[1], cartesian=False))
+        return QNET.memory_report(Q)["skyfield"]
+    one, two = skyfield_bytes(1), skyfield_bytes(2)
+    # The timescale and the parsed satellite are shared, so only the times of the second satellite are added
+    assert one > 0 and two - one < one / 10
+
+
+def test_fit_memory_model():
+    nodes = np.array([100, 400, 1600, 100, 400, 1600])
+    edges = np.array([180, 760, 3120, 261, 1141, 4761])
+    df = pd.DataFrame({"nodes": nodes, "edges": edges, "retained": 5000 + 300 * nodes + 700 * edges})
+    model = QNET.fit_memory_model(df)
+    assert model == pytest.approx({"base": 5000, "per_node": 300, "per_edge": 700})
+    assert QNET.predict_memory(model, 10 ** 6, 2 * 10 ** 6) == pytest.approx(5000 + 300 * 10 ** 6 + 1400 * 10 ** 6)
+
+
+def test_profile_memory():
+    df = QNET.profile_memory(sizes=[4, 6, 8])
+    assert list(df["builder"]) == ["square_lattice"] * 3 + ["triangular_lattice"] * 3
+    assert list(df["nodes"][:3]) == [16, 36, 64]
+    assert (df["retained"] > 0).all() and (df["peak"] >= df["retained"]).all()
+    assert (df["peak (purify_reduce)"] > 0).all() and (df["peak (swap_reduce)"] > 0).all()
+    model = QNET.fit_memory_model(df)
+    assert model["per_node"] > 0 and model["per_edge"] > 0
+    # The model predicts the graphs it was fitted on closely
+    predicted = QNET.predict_memory(model, df["nodes"], df["edges"])
+    assert np.allclose(predicted, df["retained"], rtol=0.25)
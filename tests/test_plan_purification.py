@@ -0,0 +1,123 @@
+"""
+Tests of plan_purification against the purification reductions and against brute force over the candidate paths
+"""
+
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+import QNET
+
+
+def costed_lattice(m, n, seed):
+    """
+    Returns an m x n square lattice whose channels have random efficiencies and fidelities
+    """
+    rng = random.Random(seed)
+    Q = QNET.square_lattice(m, n, 0.9, 0.9)
+    for u, v, key in list(Q.edges(keys=True)):
+        Q.add_qchan(edge=(u.name, v.name), key=key, e=rng.uniform(0.6, 1), f=rng.uniform(0.7, 1))
+    return Q
+
+
+def only(n):
+    """
+    Objective that only allows choices of n paths
+    """
+    return lambda f, e: np.where(np.arange(len(f)) == n - 1, f, np.nan)
+
+
+@pytest.mark.parametrize("method", ["greedy", "edge_disjoint", "node_disjoint"])
+@pytest.mark.parametrize("seed", range(3))
+def test_plan_matches_reductions(seed, method):
+    Q = costed_lattice(5, 5, seed)
+    head, tail = "(1, 1)", "(3, 3)"
+    for n in range(2, 5):
+        plan = QNET.plan_purification(Q, head, tail, objective=only(n), method=method)
+        assert plan['n'] == n and len(plan['paths']) == n
+        R = QNET.purify_reduce(Q, head, tail, threshold=n - 1, method=method)
+        purified = list(R.adj[R.getNode(head)][R.getNode(tail)].values())[-1]
+        assert plan['cost_vector']['f'] == pytest.approx(purified['f'], rel=1e-12)
+        assert plan['cost_vector']['e'] == pytest.approx(purified['e'], rel=1e-12)
+        simple = QNET.simple_purify(Q, head, tail, threshold=n - 1, method=method)
+        assert plan['cost_vector']['f'] == pytest.approx(simple['f'], rel=1e-12)
+        # simple_purify counts one Bell projection more than purify_reduce
+        assert plan['cost_vector']['e'] * 0.5 == pytest.approx(simple['e'], rel=1e-12)
+
+
+@pytest.mark.parametrize("method", ["edge_disjoint", "node_disjoint"])
+def test_plan_scores_the_nested_sets(method):
+    Q = costed_lattice(5, 5, seed=7)
+    head, tail = "(1, 1)", "(3, 3)"
+    path_sets = QNET.disjoint_paths(Q, head, tail, None, 'f', method, nested=True)
+    plan = QNET.plan_purification(Q, head, tail, objective='f', method=method)
+    table = plan['table']
+    assert list(table['n']) == [len(paths) for paths in path_sets]
+    for row, paths in zip(table.itertuples(), path_sets):
+        chosen = [plan['candidates'][i] for i in row.paths]
+        assert sorted(str(p) for p in chosen) == sorted(str(p) for p in paths)
+        assert row.f == pytest.approx(QNET.purify_fidelity([path.cost_vector['f'] for path in paths]))
+    # The candidates are the paths of all the sets, each once
+    labels = {(tuple(p.node_array), tuple(p.edge_keys)) for paths in path_sets for p in paths}
+    assert len(plan['candidates']) == len(labels)
+    assert plan['cost_vector']['f'] == pytest.approx(table['f'].max())
+    assert plan['n'] == int(np.argmax(table['f'])) + 1
+
+
+def brute_force(candidates, score, min_e=None, min_f=None, prob=0.5):
+    """
+    Best score over every subset of the candidate paths
+    """
+    best = None
+    for r in range(1, len(candidates) + 1):
+        for subset in itertools.combinations(candidates, r):
+            f = QNET.purify_fidelity([path.cost_vector['f'] for path in subset])
+            e = QNET.purify_efficiency([path.cost_vector['e'] for path in subset], prob)
+            if (min_e is not None and e < min_e) or (min_f is not None and f < min_f):
+                continue
+            value = score(f, e)
+            best = value if best is None else max(best, value)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_plan_subsets(seed):
+    Q = costed_lattice(5, 5, seed)
+    head, tail = "(1, 1)", "(3, 3)"
+
+    def score(f, e):
+        return e * (2 * f - 1)
+    plan = QNET.plan_purification(Q, head, tail, objective=score, subsets=True, max_paths=4, prob=0.8)
+    candidates = plan['candidates']
+    assert len(candidates) == 4 and len(plan['table']) == 2 ** 4 - 1
+    assert plan['score'] == pytest.approx(brute_force(candidates, score, prob=0.8))
+    chosen = plan['paths']
+    assert plan['score'] == pytest.approx(score(QNET.purify_fidelity([path.cost_vector['f'] for path in chosen]),
+                                                QNET.purify_efficiency([path.cost_vector['e'] for path in chosen],
+                                                                       0.8)))
+
+    # With constraints
+    plan = QNET.plan_purification(Q, head, tail, objective='f', min_e=0.05, subsets=True, max_paths=4)
+    assert plan['score'] == pytest.approx(brute_force(candidates, lambda f, e: f, min_e=0.05))
+    assert plan['cost_vector']['e'] >= 0.05
+    assert QNET.plan_purification(Q, head, tail, min_e=1.01, subsets=True, max_paths=4) is None
+
+
+def test_plan_prefixes():
+    Q = costed_lattice(4, 4, seed=4)
+    head, tail = "(0, 0)", "(3, 3)"
+    paths = QNET.candidate_paths(Q, head, tail, 'f', 4, 'greedy')
+    plan = QNET.plan_purification(Q, head, tail, objective='e', paths=paths)
+    # Every extra path costs efficiency, so one path is the most efficient
+    assert plan['n'] == 1 and plan['indices'] == [0]
+    assert list(plan['table']['paths']) == [tuple(range(k)) for k in range(1, len(paths) + 1)]
+
+    # The most efficient choice that is at least as good as the best fidelity of all
+    f = [QNET.purify_fidelity([path.cost_vector['f'] for path in paths[:k]]) for k in range(1, len(paths) + 1)]
+    plan = QNET.plan_purification(Q, head, tail, objective='e', min_f=max(f), paths=paths)
+    assert plan['n'] == int(np.argmax(f)) + 1 > 1
+    assert plan['cost_vector'] == pytest.approx({'e': QNET.purify_efficiency(
+        [path.cost_vector['e'] for path in plan['paths']]), 'f': max(f)})
+    assert QNET.plan_purification(Q, head, tail, paths=[]) is None
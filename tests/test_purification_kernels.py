@@ -0,0 +1,108 @@
+"""
+Tests of the purification kernels of Purification.py, and of the reductions that call them against hand-computed
+values of the pairwise fold that they replaced
+"""
+
+import functools
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+import QNET
+
+
+def fold(f):
+    return functools.reduce(QNET.fidTransform, f)
+
+
+def test_purify_fidelity_matches_fold():
+    rng = random.Random(0)
+    for n in range(1, 8):
+        f = [rng.uniform(0.5, 1) for i in range(n)]
+        assert QNET.purify_fidelity(f) == pytest.approx(fold(f), rel=1e-14)
+        # In any order
+        for order in itertools.islice(itertools.permutations(f), 10):
+            assert QNET.purify_fidelity(list(order)) == pytest.approx(fold(f), rel=1e-14)
+    assert QNET.purify_fidelity([0.9, 0.8, 0.7]) == pytest.approx(0.504 / (0.504 + 0.006), rel=1e-15)
+
+
+def test_purify_fidelity_batches():
+    rng = np.random.default_rng(1)
+    f = rng.uniform(0.5, 1, (4, 3, 5))
+    purified = QNET.purify_fidelity(f)
+    assert purified.shape == (4, 3)
+    for i, j in itertools.product(range(4), range(3)):
+        assert purified[i, j] == pytest.approx(fold(f[i, j]), rel=1e-14)
+    np.testing.assert_allclose(QNET.purify_fidelity(f, axis=1), QNET.purify_fidelity(np.swapaxes(f, 1, 2)))
+
+    # nan pads sets of fewer paths, and a fidelity of 0.5 changes nothing
+    padded = QNET.pad_path_sets([[0.9, 0.8], [0.95, 0.7, 0.6], []])
+    assert padded.shape == (3, 3) and np.isnan(padded[0, 2]) and np.isnan(padded[2]).all()
+    purified = QNET.purify_fidelity(padded)
+    assert purified[:2] == pytest.approx([fold([0.9, 0.8]), fold([0.95, 0.7, 0.6])], rel=1e-14)
+    assert np.isnan(purified[2])
+    assert QNET.purify_fidelity([0.9, 0.8, 0.5]) == pytest.approx(fold([0.9, 0.8]), rel=1e-14)
+    assert QNET.purify_fidelity([0.9]) == pytest.approx(0.9)
+    assert np.isnan(QNET.purify_fidelity([0.0, 1.0]))
+
+
+def test_purify_fidelity_does_not_underflow():
+    # The products of 2000 fidelities underflow, but their log odds do not
+    assert QNET.purify_fidelity(np.full(2000, 0.6)) == 1
+    assert QNET.purify_fidelity(np.full(2000, 0.4)) == pytest.approx(0, abs=1e-300)
+    assert QNET.purify_fidelity(np.full(2000, 0.4)) >= 0
+    f = np.array([0.6] * 1000 + [0.4] * 999)
+    assert QNET.purify_fidelity(f) == pytest.approx(0.6)
+
+
+def test_prefix_kernels():
+    rng = np.random.default_rng(2)
+    f = rng.uniform(0.5, 1, (6, 7))
+    e = rng.uniform(0.1, 1, (6, 7))
+    f[0, 3] = e[0, 3] = np.nan
+    pur_f = QNET.purify_fidelity_prefix(f)
+    pur_e = QNET.purify_efficiency_prefix(e, 0.7)
+    for k in range(7):
+        np.testing.assert_allclose(pur_f[:, k], QNET.purify_fidelity(f[:, :k + 1]), rtol=1e-14)
+        np.testing.assert_allclose(pur_e[:, k], QNET.purify_efficiency(e[:, :k + 1], 0.7), rtol=1e-14)
+    np.testing.assert_allclose(QNET.purify_fidelity_prefix(f.T, axis=0), pur_f.T)
+    assert np.isnan(QNET.purify_fidelity_prefix([np.nan, 0.9])[0])
+
+
+def test_purify_efficiency():
+    assert QNET.projection_loss(1) == 1 and QNET.projection_loss(3, 0.8) == pytest.approx(0.8 ** 4)
+    assert QNET.purify_efficiency([0.9, 0.6, 0.8]) == pytest.approx(0.6 * 0.5 ** 4)
+    assert QNET.purify_efficiency([0.9, np.nan, 0.8], 0.8) == pytest.approx(0.8 * 0.8 ** 2)
+    assert QNET.purify_efficiency([[0.9], [0.7]]).tolist() == [0.9, 0.7]
+    assert np.isnan(QNET.purify_efficiency([np.nan, np.nan]))
+    costs = QNET.purify_costs([[0.9, 0.8], [0.7, np.nan]], [[0.5, 0.6], [0.4, np.nan]])
+    assert costs['f'] == pytest.approx([fold([0.9, 0.8]), 0.7])
+    assert costs['e'] == pytest.approx([0.5 * 0.25, 0.4])
+
+
+def three_paths():
+    """
+    Returns a Qnet with three paths from A to E, through B, C and D, of fidelities 0.8, 0.85 and 0.95, and
+    efficiencies 0.6, 0.8 and 0.9
+    """
+    Q = QNET.Qnet()
+    for node, e, f in [("B", 0.6, 0.8), ("C", 0.8, 0.85), ("D", 0.9, 0.95)]:
+        Q.add_qchan(edge=("A", node), e=1, f=1)
+        Q.add_qchan(edge=(node, "E"), e=e, f=f)
+    return Q
+
+
+def test_reductions_match_the_fold():
+    # Hand-computed values of the pairwise fold, best path first:
+    # fidTransform(0.95, 0.85) = 0.8075 / 0.815, and fidTransform(0.8075 / 0.815, 0.8) = 0.646 / 0.6475
+    two = 0.9907975460122699
+    three = 0.9976833976833976
+    Q = three_paths()
+    assert QNET.simple_purify(Q, "A", "E", threshold=1) == pytest.approx({'e': 0.8 * 0.5 ** 3, 'f': two}, rel=1e-15)
+    assert QNET.simple_purify(Q, "A", "E") == pytest.approx({'e': 0.6 * 0.5 ** 5, 'f': three}, rel=1e-15)
+    assert QNET.purify(Q, "A", "E") == pytest.approx(three, rel=1e-15)
+    R = QNET.purify_reduce(Q, "A", "E")
+    assert R.adj[R.getNode("A")][R.getNode("E")][0]['f'] == pytest.approx(three, rel=1e-15)
+    assert R.adj[R.getNode("A")][R.getNode("E")][0]['e'] == pytest.approx(0.6 * 0.5 ** 4, rel=1e-15)
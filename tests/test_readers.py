@@ -0,0 +1,107 @@
+"""
+Tests of the chunked importers of Readers.py and of the node name index used by getNode
+"""
+
+import networkx as nx
+import pytest
+
+import QNET
+
+
+def test_get_node_after_networkx_add_edge():
+    Q = QNET.Qnet()
+    a = QNET.Ground(Q, name="A")
+    b = QNET.Ground(Q, name="B")
+    nx.MultiGraph.add_edge(Q, a, b, **QNET.make_cost_vector(Q))
+    assert Q.getNode("A") is a and Q.getNode("B") is b
+
+    c = QNET.Ground(Q, name="C")
+    nx.MultiGraph.add_edges_from(Q, [(b, c, QNET.make_cost_vector(Q))])
+    assert Q.getNode("C") is c
+    assert Q.node_from_id(id(c)) is c
+
+
+def test_add_edge_indexes_new_endpoints():
+    Q = QNET.Qnet()
+    a = QNET.Ground(Q, name="A")
+    b = QNET.Ground(Q, name="B")
+    Q.add_edge(a, b, **QNET.make_cost_vector(Q))
+    c = QNET.Ground(Q, name="C")
+    Q.add_edges_from([(b, c, QNET.make_cost_vector(Q))])
+    assert Q.names == {"A": a, "B": b, "C": c}
+    assert Q.ids == {id(a): a, id(b): b, id(c): c}
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunksize", [1, 2, 100])
+def test_read_qnodes_csv(tmp_path, chunksize):
+    path = write(tmp_path / "nodes.csv",
+                 "name,qnode_type,x,y,z,e,f,swap_prob,isMemory\n"
+                 "A,Ground,0,0,0,0.9,0.95,,\n"
+                 "B,Swapper,1,2,0,,,0.75,\n"
+                 "C,,3,4,0,0.8,,,True\n"
+                 "S,Satellite,0,0,500,,,,\n"
+                 "A,Ground,5,5,0,0.7,0.9,,\n")
+    Q = QNET.Qnet()
+    assert QNET.read_qnodes_csv(Q, path, chunksize=chunksize) == 5
+    assert sorted(node.name for node in Q.nodes) == ["A", "B", "C", "S"]
+
+    # A repeated name updates the node, as add_qnode does
+    R = QNET.Qnet()
+    R.add_qnode(name="A", qnode_type="Ground", coords=[5, 5, 0], e=0.7, f=0.9)
+    R.add_qnode(name="B", qnode_type="Swapper", coords=[1, 2, 0], swap_prob=0.75)
+    R.add_qnode(name="C", coords=[3, 4, 0], e=0.8, isMemory=True)
+    R.add_qnode(name="S", qnode_type="Satellite", coords=[0, 0, 500])
+    for node in R.nodes:
+        other = Q.getNode(node.name)
+        assert type(other) is type(node)
+        assert list(other.coords) == pytest.approx(list(node.coords))
+        assert other.costs == pytest.approx(node.costs)
+        assert other.memory == pytest.approx(node.memory)
+        assert other.isMemory == node.isMemory
+    assert Q.getNode("B").swap_prob == 0.75
+
+
+def test_read_qnodes_csv_out_of_range(tmp_path):
+    path = write(tmp_path / "nodes.csv", "name,e\nA,0.9\nB,1.5\n")
+    with pytest.raises(AssertionError, match="row 1"):
+        QNET.read_qnodes_csv(QNET.Qnet(), path)
+
+
+@pytest.mark.parametrize("chunksize", [1, 3, 100])
+def test_read_qchans_csv(tmp_path, chunksize):
+    path = write(tmp_path / "chans.csv",
+                 "u,v,key,e,f\n"
+                 "A,B,,0.9,0.95\n"
+                 "B,C,,0.8,\n"
+                 "A,B,,0.7,0.99\n"
+                 "A,B,0,0.6,0.9\n"
+                 "C,S,,,\n")
+    Q = QNET.Qnet()
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[0, 0, 500])
+    assert QNET.read_qchans_csv(Q, path, chunksize=chunksize) == 5
+
+    R = QNET.Qnet()
+    R.add_qnode(name="S", qnode_type="Satellite", coords=[0, 0, 500])
+    R.add_qchan(edge=("A", "B"), e=0.9, f=0.95)
+    R.add_qchan(edge=("B", "C"), e=0.8)
+    R.add_qchan(edge=("A", "B"), e=0.7, f=0.99)
+    R.add_qchan(edge=("A", "B"), key=0, e=0.6, f=0.9)
+    R.add_qchan(edge=("C", "S"))
+    assert Q.number_of_edges() == R.number_of_edges()
+    for u, v, key, data in R.edges(keys=True, data=True):
+        assert Q.adj[Q.getNode(u.name)][Q.getNode(v.name)][key] == pytest.approx(data)
+    assert isinstance(Q.getNode("C"), QNET.Ground)
+
+
+def test_read_edgelist(tmp_path):
+    path = write(tmp_path / "edges.txt", "0 1 0.9 0.95\n1 2 0.8 0.9\n2 0 0.7 0.99\n")
+    Q = QNET.Qnet()
+    assert QNET.read_edgelist(Q, path, costs=('e', 'f'), chunksize=2) == 3
+    assert sorted(node.name for node in Q.nodes) == ["0", "1", "2"]
+    assert QNET.best_path_cost(Q, "0", "2", 'e') == pytest.approx(0.72)
+    assert Q.adj[Q.getNode("2")][Q.getNode("0")][0]['f'] == 0.99
@@ -0,0 +1,118 @@
+"""
+Tests of the batched drawing functions of Rendering.py
+"""
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from matplotlib.collections import LineCollection
+from mpl_toolkits.mplot3d import art3d
+
+import QNET
+from QNET import Rendering
+
+
+@pytest.fixture(autouse=True)
+def close_figures():
+    yield
+    plt.close("all")
+
+
+def test_graph_arrays():
+    Q = QNET.square_lattice(3, 4, 0.9, 0.95)
+    nodes, positions, edges, segments = Rendering.graph_arrays(Q, (0, 1))
+    assert positions.shape == (12, 2) and segments.shape == (Q.number_of_edges(), 2, 2)
+    for (u, v, key), segment in zip(edges, segments):
+        assert segment.tolist() == [list(u.coords[:2]), list(v.coords[:2])]
+
+
+def test_decimate():
+    Q = QNET.square_lattice(20, 20, 0.9, 0.95)
+    nodes, positions, edges, segments = Rendering.graph_arrays(Q, (0, 1))
+    # A grid finer than the lattice keeps every edge
+    assert Rendering.decimate(segments, 100).tolist() == list(range(len(edges)))
+    # A coarser grid keeps one edge between each pair of cells, and none within a cell
+    kept = Rendering.decimate(segments, 5)
+    assert 0 < len(kept) < len(edges)
+    cells = Rendering.grid_cells(segments.reshape(-1, 2), 5).reshape(len(segments), 2, 2)
+    pairs = [tuple(sorted(map(tuple, cells[i]))) for i in kept]
+    assert len(set(pairs)) == len(pairs) and all(a != b for a, b in pairs)
+    everything = {tuple(sorted(map(tuple, cells[i]))) for i in range(len(edges))}
+    assert set(pairs) == {(a, b) for a, b in everything if a != b}
+    assert len(Rendering.decimate(segments, 1)) == 0
+
+
+def test_cull_labels():
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(0, 100, (500, 2))
+    chosen = Rendering.cull_labels(positions, 36)
+    assert 0 < len(chosen) <= 36 and list(chosen) == sorted(chosen)
+    cells = Rendering.grid_cells(positions, 6)[chosen]
+    assert len({tuple(cell) for cell in cells}) == len(chosen)
+    assert Rendering.cull_labels(positions[:10], 36).tolist() == list(range(10))
+    assert len(Rendering.cull_labels(positions, 0)) == 0
+
+
+def test_draw_2d():
+    Q = QNET.square_lattice(10, 10, 0.9, 0.95)
+    ax = QNET.draw_2d(Q, node_label='e', edge_label='f', edge_color='e', max_labels=16, ax=plt.subplots()[1])
+    collections = [c for c in ax.collections if isinstance(c, LineCollection)]
+    assert len(collections) == 1 and len(collections[0].get_segments()) == Q.number_of_edges()
+    np.testing.assert_allclose(collections[0].get_array(), [data['e'] for u, v, data in Q.edges(data=True)])
+    assert not collections[0].get_rasterized()
+    # Node labels and edge labels
+    assert 0 < len(ax.texts) <= 32
+
+    ax = QNET.draw_2d(Q, resolution=4, ax=plt.subplots()[1])
+    line_collection, = [c for c in ax.collections if isinstance(c, LineCollection)]
+    assert len(line_collection.get_segments()) < Q.number_of_edges()
+
+
+def test_draw_2d_rasterizes_large_graphs(monkeypatch, tmp_path):
+    monkeypatch.setattr(Rendering, "rasterize_above", 50)
+    Q = QNET.square_lattice(10, 10, 0.9, 0.95)
+    path = str(tmp_path / "lattice.svg")
+    ax = QNET.draw_2d(Q, path=path)
+    line_collection, = [c for c in ax.collections if isinstance(c, LineCollection)]
+    assert line_collection.get_rasterized()
+    with open(path) as file:
+        assert "<image" in file.read()
+
+
+def test_plot_2d_batched(tmp_path):
+    Q = QNET.square_lattice(4, 4, 0.9, 0.95)
+    path = str(tmp_path / "lattice.png")
+    QNET.plot_2d(Q, batched=True, path=path, FOV=('x', 'z'))
+    assert plt.imread(path).shape[2] == 4
+
+
+def test_draw_3d():
+    Q = QNET.square_lattice(4, 4, 0.9, 0.95)
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[1, 1, 10], v_cart=[1, 0])
+    Q.add_qchan(edge=("S", "(0, 0)"))
+    Q.add_qchan(edge=("S", "(3, 3)"))
+    fig = plt.figure()
+    ax = QNET.draw_3d(Q, ax=fig.add_subplot(111, projection='3d'))
+    fig.canvas.draw()
+    ground, space, arrows = [c for c in ax.collections if isinstance(c, art3d.Line3DCollection)]
+    # Ground channels, dashed satellite channels, and the velocity arrow of the satellite
+    assert len(ground.get_segments()) == 24 and ground.get_linestyle()[0][1] is None
+    assert len(space.get_segments()) == 2 and space.get_linestyle()[0][1] is not None
+    assert len(arrows.get_segments()) == 3
+    assert len(ax.texts) == 17
+
+
+def test_draw_paths(tmp_path):
+    Q = QNET.Qnet()
+    Q.add_qchan(edge=("A", "B"), e=0.9, f=0.95)
+    Q.add_qchan(edge=("A", "C"), e=0.9, f=0.95)
+    Q.add_qchan(edge=("C", "B"), e=0.9, f=0.95)
+    ax = QNET.draw_paths(Q, 5, 1, ax=plt.subplots()[1])
+    paths = [c for c in ax.collections if isinstance(c, LineCollection)]
+    assert len(paths) == len(Q.cost_vector)
+    assert all(len(c.get_segments()) == 2 for c in paths)
+    assert len(ax.lines) == len(Q.cost_vector)
@@ -0,0 +1,147 @@
+"""
+Tests of the mutation log of Qnet and of the invalidation of the route cache
+"""
+
+import gc
+import random
+import weakref
+
+import networkx as nx
+import pytest
+
+import QNET
+
+
+def ladder():
+    """
+    Two routes between A and B, through the top nodes T1 and T2 or the bottom nodes D1 and D2, with a rung between
+    T1 and D1. The top route is the better one
+    """
+    Q = QNET.Qnet()
+    Q.add_qchan(edge=("A", "T1"), e=0.95, f=0.98)
+    Q.add_qchan(edge=("T1", "T2"), e=0.95, f=0.98)
+    Q.add_qchan(edge=("T2", "B"), e=0.95, f=0.98)
+    Q.add_qchan(edge=("A", "D1"), e=0.9, f=0.95)
+    Q.add_qchan(edge=("D1", "D2"), e=0.9, f=0.95)
+    Q.add_qchan(edge=("D2", "B"), e=0.9, f=0.95)
+    Q.add_qchan(edge=("T1", "D1"), e=0.5, f=0.8)
+    return Q
+
+
+def names(path):
+    return [node.name for node in path.node_array]
+
+
+def dijkstra_cost(Q, source, target, cost_type):
+    length = nx.dijkstra_path_length(Q, Q.getNode(source), Q.getNode(target),
+                                     weight=QNET.get_weight_function("add_" + cost_type))
+    return Q.conversions[cost_type][1](length)
+
+
+def test_mutations_are_versioned():
+    Q = ladder()
+    version = Q.version
+    a, t1 = Q.getNode("A"), Q.getNode("T1")
+    Q.add_qchan(edge=("A", "T1"), key=0, e=0.9, f=0.98)
+    assert Q.version == version + 1
+    change = Q.changes[-1]
+    assert change[0] == Q.version
+    assert set(change[2]) == {(id(a), id(t1), 0)}
+    # Only efficiency changed, and it got worse
+    assert change[3] == {'e'} and change[4] == set()
+
+    d1, d2, b = Q.getNode("D1"), Q.getNode("D2"), Q.getNode("B")
+    Q.remove_qnode("D2")
+    assert Q.version == version + 2
+    assert Q.changes[-1][1] == (id(d2),)
+    assert set(Q.changes[-1][2]) == {(id(d2), id(d1), 0), (id(d2), id(b), 0)}
+    # Removing things cannot make any path cheaper
+    assert Q.changes[-1][4] == set()
+
+
+def test_changed_since():
+    Q = ladder()
+    top = QNET.best_path(Q, "A", "B", 'e')
+    assert names(top) == ["A", "T1", "T2", "B"]
+    nodes = frozenset(id(node) for node in top.node_array)
+    edges = frozenset((id(u), id(v), 0) for u, v in zip(top.node_array[:-1], top.node_array[1:]))
+    edges |= frozenset((j, i, key) for i, j, key in edges)
+    version = Q.version
+    assert not Q.changed_since(version, nodes, edges, 'e')
+
+    # A worse channel off the route
+    Q.add_qchan(edge=("D1", "D2"), key=0, e=0.8, f=0.95)
+    assert not Q.changed_since(version, nodes, edges, 'e')
+    # A better channel anywhere
+    Q.add_qchan(edge=("D1", "D2"), key=0, e=0.85, f=0.95)
+    assert Q.changed_since(version, nodes, edges, 'e')
+    # A worse channel on the route, in a cost other than the one routed
+    version = Q.version
+    Q.add_qchan(edge=("T1", "T2"), key=0, e=0.95, f=0.9)
+    assert not Q.changed_since(version, nodes, edges, 'e')
+    assert Q.changed_since(version, nodes, edges, 'f')
+
+
+def test_route_cache_invalidation():
+    Q = ladder()
+    cache = Q.route_cache
+    assert QNET.best_path_cost(Q, "A", "B", 'e') == pytest.approx(0.95 ** 3)
+    hits, misses = cache.hits, cache.misses
+    assert QNET.best_path_cost(Q, "A", "B", 'e') == pytest.approx(0.95 ** 3)
+    assert (cache.hits, cache.misses) == (hits + 1, misses)
+
+    # Off the route and worse: still served from the cache
+    Q.add_qchan(edge=("D1", "D2"), key=0, e=0.85, f=0.95)
+    assert QNET.best_path_cost(Q, "A", "B", 'e') == pytest.approx(0.95 ** 3)
+    assert cache.hits == hits + 2
+
+    # On the route and worse: the bottom route is now better
+    Q.add_qchan(edge=("T1", "T2"), key=0, e=0.5, f=0.98)
+    assert QNET.best_path_cost(Q, "A", "B", 'e') == pytest.approx(0.9 * 0.85 * 0.9)
+    assert cache.misses == misses + 1
+    assert names(QNET.best_path(Q, "A", "B", 'e')) == ["A", "D1", "D2", "B"]
+
+    # A removed node on the route
+    Q.remove_qnode("D2")
+    assert QNET.best_path_cost(Q, "A", "B", 'e') == pytest.approx(0.95 * 0.5 * 0.95)
+
+    # A new channel that beats every route
+    Q.add_qchan(edge=("A", "B"), e=0.99, f=0.99)
+    assert QNET.best_path_cost(Q, "A", "B", 'e') == pytest.approx(0.99)
+
+
+def test_route_cache_after_random_mutations():
+    rng = random.Random(0)
+    Q = QNET.square_lattice(5, 5, 0.9, 0.9)
+    for step in range(150):
+        u, v, key = rng.choice(list(Q.edges(keys=True)))
+        if rng.random() < 0.8:
+            Q.add_qchan(edge=(u.name, v.name), key=key, e=rng.uniform(0.5, 1.0), f=rng.uniform(0.75, 1.0))
+        elif Q.degree(u) > 1 and Q.degree(v) > 1:
+            Q.remove_edge(u, v, key)
+        for target in ["(4, 4)", "(2, 2)", "(0, 4)"]:
+            if nx.has_path(Q, Q.getNode("(0, 0)"), Q.getNode(target)):
+                for cost_type in ('e', 'f'):
+                    assert QNET.best_path_cost(Q, "(0, 0)", target, cost_type) == \
+                        pytest.approx(dijkstra_cost(Q, "(0, 0)", target, cost_type))
+    assert Q.route_cache.hits > 0
+
+
+def test_change_log_overflow_invalidates():
+    Q = ladder()
+    QNET.best_path_cost(Q, "A", "B", 'e')
+    misses = Q.route_cache.misses
+    for i in range(Q.changes.maxlen + 1):
+        Q.add_qchan(edge=("D1", "D2"), key=0, e=0.8 if i % 2 else 0.7, f=0.95)
+    QNET.best_path_cost(Q, "A", "B", 'e')
+    assert Q.route_cache.misses == misses + 1
+
+
+def test_change_log_does_not_keep_removed_nodes():
+    Q = ladder()
+    Q.add_qchan(edge=("A", "C"), e=0.9, f=0.9)
+    node = weakref.ref(Q.getNode("C"))
+    Q.remove_qnode("C")
+    gc.collect()
+    assert node() is None
+    assert len(Q.changes) > 0
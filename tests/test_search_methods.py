@@ -0,0 +1,95 @@
+"""
+Tests of the A* and bidirectional strategies of best_path and best_path_cost, and of the A* heuristic
+"""
+
+import math
+import random
+
+import networkx as nx
+import pytest
+
+import QNET
+
+methods = ["dijkstra", "astar", "bidirectional"]
+
+
+def geometric_qnet(n, seed):
+    """Random geometric Qnet whose channels lose efficiency and fidelity with their length"""
+    rng = random.Random(seed)
+    G = nx.random_geometric_graph(n, 0.3, seed=seed)
+    Q = QNET.Qnet()
+    for node, (x, y) in G.nodes(data="pos"):
+        Q.add_qnode(name=str(node), qnode_type="Ground", coords=(10 * x, 10 * y, 0))
+    for u, v in G.edges:
+        length = math.dist(G.nodes[u]["pos"], G.nodes[v]["pos"])
+        Q.add_qchan(edge=(str(u), str(v)), e=math.exp(-length * rng.uniform(0.5, 2)),
+                    f=0.5 + 0.5 * math.exp(-length * rng.uniform(0.5, 2)))
+    return Q
+
+
+def distances_to(Q, target, cost_type):
+    """Shortest distance of every node to target in an additive cost, by networkx"""
+    return nx.single_source_dijkstra_path_length(Q, target, weight=QNET.get_weight_function(cost_type))
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("cost_type", ['e', 'f'])
+def test_methods_agree_with_dijkstra(seed, cost_type):
+    Q = geometric_qnet(60, seed)
+    rng = random.Random(seed)
+    nodes = list(Q.nodes)
+    for i in range(10):
+        source, target = rng.sample(nodes, 2)
+        if not nx.has_path(Q, source, target):
+            continue
+        want = nx.dijkstra_path_length(Q, source, target, weight=QNET.get_weight_function("add_" + cost_type))
+        for method in methods:
+            length, node_list = QNET.shortest_path(Q, source, target, "add_" + cost_type, method)
+            assert length == pytest.approx(want)
+            assert node_list[0] is source and node_list[-1] is target
+            path = QNET.best_path(Q, source, target, cost_type, method)
+            assert path.cost_vector["add_" + cost_type] == pytest.approx(want)
+
+
+def test_heuristic_is_admissible_as_the_graph_changes():
+    Q = geometric_qnet(40, seed=7)
+    rng = random.Random(7)
+    target = Q.getNode("0")
+    for step in range(60):
+        kind = rng.choice(["cost", "move", "add", "shortcut", "remove"])
+        u, v, key = rng.choice(list(Q.edges(keys=True)))
+        if kind == "cost":
+            Q.add_qchan(edge=(u.name, v.name), key=key, e=rng.uniform(0.2, 1.0), f=rng.uniform(0.6, 1.0))
+        elif kind == "move":
+            u.coords = (u.coords[0] + rng.uniform(-3, 3), u.coords[1] + rng.uniform(-3, 3), 0)
+            Q.touch(nodes=[u])
+        elif kind == "add":
+            a, b = rng.sample(list(Q.nodes), 2)
+            Q.add_qchan(edge=(a.name, b.name), e=rng.uniform(0.9, 1.0), f=rng.uniform(0.9, 1.0))
+        elif kind == "shortcut":
+            # A long, nearly lossless channel to the target lowers the cost per unit length
+            far = max(Q.nodes, key=lambda node: math.dist(node.coords, target.coords))
+            Q.add_qchan(edge=(far.name, target.name), e=1 - rng.uniform(0, 1e-3), f=0.999)
+        else:
+            Q.remove_edge(u, v, key)
+        heuristic = QNET.get_heuristic(Q, target, "add_e")
+        for node, distance in distances_to(Q, target, "add_e").items():
+            assert heuristic(node, None) <= distance + 1e-9
+        source = rng.choice(list(nx.node_connected_component(Q, target)))
+        assert QNET.best_path_cost(Q, source, target, 'e', 'astar') == \
+            pytest.approx(QNET.best_path_cost(Q, source, target, 'e', 'dijkstra'))
+
+
+def test_heuristic_without_lengths_is_zero():
+    Q = QNET.Qnet()
+    Q.add_qchan(edge=("A", "B"), e=0.9, f=0.9)
+    Q.add_qchan(edge=("B", "C"), e=0.9, f=0.9)
+    heuristic = QNET.get_heuristic(Q, Q.getNode("C"), "add_e")
+    assert all(heuristic(node, None) == 0 for node in Q.nodes)
+    assert QNET.best_path_cost(Q, "A", "C", 'e', 'astar') == pytest.approx(0.81)
+
+
+def test_unknown_method():
+    Q = geometric_qnet(10, seed=0)
+    with pytest.raises(ValueError):
+        QNET.shortest_path(Q, Q.getNode("0"), Q.getNode("0"), "add_e", "breadth")
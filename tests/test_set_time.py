@@ -0,0 +1,101 @@
+"""
+Tests of Qnet.set_time, of pickling satellites and of sim_parallel against sim_method
+"""
+
+import copy
+import multiprocessing
+import pickle
+
+import networkx as nx
+import pytest
+
+import QNET
+
+iss = ("1 25544U 98067A   20154.85125762  .00002004  00000-0  43906-4 0  9990",
+       "2 25544  51.6443  59.4222 0002071  22.0017  92.6243 15.49416742229799")
+
+
+def satellite_qnet():
+    Q = QNET.Qnet()
+    Q.add_qnode(name="A", qnode_type="Ground", coords=[0, 0, 0])
+    Q.add_qnode(name="B", qnode_type="Ground", coords=[400, 0, 0])
+    Q.add_qchan(edge=("A", "B"), e=1e-5, f=0.9)
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[-1000, 0, 500], v_cart=[40, 0])
+    Q.add_qchan(edge=("S", "A"))
+    Q.add_qchan(edge=("S", "B"))
+    Q.add_node(QNET.Satellite(Q, name="ISS", line1=iss[0], line2=iss[1], cartesian=False))
+    Q.add_qnode(name="Perth", qnode_type="Ground", coords=[-31, 115, 0])
+    return Q
+
+
+def efficiency(C, u, v):
+    try:
+        return QNET.best_path_cost(C, u, v, 'e')
+    except nx.NetworkXNoPath:
+        return 0
+
+
+def test_set_time_matches_updates():
+    Q = satellite_qnet()
+    R = copy.deepcopy(Q)
+    for i in range(20):
+        Q.update(30)
+    R.set_time(600)
+    assert Q.time == R.time == 600
+    for node in Q.nodes:
+        other = R.getNode(node.name)
+        assert other.coords == pytest.approx(node.coords)
+        if isinstance(node, QNET.Satellite):
+            assert other.time == pytest.approx(node.time)
+    iss_q, iss_r = Q.getNode("ISS"), R.getNode("ISS")
+    assert (iss_q.t_new - iss_r.t_new) * 86400 == pytest.approx(0, abs=1e-3)
+    s = R.getNode("S")
+    for n in (R.getNode("A"), R.getNode("B")):
+        assert R.adj[s][n][0]['e'] == pytest.approx(s.airCost(n)[0])
+
+
+def test_set_time_goes_back():
+    Q = satellite_qnet()
+    start = {node.name: list(node.coords) for node in Q.nodes}
+    costs = {(u.name, v.name): dict(data) for u, v, data in Q.edges(data=True)}
+    Q.set_time(1234.5)
+    assert Q.getNode("S").coords != start["S"]
+    Q.set_time(0)
+    assert {node.name: node.coords for node in Q.nodes} == pytest.approx(start)
+    for (u, v), data in costs.items():
+        assert Q.adj[Q.getNode(u)][Q.getNode(v)][0] == pytest.approx(data)
+
+
+def test_pickle_satellites():
+    Q = satellite_qnet()
+    Q.set_time(100)
+    R = pickle.loads(pickle.dumps(Q))
+    for name in ("S", "ISS"):
+        node, other = Q.getNode(name), R.getNode(name)
+        assert other.coords == node.coords and other.time == node.time
+        assert other.__dict__.keys() == node.__dict__.keys()
+    iss_q, iss_r = Q.getNode("ISS"), R.getNode("ISS")
+    assert iss_r.satellite is QNET.get_earth_satellite(*iss)
+    assert (iss_r.t_new - iss_q.t_new) == 0 and (iss_r.t_startTime - iss_q.t_startTime) == 0
+    # The unpickled satellites keep moving along the same orbits
+    Q.set_time(700)
+    R.set_time(700)
+    assert R.getNode("ISS").coords == Q.getNode("ISS").coords
+    assert R.getNode("S").coords == pytest.approx(Q.getNode("S").coords)
+    assert R.getNode("Perth").coords == Q.getNode("Perth").coords
+
+
+@pytest.mark.parametrize("processes, chunks", [(1, 1), (1, 4),
+                                               pytest.param(2, 5, marks=pytest.mark.skipif(
+                                                   multiprocessing.get_start_method() != "fork",
+                                                   reason="the test module is only importable in forked workers"))])
+def test_sim_parallel_matches_sim_method(processes, chunks):
+    Q = satellite_qnet()
+    Q.update(7)
+    want = QNET.sim_method(Q, "A", "B", efficiency, 60, 2.5)
+    got = QNET.sim_parallel(Q, "A", "B", efficiency, 60, 2.5, processes=processes, chunks=chunks)
+    assert len(got) == len(want) == 24
+    assert got == pytest.approx(want)
+    assert max(want) > 1e-3
+    # The graph itself is left alone
+    assert Q.time == 7
@@ -0,0 +1,82 @@
+"""
+Tests of SharedQnet, the read-only view of a Qnet in shared memory
+"""
+
+import multiprocessing
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+import QNET
+
+
+def lattice_qnet():
+    Q = QNET.square_lattice(5, 5, 0.9, 0.95)
+    rng = np.random.default_rng(3)
+    for u, v, key in list(Q.edges(keys=True)):
+        Q.add_qchan(edge=(u.name, v.name), key=key, e=rng.uniform(0.6, 1), f=rng.uniform(0.75, 1))
+    Q.add_qnode(name="Lonely", qnode_type="Ground", coords=(50, 50, 0))
+    return Q
+
+
+pairs = [("(0, 0)", "(4, 4)"), ("(0, 4)", "(4, 0)"), ("(2, 2)", "(0, 1)"), ("(1, 3)", "(3, 1)")]
+
+
+def worker_cost(view, source, target, cost_type):
+    return os.getpid(), id(view), QNET.best_path_cost(view, source, target, cost_type)
+
+
+def test_view_matches_the_qnet():
+    Q = lattice_qnet()
+    with QNET.share_qnet(Q) as view:
+        assert view.names() == QNET.QnetSnapshot.from_qnet(Q).names()
+        assert not view.indices.flags.writeable
+        for source, target in pairs:
+            for cost_type in ('e', 'f'):
+                assert view.best_path_cost(source, target, cost_type) == \
+                    pytest.approx(QNET.best_path_cost(Q, source, target, cost_type))
+        assert QNET.path_exist(view, "(0, 0)", "Lonely") == {'p': 0}
+        assert view.to_qnet().number_of_edges() == Q.number_of_edges()
+
+
+def test_pickle_attaches_to_the_same_view():
+    with QNET.share_qnet(lattice_qnet()) as view:
+        copy = pickle.loads(pickle.dumps(view))
+        # Within a process, the view is reused rather than attached again
+        assert copy is view
+        assert len(pickle.dumps(view)) < view.shm.size
+
+
+def test_attach_after_unlink():
+    view = QNET.share_qnet(lattice_qnet())
+    handle = view.handle
+    view.unlink()
+    assert view.shm is None
+    with pytest.raises(FileNotFoundError):
+        QNET.SharedQnet.attach(handle)
+
+
+def test_only_the_owner_unlinks():
+    with QNET.share_qnet(lattice_qnet()) as view:
+        other = QNET.SharedQnet(view.handle, view.shm)
+        with pytest.raises(AssertionError):
+            other.unlink()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs the fork start method")
+def test_pool_workers():
+    Q = lattice_qnet()
+    tasks = [(source, target, cost_type) for source, target in pairs for cost_type in ('e', 'f')] * 3
+    with QNET.share_qnet(Q) as view:
+        with multiprocessing.get_context("fork").Pool(2) as pool:
+            results = pool.starmap(worker_cost, [(view, *task) for task in tasks])
+    for (source, target, cost_type), (pid, view_id, cost) in zip(tasks, results):
+        assert pid != os.getpid()
+        assert cost == pytest.approx(QNET.best_path_cost(Q, source, target, cost_type))
+    # Each worker attaches once and reuses its view for later tasks
+    views = {}
+    for pid, view_id, cost in results:
+        views.setdefault(pid, set()).add(view_id)
+    assert all(len(ids) == 1 for ids in views.values())
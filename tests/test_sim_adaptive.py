@@ -0,0 +1,103 @@
+"""
+Tests of sim_adaptive, its events and resample
+"""
+
+import copy
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import QNET
+
+
+def efficiency(C, u, v):
+    """Best efficiency between two nodes, or 0 if they are not connected"""
+    try:
+        return QNET.best_path_cost(C, u, v, 'e')
+    except (nx.NetworkXNoPath, nx.NodeNotFound):
+        return 0
+
+
+def pass_qnet():
+    """Two ground nodes joined by a poor channel, and a satellite passing over them"""
+    Q = QNET.Qnet()
+    Q.add_qnode(name="A", qnode_type="Ground", coords=[0, 0, 0])
+    Q.add_qnode(name="B", qnode_type="Ground", coords=[400, 0, 0])
+    Q.add_qnode(name="C", qnode_type="Ground", coords=[5000, 0, 0])
+    Q.add_qchan(edge=("A", "B"), e=1e-5, f=0.9)
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[-1000, 0, 500], v_cart=[40, 0])
+    return Q
+
+
+def direct(G, times):
+    """Costs at the given times, each evaluated on a fresh copy of the graph"""
+    costs = []
+    for t in times:
+        C = copy.deepcopy(G)
+        C.set_time(C.time + t)
+        costs.append(efficiency(C, C.getNode("A"), C.getNode("B")))
+    return costs
+
+
+@pytest.mark.parametrize("visibility", [False, True])
+def test_samples_match_the_graph_at_their_times(visibility):
+    G = pass_qnet()
+    if visibility:
+        # Channels to the satellite are created and removed as it passes, so rolled back steps must restore them
+        G.enable_visibility(min_elevation=30)
+    else:
+        G.add_qchan(edge=("S", "A"))
+        G.add_qchan(edge=("S", "B"))
+    G.update(3)
+    times, costs = QNET.sim_adaptive(G, "A", "B", efficiency, 60, tol=5e-5, dt_max=5)
+    assert times[0] == 0 and times[-1] == 60 and np.all(np.diff(times) >= 0)
+    assert costs == pytest.approx(direct(G, times))
+    # The step is refined where the satellite route appears and disappears
+    assert len(times) > 13 and max(costs) > 1e-3
+    # Samples are no further apart than tol, except at the smallest step
+    dt_min = 5 / 10 ** 4
+    for i in range(1, len(times)):
+        assert abs(costs[i] - costs[i - 1]) <= 5e-5 or times[i] - times[i - 1] <= dt_min * (1 + 1e-9)
+
+
+def test_events():
+    G = pass_qnet()
+    G.add_qchan(edge=("B", "C"), e=0.9, f=0.9)
+
+    def better_channel(C):
+        C.add_qchan(edge=("A", "B"), key=0, e=0.5, f=0.9)
+
+    events = [(30, QNET.node_failure("C")), (10, better_channel), (20, None), (45, QNET.node_failure("A")),
+              (50, QNET.node_failure("B"))]
+    times, costs = QNET.sim_adaptive(G, "A", "B", efficiency, 50, dt_max=7, events=events)
+    samples = list(zip(times, costs))
+    # Events are sampled exactly, before and after their actions
+    assert [cost for t, cost in samples if t == 10] == pytest.approx([1e-5, 0.5])
+    assert [cost for t, cost in samples if t == 30] == pytest.approx([0.5, 0.5])
+    assert [cost for t, cost in samples if t == 45] == pytest.approx([0.5, 0])
+    # An event at tMax is still applied
+    assert [t for t in times if t == 50] == [50, 50]
+    assert times[-1] == 50
+    # An event without an action only cuts the step
+    assert 20 in list(times)
+
+
+def test_events_past_tmax_are_ignored():
+    G = pass_qnet()
+    times, costs = QNET.sim_adaptive(G, "A", "B", efficiency, 20, events=[(25, QNET.node_failure("A"))])
+    assert times[-1] == 20 and costs[-1] == pytest.approx(1e-5)
+
+
+def test_contact_plan_events():
+    G = pass_qnet()
+    G.add_qchan(edge=("S", "A"))
+    plan = QNET.ContactPlan(G, 60, min_elevation=30)
+    times, costs = QNET.sim_adaptive(G, "A", "B", efficiency, 60, dt_max=10, plan=plan)
+    assert set(plan.event_times) <= set(times)
+
+
+def test_resample():
+    times = np.array([0, 0.5, 2, 2, 3.5])
+    costs = [1, 2, 3, 4, 5]
+    assert QNET.resample(times, costs, 4, 1) == [1, 2, 4, 4]
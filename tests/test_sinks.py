@@ -0,0 +1,125 @@
+"""
+Tests of the result sinks, of ShardSink surviving runs that die part way through a flush, and of resuming simulations
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+import QNET
+
+series = ["path 0", "path 1"]
+keys = ["e", "f"]
+
+
+def sample(t):
+    return [{'e': t, 'f': 1 / (t + 1)}, {'e': 2 * t, 'f': None}]
+
+
+def expected(steps):
+    costs = np.array([[[cost[key] if cost[key] is not None else np.nan for key in keys] for cost in sample(t)]
+                      for t in range(steps)], dtype=float)
+    return np.arange(steps, dtype=float), costs
+
+
+def write(sink, start, stop):
+    for t in range(start, stop):
+        sink.write(float(t), sample(t))
+
+
+def assert_read(sink, steps):
+    times, costs = sink.read()
+    want_times, want_costs = expected(steps)
+    np.testing.assert_array_equal(times, want_times)
+    np.testing.assert_array_equal(costs, want_costs)
+
+
+def test_array_sink():
+    sink = QNET.ArraySink(capacity=4)
+    assert sink.open(series, keys) == 0
+    write(sink, 0, 11)
+    assert_read(sink, 11)
+
+
+def test_shard_sink_resume(tmp_path):
+    with QNET.ShardSink(str(tmp_path), shard_size=4) as sink:
+        assert sink.open(series, keys) == 0
+        write(sink, 0, 10)
+    sink = QNET.ShardSink(str(tmp_path), shard_size=4)
+    assert sink.open(series, keys) == 10
+    write(sink, 10, 13)
+    assert_read(sink, 13)
+    with pytest.raises(AssertionError):
+        sink.open(["other"], keys)
+
+    sink = QNET.ShardSink(str(tmp_path), shard_size=4, resume=False)
+    assert sink.open(series, keys) == 0
+    assert [name for name in os.listdir(str(tmp_path)) if name.endswith(".npy")] == []
+
+
+def test_shard_sink_header_is_atomic(tmp_path, monkeypatch):
+    sink = QNET.ShardSink(str(tmp_path), shard_size=4)
+    sink.open(series, keys)
+    write(sink, 0, 8)
+    with open(os.path.join(str(tmp_path), "header.json")) as file:
+        header = json.load(file)
+    assert header["steps"] == 8
+
+    # The run dies after writing the third shard and a partial header, but before replacing the header
+    def die(source, destination):
+        with open(source, "w") as file:
+            file.write('{"series": ')
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(os, "replace", die)
+    with pytest.raises(KeyboardInterrupt):
+        write(sink, 8, 12)
+    monkeypatch.undo()
+    assert os.path.exists(os.path.join(str(tmp_path), "shard_000002.npy"))
+
+    # The sink is as it was at its last flush, and the orphaned shard is overwritten on resume
+    with open(os.path.join(str(tmp_path), "header.json")) as file:
+        assert json.load(file) == header
+    resumed = QNET.ShardSink(str(tmp_path), shard_size=4)
+    assert resumed.open(series, keys) == 8
+    assert_read(resumed, 8)
+    write(resumed, 8, 14)
+    resumed.flush()
+    assert_read(QNET.ShardSink(str(tmp_path), shard_size=4), 14)
+
+
+def pass_qnet():
+    Q = QNET.Qnet()
+    Q.add_qnode(name="A", qnode_type="Ground", coords=[0, 0, 0])
+    Q.add_qnode(name="B", qnode_type="Ground", coords=[400, 0, 0])
+    Q.add_qchan(edge=("A", "B"), e=1e-5, f=0.9)
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[-1000, 0, 500], v_cart=[40, 0])
+    Q.add_qchan(edge=("S", "A"))
+    Q.add_qchan(edge=("S", "B"))
+    return Q
+
+
+def efficiency(C, u, v):
+    return QNET.best_path_cost(C, u, v, 'e')
+
+
+def test_simulations_resume(tmp_path):
+    Q = pass_qnet()
+    want = QNET.sim_method(Q, "A", "B", efficiency, 60, 2)
+    path = str(tmp_path / "method")
+    # A first run covers part of the time span, and a second run resumes after its samples
+    QNET.sim_method(Q, "A", "B", efficiency, 24, 2, sink=QNET.ShardSink(path, shard_size=5))
+    sink = QNET.sim_method(Q, "A", "B", efficiency, 60, 2, sink=QNET.ShardSink(path, shard_size=5))
+    times, costs = sink.read()
+    np.testing.assert_allclose(times, np.arange(0, 60, 2))
+    np.testing.assert_allclose(costs[:, 0, 0], want)
+
+    want = QNET.sim_path(Q, ["A", "S", "B"], 30, 3)
+    sink = QNET.ArraySink()
+    QNET.sim_path(Q, ["A", "S", "B"], 12, 3, sink=sink)
+    QNET.sim_path(Q, ["A", "S", "B"], 30, 3, sink=sink)
+    times, costs = sink.read()
+    assert sink.keys == list(want[0])
+    np.testing.assert_allclose(costs[:, 0, :], [[cost[key] for key in sink.keys] for cost in want])
@@ -0,0 +1,93 @@
+"""
+Tests of the round trip of a Qnet through QnetSnapshot, save_qnet and load_qnet
+"""
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import QNET
+
+
+def mixed_qnet():
+    """A Qnet with every node type, node costs, memory costs, parallel channels and an isolated node"""
+    Q = QNET.Qnet()
+    Q.add_qnode(name="A", qnode_type="Ground", coords=(0, 0, 0), e=0.95, f=0.99)
+    Q.add_qnode(name="B", qnode_type="Ground", coords=(300, 0, 0))
+    Q.add_qnode(name="R", qnode_type="Swapper", coords=(150, 50, 0), swap_prob=0.75)
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=(-100, 0, 500), v_cart=[20, 5])
+    Q.add_node(QNET.Memory(Q, name="M", coords=(150, -50, 0), isMemory=True))
+    Q.add_qnode(name="Lonely", qnode_type="Ground", coords=(900, 900, 0))
+    Q.add_qchan(edge=("A", "R"), e=0.9, f=0.95)
+    Q.add_qchan(edge=("R", "B"), e=0.8, f=0.97)
+    Q.add_qchan(edge=("R", "B"), e=0.85, f=0.9)
+    Q.add_qchan(edge=("A", "M"), e=0.7, f=0.99)
+    Q.add_qchan(edge=("M", "B"), e=0.7, f=0.99)
+    Q.add_qchan(edge=("S", "A"))
+    Q.add_qchan(edge=("S", "B"))
+    Q.getNode("M").t_memory = 3.5
+    return Q
+
+
+def assert_same_qnet(Q, R):
+    assert sorted(node.name for node in R.nodes) == sorted(node.name for node in Q.nodes)
+    for node in Q.nodes:
+        other = R.getNode(node.name)
+        assert type(other) is type(node)
+        assert list(other.coords) == pytest.approx(list(node.coords))
+        assert other.costs == pytest.approx(node.costs)
+        assert other.memory == pytest.approx(node.memory)
+        assert other.isMemory == node.isMemory
+    assert R.getNode("R").swap_prob == 0.75
+    assert R.getNode("S").velocity == [20, 5]
+    assert R.getNode("M").t_memory == 3.5
+    assert R.number_of_edges() == Q.number_of_edges()
+    for u, v, key, data in Q.edges(keys=True, data=True):
+        assert R.adj[R.getNode(u.name)][R.getNode(v.name)][key] == pytest.approx(data)
+
+
+def test_round_trip_in_memory():
+    Q = mixed_qnet()
+    snapshot = QNET.QnetSnapshot.from_qnet(Q)
+    assert len(snapshot) == Q.number_of_nodes()
+    assert snapshot.number_of_edges == Q.number_of_edges()
+    assert sorted(snapshot.names()) == sorted(node.name for node in Q.nodes)
+    assert_same_qnet(Q, snapshot.to_qnet())
+
+
+def test_round_trip_on_disk(tmp_path):
+    Q = mixed_qnet()
+    QNET.save_qnet(Q, str(tmp_path))
+    snapshot = QNET.QnetSnapshot.load(str(tmp_path))
+    assert isinstance(snapshot.edge_costs, np.memmap)
+    assert not snapshot.edge_costs.flags.writeable
+    assert_same_qnet(Q, QNET.load_qnet(str(tmp_path)))
+    assert_same_qnet(Q, QNET.QnetSnapshot.load(str(tmp_path), mmap=False).to_qnet())
+
+
+def test_routing_on_a_snapshot(tmp_path):
+    Q = QNET.square_lattice(6, 6, 0.9, 0.95)
+    rng = np.random.default_rng(0)
+    for u, v, key in list(Q.edges(keys=True)):
+        Q.add_qchan(edge=(u.name, v.name), key=key, e=rng.uniform(0.6, 1), f=rng.uniform(0.75, 1))
+    QNET.save_qnet(Q, str(tmp_path))
+    snapshot = QNET.QnetSnapshot.load(str(tmp_path))
+    for target in ["(5, 5)", "(0, 5)", "(3, 2)"]:
+        for cost_type in ('e', 'f'):
+            length = nx.dijkstra_path_length(Q, Q.getNode("(0, 0)"), Q.getNode(target),
+                                             weight=QNET.get_weight_function("add_" + cost_type))
+            want = Q.conversions[cost_type][1](length)
+            assert snapshot.best_path_cost("(0, 0)", target, cost_type) == pytest.approx(want)
+            assert QNET.best_path_cost(snapshot, "(0, 0)", target, cost_type) == pytest.approx(want)
+            path = QNET.best_path(snapshot, "(0, 0)", target, cost_type)
+            assert path.cost_vector[cost_type] == pytest.approx(want)
+
+
+def test_disconnected_nodes():
+    snapshot = QNET.QnetSnapshot.from_qnet(mixed_qnet())
+    assert snapshot.has_path("A", "B")
+    assert not snapshot.has_path("A", "Lonely")
+    assert QNET.path_exist(snapshot, "A", "B") == {'p': 1}
+    assert QNET.path_exist(snapshot, "A", "Lonely") == {'p': 0}
+    with pytest.raises(nx.NetworkXNoPath):
+        snapshot.best_path_cost("A", "Lonely", 'e')
@@ -0,0 +1,158 @@
+"""
+Tests of walk_chain, simple_swap, swap_chains and simple_swap_batch
+"""
+
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import QNET
+
+
+def chain(kinds, seed=0):
+    """
+    Returns a linear Qnet A - N1 - ... - B with inner nodes of the given types, or plain Qnodes for None, and
+    random costs
+    """
+    rng = random.Random(seed)
+    Q = QNET.Qnet()
+    names = ["A"] + [f"N{i + 1}" for i in range(len(kinds))] + ["B"]
+    Q.add_qnode(name="A", e=rng.uniform(0.8, 1))
+    for name, kind in zip(names[1:-1], kinds):
+        if kind == "Swapper":
+            Q.add_qnode(name=name, qnode_type=kind, e=rng.uniform(0.8, 1), swap_prob=rng.uniform(0.5, 1))
+        else:
+            Q.add_qnode(name=name, qnode_type=kind, e=rng.uniform(0.8, 1))
+    Q.add_qnode(name="B", e=rng.uniform(0.8, 1))
+    for u, v in zip(names, names[1:]):
+        Q.add_qchan(edge=(u, v), e=rng.uniform(0.5, 1), f=0.9)
+    return Q
+
+
+def baseline_swap(Q, source, dest):
+    """
+    The efficiencies of simple_swap as they were computed before it walked the chain, from its only simple path
+    """
+    path, = nx.all_simple_paths(Q, source, dest)
+    no_swap = np.prod([node.costs['e'] for node in path]) * \
+        np.prod([Q.get_edge_data(u, v)[0]['e'] for u, v in zip(path, path[1:])])
+    candidate = None
+    front = False
+    local = 1
+    swappers = []
+    net = 1
+    for i, cur in enumerate(path[:-1]):
+        if isinstance(cur, QNET.Ground) and candidate is None:
+            front = True
+        elif isinstance(cur, QNET.Swapper) and front:
+            if candidate is None or candidate.swap_prob < cur.swap_prob:
+                candidate = cur
+        elif isinstance(cur, QNET.Ground):
+            local *= cur.costs['e']
+            net = min(net, local)
+            swappers.append(candidate)
+            local, candidate, front = 1, None, False
+            local *= Q.get_edge_data(cur, path[i + 1])[0]['e']
+            continue
+        local *= cur.costs['e'] * Q.get_edge_data(cur, path[i + 1])[0]['e']
+    net = min(net, local * dest.costs['e'])
+    for swapper in swappers:
+        net *= swapper.costs['e']
+    return no_swap, net
+
+
+kind_lists = [[], ["Ground"], ["Swapper", "Ground", "Swapper"], ["Ground", "Swapper", "Ground", "Swapper", "Ground"],
+              ["Ground", "Swapper", "Swapper", "Ground", "Swapper", "Swapper", "Swapper", "Ground"],
+              ["Swapper", "Swapper", "Ground", "Ground", None, "Swapper", "Ground", "Swapper"]]
+
+
+@pytest.mark.parametrize("kinds", kind_lists)
+def test_simple_swap(kinds):
+    for seed in range(5):
+        Q = chain(kinds, seed)
+        A, B = Q.getNode("A"), Q.getNode("B")
+        assert QNET.simple_swap(Q, A, B) == pytest.approx(baseline_swap(Q, A, B), rel=1e-12)
+        # The chain is the same read backwards
+        assert QNET.simple_swap(Q, B, A)[0] == pytest.approx(baseline_swap(Q, B, A)[0], rel=1e-12)
+
+
+def test_walk_chain():
+    Q = chain(["Ground", "Swapper", "Ground", "Swapper", "Ground"])
+    names = ["A", "N1", "N2", "N3", "N4", "N5", "B"]
+    walk = [(node.name, edge) for node, edge in QNET.walk_chain(Q, Q.getNode("A"), Q.getNode("B"))]
+    assert [name for name, edge in walk] == names
+    assert [edge['e'] for name, edge in walk[:-1]] == [Q.adj[Q.getNode(u)][Q.getNode(v)][0]['e']
+                                                      for u, v in zip(names, names[1:])]
+    assert walk[-1][1] is None
+    assert [(node.name, edge) for node, edge in QNET.walk_chain(Q, Q.getNode("N3"), Q.getNode("N3"))] == \
+        [("N3", None)]
+
+
+@pytest.mark.parametrize("source, dest", [("N3", "B"), ("N3", "A"), ("N1", "N5"), ("N5", "N1")])
+def test_walk_chain_from_inside(source, dest):
+    Q = chain(["Ground", "Swapper", "Ground", "Swapper", "Ground"])
+    s, d = Q.getNode(source), Q.getNode(dest)
+    path, = nx.all_simple_paths(Q, s, d)
+    assert [node for node, edge in QNET.walk_chain(Q, s, d)] == path
+    assert QNET.simple_swap(Q, s, d) == pytest.approx(baseline_swap(Q, s, d), rel=1e-12)
+
+
+def test_walk_chain_errors():
+    Q = chain(["Ground", "Swapper", "Ground"])
+    Q.add_qnode(name="C")
+    with pytest.raises(AssertionError, match="No valid path"):
+        list(QNET.walk_chain(Q, Q.getNode("A"), Q.getNode("C")))
+    with pytest.raises(AssertionError, match="No valid path"):
+        list(QNET.walk_chain(Q, Q.getNode("N2"), Q.getNode("C")))
+
+    # A branch on the way
+    Q.add_qchan(edge=("N2", "C"), e=0.9, f=0.9)
+    with pytest.raises(AssertionError, match="More than one path"):
+        list(QNET.walk_chain(Q, Q.getNode("A"), Q.getNode("B")))
+    with pytest.raises(AssertionError, match="More than one path"):
+        list(QNET.walk_chain(Q, Q.getNode("N1"), Q.getNode("B")))
+
+    # A ring, in which both directions lead to the destination
+    R = chain(["Ground", "Swapper", "Ground"])
+    R.add_qchan(edge=("A", "B"), e=0.9, f=0.9)
+    with pytest.raises(AssertionError, match="More than one path"):
+        list(QNET.walk_chain(R, R.getNode("N1"), R.getNode("N3")))
+
+    # Parallel channels are named
+    P = chain(["Ground", "Swapper", "Ground"])
+    P.add_qchan(edge=("N2", "N3"), e=0.9, f=0.9)
+    with pytest.raises(AssertionError, match="2 parallel channels exist between N2 and N3"):
+        list(QNET.walk_chain(P, P.getNode("A"), P.getNode("B")))
+    with pytest.raises(AssertionError, match="2 parallel channels exist between N3 and N2"):
+        list(QNET.walk_chain(P, P.getNode("B"), P.getNode("A")))
+
+
+def test_swap_chains():
+    chains = [QNET.chain_arrays(Q, Q.getNode("A"), Q.getNode("B"))
+              for Q in [chain(kinds, seed) for kinds in kind_lists for seed in range(3)]]
+    for values in chains:
+        no_swap, swap = QNET.swap_chains(values['e'], values['edge_e'], values['kind'], values['swap_prob'])
+        assert no_swap.shape == swap.shape == (1,)
+
+    stacked = QNET.stack_chains(chains)
+    no_swap, swap = QNET.swap_chains(stacked['e'], stacked['edge_e'], stacked['kind'], stacked['swap_prob'],
+                                     stacked['n'])
+    for i, values in enumerate(chains):
+        single = QNET.swap_chains(values['e'], values['edge_e'], values['kind'], values['swap_prob'])
+        assert (no_swap[i], swap[i]) == pytest.approx((single[0][0], single[1][0]), rel=1e-12)
+
+    # A chain of one node
+    assert QNET.swap_chains([[0.9]], np.zeros((1, 0)), [QNET.CHAIN_OTHER], n=[1]) == (pytest.approx([0.9]), [1])
+
+
+def test_simple_swap_batch():
+    graphs = [QNET.altLinGen(n, [0, 0, 1], e=0.9, f=0.95) for n in range(3, 10)]
+    graphs += [chain(kinds, seed) for kinds in kind_lists for seed in range(3)]
+    no_swap, swap = QNET.simple_swap_batch(graphs)
+    assert no_swap.shape == swap.shape == (len(graphs),)
+    for i, Q in enumerate(graphs):
+        assert (no_swap[i], swap[i]) == pytest.approx(QNET.simple_swap(Q, Q.getNode("A"), Q.getNode("B")),
+                                                      rel=1e-12)
+        assert (no_swap[i], swap[i]) == pytest.approx(baseline_swap(Q, Q.getNode("A"), Q.getNode("B")), rel=1e-12)
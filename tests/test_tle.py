@@ -0,0 +1,85 @@
+"""
+Tests of the shared skyfield cache, read_tle_file and Qnet.add_satellites_from_tle_file
+"""
+
+import pytest
+
+import QNET
+
+iss = ("1 25544U 98067A   20154.85125762  .00002004  00000-0  43906-4 0  9990",
+       "2 25544  51.6443  59.4222 0002071  22.0017  92.6243 15.49416742229799")
+other = ("1 10000U 98067A   20154.85125762  .00002004  00000-0  43906-4 0  9991",
+         "2 10000  51.6443  59.4222 0002071  22.0017  92.6243 15.49416742229790")
+
+
+def write_tle(tmp_path, text):
+    path = tmp_path / "constellation.tle"
+    path.write_text(text)
+    return str(path)
+
+
+def test_read_tle_file(tmp_path):
+    # Three-line format with and without the "0 " prefix, and a two-line element set without a name
+    path = write_tle(tmp_path, f"ISS (ZARYA)\n{iss[0]}\n{iss[1]}\n\n0 OTHER\n{other[0]}\n{other[1]}\n"
+                               f"{iss[0]}\n{iss[1]}\n")
+    assert QNET.read_tle_file(path) == [("ISS (ZARYA)", *iss), ("OTHER", *other), ("25544", *iss)]
+
+
+def test_skyfield_cache():
+    QNET.clear_skyfield_cache()
+    ts = QNET.get_timescale()
+    assert QNET.get_timescale() is ts
+    satellite = QNET.get_earth_satellite(*iss, "ISS")
+    assert QNET.get_earth_satellite(*iss, "Other name") is satellite
+    assert QNET.get_earth_satellite(*other) is not satellite
+    assert QNET.get_topos([10, 20, 0]) is QNET.get_topos([10.0, 20.0, 5])
+
+    # Satellites built with the same elements share the parsed satellite and the timescale
+    Q = QNET.Qnet()
+    A = QNET.Satellite(Q, name="A", line1=iss[0], line2=iss[1], cartesian=False)
+    B = QNET.Satellite(Q, name="B", line1=iss[0], line2=iss[1], cartesian=False)
+    assert A.satellite is B.satellite is satellite
+    assert A.ts is B.ts is ts
+
+    QNET.clear_skyfield_cache()
+    assert QNET.get_earth_satellite(*iss) is not satellite
+    assert QNET.get_timescale() is ts
+
+
+def test_add_satellites_from_tle_file(tmp_path):
+    path = write_tle(tmp_path, f"ISS\n{iss[0]}\n{iss[1]}\nOTHER\n{other[0]}\n{other[1]}\n")
+    Q = QNET.Qnet()
+    Q.add_qnode(name="G", qnode_type="Ground", coords=[0, 0, 0])
+    satellites = Q.add_satellites_from_tle_file(path, e=0.9)
+    assert [node.name for node in satellites] == ["ISS", "OTHER"]
+    assert all(Q.getNode(node.name) is node for node in satellites)
+    # The constellation is tracked from one start time
+    assert satellites[0].t_startTime is satellites[1].t_startTime
+
+    # The satellites are placed as the constructor places them
+    S = QNET.Satellite(Q, name="ISS", line1=iss[0], line2=iss[1], cartesian=False)
+    node = Q.getNode("ISS")
+    assert node.satellite is S.satellite
+    assert node.coords == pytest.approx(S.coords, abs=1)
+    assert node.costs == QNET.make_cost_vector(Q, e=0.9)
+    assert node.cartesian is False and node.time == 0
+
+    # Reading the file again updates the satellites in place
+    version = Q.version
+    again = Q.add_satellites_from_tle_file(path, e=0.8)
+    assert again[0] is node and Q.number_of_nodes() == 3
+    assert node.costs == QNET.make_cost_vector(Q, e=0.8)
+    assert Q.version == version + 1 and set(Q.changes[-1][1]) == {id(s) for s in satellites}
+
+    # Satellites from the file move with the Qnet
+    coords = list(node.coords)
+    Q.update(600)
+    assert node.time == 600 and node.coords != coords
+
+
+def test_tle_name_of_a_ground_node(tmp_path):
+    path = write_tle(tmp_path, f"G\n{iss[0]}\n{iss[1]}\n")
+    Q = QNET.Qnet()
+    Q.add_qnode(name="G", qnode_type="Ground", coords=[0, 0, 0])
+    with pytest.raises(AssertionError, match="not a Satellite"):
+        Q.add_satellites_from_tle_file(path)
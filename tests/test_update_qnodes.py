@@ -0,0 +1,90 @@
+"""
+Tests of Qnode.reset, Qnode.update and Qnet.update_qnodes
+"""
+
+import pytest
+
+import QNET
+
+
+def nodes_qnet():
+    Q = QNET.Qnet()
+    Q.add_qnode(name="A", qnode_type="Ground", coords=[1, 2, 3], e=0.9, f=0.95, isMemory=True)
+    Q.add_qnode(name="R", qnode_type="Swapper", coords=[4, 5, 6], swap_prob=0.8, e=0.7)
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[0, 0, 500], v_cart=[10, 5])
+    Q.add_node(QNET.Memory(Q, name="M", coords=[7, 8, 9], isMemory=True))
+    Q.getNode("M").t_memory = 2.5
+    Q.add_qchan(edge=("A", "R"), e=0.9, f=0.9)
+    Q.add_qchan(edge=("R", "M"), e=0.9, f=0.9)
+    return Q
+
+
+def test_reset_applies_the_defaults_table():
+    Q = nodes_qnet()
+    for node in Q.nodes:
+        node.reset()
+    assert Q.getNode("A").coords == [0, 0, 0] and Q.getNode("A").isMemory is False
+    assert Q.getNode("R").swap_prob == 0.5
+    assert Q.getNode("S").velocity == [0, 0]
+    assert Q.getNode("M").t_memory == 0
+    # Defaults are copied, not shared between nodes
+    Q.getNode("A").coords[0] = 1
+    assert Q.getNode("R").coords == [0, 0, 0]
+    # Costs are not in the defaults table
+    assert Q.getNode("A").costs['e'] == 0.9
+
+
+def test_reset_keeps_the_coordinates_of_geodesic_satellites():
+    Q = QNET.Qnet()
+    S = QNET.Satellite(Q, name="S", coords=[0, 0, 500], v_cart=[1, 0])
+    S.cartesian = False
+    S.reset()
+    assert S.coords == [0, 0, 500] and S.velocity == [0, 0]
+
+
+def test_update():
+    Q = nodes_qnet()
+    version = Q.version
+    Q.getNode("R").update(Q, e=0.99)
+    R = Q.getNode("R")
+    assert R.swap_prob == 0.5 and R.coords == [0, 0, 0]
+    assert R.costs == QNET.make_cost_vector(Q, e=0.99)
+    assert Q.version == version + 1
+    assert Q.changes[-1][1] == (id(R),)
+    # A higher efficiency lowers the additive cost
+    assert Q.changes[-1][3] == {'e'} and Q.changes[-1][4] == {'e'}
+
+    # Attributes given as None are left alone
+    Q.getNode("A").update(Q, from_default=False, coords=None, e=0.5, f=0.95)
+    assert Q.getNode("A").coords == [1, 2, 3] and Q.getNode("A").isMemory is True
+    assert Q.changes[-1][3] == {'e'} and Q.changes[-1][4] == set()
+
+    # Renaming reindexes
+    Q.getNode("A").update(Q, from_default=False, name="A2")
+    assert Q.getNode("A2") is not None and Q.getNode("A") is None
+
+
+def test_update_qnodes_matches_update():
+    updates = [{'name': "A", 'e': 0.8},
+               {'name': "R", 'swap_prob': 0.9, 'from_default': False},
+               {'name': "S", 'coords': [1, 1, 400], 'f': 0.9},
+               {'name': "M"}]
+    Q = nodes_qnet()
+    R = nodes_qnet()
+    version = Q.version
+    Q.update_qnodes(updates)
+    assert Q.version == version + 1
+    assert set(Q.changes[-1][1]) == {id(node) for node in Q.nodes}
+    assert Q.changes[-1][3] == {'e', 'f'}
+    for data in updates:
+        data = dict(data)
+        R.getNode(data.pop("name")).update(R, data.pop("from_default", True), **data)
+    for node in R.nodes:
+        other = Q.getNode(node.name)
+        assert other.__dict__ == node.__dict__
+
+
+def test_update_qnodes_missing_node():
+    Q = nodes_qnet()
+    with pytest.raises(AssertionError, match="not in the Qnet"):
+        Q.update_qnodes([{'name': "Z"}])
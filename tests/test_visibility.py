@@ -0,0 +1,132 @@
+"""
+Tests of GroundIndex and VisibilityManager against checking every ground node
+"""
+
+import math
+import random
+
+import pytest
+
+import QNET
+
+iss = ("1 25544U 98067A   20154.85125762  .00002004  00000-0  43906-4 0  9990",
+       "2 25544  51.6443  59.4222 0002071  22.0017  92.6243 15.49416742229799")
+
+
+def elevation(satellite, node):
+    """Elevation of a cartesian satellite seen from a node in degrees, or None if it is not above the node"""
+    dz = satellite.coords[2] - node.coords[2]
+    if dz <= 0:
+        return None
+    return math.degrees(math.asin(dz / math.dist(satellite.coords, node.coords)))
+
+
+def brute_force(satellite, nodes, min_elevation):
+    visible = set()
+    for node in nodes:
+        if satellite.cartesian is True:
+            alt = elevation(satellite, node)
+        else:
+            alt = (satellite.satellite - QNET.get_topos(node.coords)).at(satellite.t_new).altaz()[0].degrees
+            alt = alt if alt > 0 else None
+        if alt is not None and alt >= min_elevation:
+            visible.add(node)
+    return visible
+
+
+def plane_qnet(n, seed):
+    rng = random.Random(seed)
+    Q = QNET.Qnet()
+    for i in range(n):
+        Q.add_qnode(name=f"G{i}", qnode_type="Ground", coords=[rng.uniform(-1000, 1000), rng.uniform(-1000, 1000),
+                                                               rng.uniform(0, 5)])
+    # Swappers are not indexed by default
+    Q.add_qnode(name="R", qnode_type="Swapper", coords=[0, 0, 0])
+    Q.add_qnode(name="S", qnode_type="Satellite", coords=[-800, -300, 400], v_cart=[15, 5])
+    return Q
+
+
+@pytest.mark.parametrize("min_elevation", [0, 10, 45, 80])
+def test_visible_cartesian(min_elevation):
+    Q = plane_qnet(300, seed=min_elevation)
+    S = Q.getNode("S")
+    index = QNET.GroundIndex(Q)
+    ground = [node for node in Q.nodes if isinstance(node, QNET.Ground)]
+    for t in range(0, 120, 10):
+        S.set_time(t)
+        assert set(index.visible(S, min_elevation)) == brute_force(S, ground, min_elevation)
+
+
+def test_visible_geodesic():
+    rng = random.Random(4)
+    Q = QNET.Qnet()
+    nodes = [QNET.Ground(Q, name=f"G{i}", coords=[rng.uniform(-60, 60), rng.uniform(-180, 180), 0])
+             for i in range(150)]
+    Q.add_nodes_from(nodes)
+    S = QNET.Satellite(Q, name="ISS", line1=iss[0], line2=iss[1], cartesian=False)
+    Q.add_node(S)
+    index = QNET.GroundIndex(Q)
+    seen = 0
+    for t in range(0, 6000, 600):
+        S.set_time(t)
+        for min_elevation in (0, 20):
+            visible = set(index.visible(S, min_elevation))
+            assert visible == brute_force(S, nodes, min_elevation)
+            seen += len(visible)
+    assert seen > 0
+
+
+def test_index_follows_ground_nodes():
+    Q = plane_qnet(20, seed=1)
+    S = Q.getNode("S")
+    index = QNET.GroundIndex(Q)
+    version = index.version
+    # Moving a satellite does not invalidate the index
+    Q.update(10)
+    assert not index.is_stale() and index.version == Q.version
+    Q.add_qnode(name="Below", qnode_type="Ground", coords=list(S.coords[:2]) + [0])
+    assert index.is_stale()
+    assert Q.getNode("Below") in index.visible(S, 80)
+    Q.remove_qnode("Below")
+    assert index.is_stale()
+    assert all(node.name != "Below" for node in index.visible(S, 0))
+    assert index.version > version
+
+
+def test_given_nodes():
+    Q = plane_qnet(20, seed=2)
+    nodes = [Q.getNode("G0"), Q.getNode("R")]
+    index = QNET.GroundIndex(Q, nodes)
+    S = Q.getNode("S")
+    S.coords = [0, 0, 400]
+    assert set(index.visible(S, 0)) == set(nodes)
+
+
+def satellite_channels(Q, S, key=0):
+    return {n for n in Q.adj[S] if key in Q.adj[S][n]}
+
+
+@pytest.mark.parametrize("min_elevation", [0, 30])
+def test_visibility_manager(min_elevation):
+    Q = plane_qnet(200, seed=3)
+    S = Q.getNode("S")
+    R = Q.getNode("R")
+    Q.add_qchan(edge=("S", "R"))
+    ground = [node for node in Q.nodes if isinstance(node, QNET.Ground)]
+    Q.enable_visibility(min_elevation)
+    assert satellite_channels(Q, S) == brute_force(S, ground, min_elevation) | {R}
+    for step in range(12):
+        before = satellite_channels(Q, S)
+        version = Q.version
+        changed = Q.update(10)
+        visible = brute_force(S, ground, min_elevation)
+        # Channels to unmanaged nodes are updated as before
+        assert satellite_channels(Q, S) == visible | {R}
+        assert {n for s, n, key in changed} >= (before ^ (visible | {R}))
+        for node in visible:
+            assert Q.adj[S][node][0]['e'] == pytest.approx(S.airCost(node)[0])
+        assert Q.version > version
+    Q.disable_visibility()
+    kept = satellite_channels(Q, S)
+    Q.update(10)
+    assert satellite_channels(Q, S) == kept